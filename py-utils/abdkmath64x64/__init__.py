@@ -0,0 +1,26 @@
+"""
+Python mirror of src/libraries/ABDKMath64x64.sol
+
+`scalar` works on python ints one value at a time (the functions are re-exported here),
+`batch` works on numpy arrays of packed values, and `halflife` mirrors the HalfLife libraries.
+"""
+from .scalar import (
+    MIN_64x64,
+    MAX_64x64,
+    ONE,
+    ABDKRevert,
+    fromUInt,
+    toUInt,
+    add,
+    sub,
+    mul,
+    mulu,
+    div,
+    divu,
+    pow,
+    log_2,
+    ln,
+    exp_2,
+    exp,
+)
+from . import batch, halflife
@@ -0,0 +1,547 @@
+"""
+Batched (numpy) mirror of src/libraries/ABDKMath64x64.sol.
+
+numpy has no 128/256-bit integers, so batch values are "packed": a (limbs, n) uint64 array where
+every row holds 32 bits of the value, least significant limb first, in two's complement.
+64.64 numbers use 4 limbs (int128), uint256 values use 8 limbs.
+All arithmetic is done on the limbs with exact carries, so every lane matches the scalar
+functions (and the library) bit-for-bit.
+
+Use `pack` / `unpack` to move between python ints and packed arrays, and `fromUInt` to pack
+a plain numpy integer array directly. A `require` failing in any lane raises `ABDKRevert`
+with the indices of the failing lanes as its argument.
+"""
+import numpy as np
+
+from .scalar import ABDKRevert, EXP_2_MULTIPLIERS
+
+_MASK = np.uint64(0xFFFFFFFF)
+_SHIFT = np.uint64(32)
+_ONE = np.uint64(1)
+_ZERO = np.uint64(0)
+
+LIMBS_64x64 = 4
+LIMBS_UINT256 = 8
+
+
+# -------------------------------------------------------------------------- #
+#                                  packing                                    #
+# -------------------------------------------------------------------------- #
+
+
+def pack(values, limbs: int = LIMBS_64x64) -> np.ndarray:
+    """
+    python ints (or a numpy integer array) -> (limbs, n) packed array, two's complement modulo 2^(32 * limbs)
+    """
+    if isinstance(values, np.ndarray) and values.dtype.kind in "iu":
+        v = values.ravel()
+        out = np.zeros((limbs, v.shape[0]), dtype=np.uint64)
+        u = v.astype(np.uint64)  # two's complement for negative int64
+        out[0] = u & _MASK
+        if limbs > 1:
+            out[1] = u >> _SHIFT
+        if values.dtype.kind == "i" and limbs > 2:
+            out[2:, v < 0] = _MASK
+        return out
+    mod = 1 << (32 * limbs)
+    width = 4 * limbs
+    raw = b"".join((int(v) % mod).to_bytes(width, "little") for v in values)
+    n = len(raw) // width
+    return np.frombuffer(raw, dtype="<u4").reshape(n, limbs).T.astype(np.uint64)
+
+
+def unpack(packed: np.ndarray, signed: bool = True) -> np.ndarray:
+    """
+    (limbs, n) packed array -> object array of python ints
+    """
+    limbs, n = packed.shape
+    width = 4 * limbs
+    raw = np.ascontiguousarray(packed.T.astype("<u4")).tobytes()
+    out = np.empty(n, dtype=object)
+    out[:] = [int.from_bytes(raw[i:i + width], "little", signed=signed) for i in range(0, n * width, width)]
+    return out
+
+
+def to_float(packed: np.ndarray) -> np.ndarray:
+    """
+    Packed 64.64 numbers -> float64 (for plotting / eyeballing, not exact)
+    """
+    neg = _is_neg(packed)
+    mag = _abs(packed)
+    out = np.zeros(packed.shape[1], dtype=np.float64)
+    for k in range(packed.shape[0] - 1, -1, -1):
+        out = out * 4294967296.0 + mag[k].astype(np.float64)
+    out /= 18446744073709551616.0
+    return np.where(neg, -out, out)
+
+
+def _const(value: int, limbs: int) -> np.ndarray:
+    """
+    A python int as a (limbs, 1) packed column that broadcasts against (limbs, n)
+    """
+    return pack([value], limbs)
+
+
+# -------------------------------------------------------------------------- #
+#                                limb helpers                                 #
+# -------------------------------------------------------------------------- #
+
+
+def _require(condition: np.ndarray):
+    condition = np.asarray(condition)
+    if not condition.all():
+        raise ABDKRevert(np.flatnonzero(~condition))
+
+
+def _is_neg(a: np.ndarray) -> np.ndarray:
+    return (a[-1] >> np.uint64(31)) == _ONE
+
+
+def _is_zero(a: np.ndarray) -> np.ndarray:
+    return ~np.any(a, axis=0)
+
+
+def _normalize(cols: np.ndarray, limbs: int):
+    """
+    Propagates carries of a (k, n) column array with values < 2^63 into `limbs` 32-bit limbs.
+    Returns (limbs, overflowed)
+    """
+    n = cols.shape[1]
+    out = np.zeros((limbs, n), dtype=np.uint64)
+    carry = np.zeros(n, dtype=np.uint64)
+    for k in range(limbs):
+        c = carry + (cols[k] if k < cols.shape[0] else _ZERO)
+        out[k] = c & _MASK
+        carry = c >> _SHIFT
+    overflow = carry != _ZERO
+    if cols.shape[0] > limbs:
+        overflow |= np.any(cols[limbs:], axis=0)
+    return out, overflow
+
+
+def _mul(a: np.ndarray, b: np.ndarray, limbs: int = None):
+    """
+    Unsigned product of two packed arrays (either can be a (k, 1) constant).
+    Returns (product, overflowed) where product keeps `limbs` limbs (default: all of them)
+    """
+    la, lb = a.shape[0], b.shape[0]
+    n = max(a.shape[1], b.shape[1])
+    cols = np.zeros((la + lb + 1, n), dtype=np.uint64)
+    for i in range(la):
+        p = a[i] * b  # (lb, n), every term < 2^64
+        cols[i:i + lb] += p & _MASK
+        cols[i + 1:i + lb + 1] += p >> _SHIFT
+    return _normalize(cols, la + lb if limbs is None else limbs)
+
+
+def _add(a: np.ndarray, b: np.ndarray):
+    """
+    a + b modulo 2^(32 * limbs). Returns (sum, carry_out)
+    """
+    n = max(a.shape[1], b.shape[1])
+    out = np.zeros((a.shape[0], n), dtype=np.uint64)
+    carry = np.zeros(n, dtype=np.uint64)
+    for k in range(a.shape[0]):
+        c = a[k] + b[k] + carry
+        out[k] = c & _MASK
+        carry = c >> _SHIFT
+    return out, carry != _ZERO
+
+
+def _sub(a: np.ndarray, b: np.ndarray):
+    """
+    a - b modulo 2^(32 * limbs). Returns (difference, borrow_out)
+    """
+    n = max(a.shape[1], b.shape[1])
+    out = np.zeros((a.shape[0], n), dtype=np.uint64)
+    borrow = np.zeros(n, dtype=np.uint64)
+    base = np.uint64(1 << 32)
+    for k in range(a.shape[0]):
+        t = a[k] + base - b[k] - borrow
+        out[k] = t & _MASK
+        borrow = _ONE - (t >> _SHIFT)
+    return out, borrow != _ZERO
+
+
+def _neg(a: np.ndarray) -> np.ndarray:
+    return _sub(np.zeros_like(a), a)[0]
+
+
+def _abs(a: np.ndarray) -> np.ndarray:
+    return np.where(_is_neg(a), _neg(a), a)
+
+
+def _resize(a: np.ndarray, limbs: int, signed: bool = False) -> np.ndarray:
+    """
+    Truncates or extends (sign extends when `signed`) a packed array to `limbs` limbs
+    """
+    if a.shape[0] >= limbs:
+        return a[:limbs].copy()
+    out = np.zeros((limbs, a.shape[1]), dtype=np.uint64)
+    out[:a.shape[0]] = a
+    if signed:
+        out[a.shape[0]:, _is_neg(a)] = _MASK
+    return out
+
+
+def _shr(a: np.ndarray, s: int) -> np.ndarray:
+    """
+    Logical right shift by a constant
+    """
+    w, r = divmod(s, 32)
+    padded = np.concatenate([a[w:], np.zeros((w + 1, a.shape[1]), dtype=np.uint64)])
+    r = np.uint64(r)
+    return ((padded[:a.shape[0]] >> r) | ((padded[1:a.shape[0] + 1] << (_SHIFT - r)) & _MASK)) & _MASK
+
+
+def _shl(a: np.ndarray, s: int, limbs: int = None) -> np.ndarray:
+    """
+    Left shift by a constant into `limbs` limbs (default: same size, bits shifted out are dropped)
+    """
+    limbs = a.shape[0] if limbs is None else limbs
+    w, r = divmod(s, 32)
+    padded = np.zeros((limbs + 1, a.shape[1]), dtype=np.uint64)
+    take = max(0, min(a.shape[0], limbs - w))
+    padded[w + 1:w + 1 + take] = a[:take]
+    r = np.uint64(r)
+    return ((padded[1:] << r) & _MASK) | (padded[:-1] >> (_SHIFT - r))
+
+
+def _shift_var(a: np.ndarray, s: np.ndarray, left: bool) -> np.ndarray:
+    """
+    Per lane logical shift, `s` is an integer array with 0 <= s < 32 * limbs
+    """
+    limbs, n = a.shape
+    s = np.asarray(s, dtype=np.int64)
+    w = s // 32
+    r = (s % 32).astype(np.uint64)
+    zeros = np.zeros((limbs + 1, n), dtype=np.uint64)
+    padded = np.concatenate([zeros, a, zeros])  # index limbs + 1 is limb 0
+    out = np.zeros_like(a)
+    base = limbs + 1
+    for k in range(limbs):
+        if left:
+            src = base + k - w
+            hi = np.take_along_axis(padded, src[None, :], axis=0)[0]
+            lo = np.take_along_axis(padded, (src - 1)[None, :], axis=0)[0]
+            out[k] = ((hi << r) & _MASK) | (lo >> (_SHIFT - r))
+        else:
+            src = base + k + w
+            lo = np.take_along_axis(padded, src[None, :], axis=0)[0]
+            hi = np.take_along_axis(padded, (src + 1)[None, :], axis=0)[0]
+            out[k] = (lo >> r) | ((hi << (_SHIFT - r)) & _MASK)
+    return out
+
+
+def _ge(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Unsigned a >= b
+    """
+    n = max(a.shape[1], b.shape[1])
+    result = np.ones(n, dtype=bool)
+    decided = np.zeros(n, dtype=bool)
+    for k in range(a.shape[0] - 1, -1, -1):
+        gt = a[k] > b[k]
+        lt = a[k] < b[k]
+        result = np.where(~decided & lt, False, result)
+        decided |= gt | lt
+    return result
+
+
+def _bit_length(a: np.ndarray) -> np.ndarray:
+    """
+    Unsigned bit length of every lane (0 for zero)
+    """
+    out = np.zeros(a.shape[1], dtype=np.int64)
+    for k in range(a.shape[0]):
+        limb = a[k]
+        nz = limb != _ZERO
+        # uint32 values are exact in float64, frexp gives the exact bit length
+        _, e = np.frexp(limb.astype(np.float64))
+        out = np.where(nz, 32 * k + e, out)
+    return out
+
+
+def _udiv(num: np.ndarray, den: np.ndarray):
+    """
+    Unsigned floor division of packed arrays (den must be non zero in every lane).
+    Returns the quotient with as many limbs as `num`
+    """
+    limbs = num.shape[0]
+    # floor(floor(a / 2^32) / b) == floor(a / (b * 2^32)), so low limbs that are zero in every
+    # divisor can be dropped (turns divisors like `100_000_000 << 64` into short divisions)
+    skip = 0
+    while skip < den.shape[0] - 1 and not den[skip].any():
+        skip += 1
+    if skip:
+        q = _udiv(num[skip:], den[skip:])
+        return _resize(q, limbs)
+    n = max(num.shape[1], den.shape[1])
+    num = np.broadcast_to(num, (num.shape[0], n))
+    den = np.broadcast_to(den, (den.shape[0], n))
+    dbits = _bit_length(den)
+    if dbits.max() <= 48:
+        # short division, remainder * 2^16 + digit always fits in 64 bits
+        d = den[0] | (den[1] << _SHIFT) if den.shape[0] > 1 else den[0].copy()
+        q = np.zeros((num.shape[0], n), dtype=np.uint64)
+        rem = np.zeros(n, dtype=np.uint64)
+        half = np.uint64(16)
+        half_mask = np.uint64(0xFFFF)
+        for k in range(num.shape[0] - 1, -1, -1):
+            top = (rem << half) | (num[k] >> half)
+            qt = top // d
+            rem = top - qt * d
+            bottom = (rem << half) | (num[k] & half_mask)
+            qb = bottom // d
+            rem = bottom - qb * d
+            q[k] = (qt << half) | qb
+        return q
+
+    # schoolbook binary long division, skipping leading bits that are zero in every lane
+    dl = max(den.shape[0], 1) + 1
+    d = _resize(den, dl)
+    rem = np.zeros((dl, n), dtype=np.uint64)
+    q = np.zeros((limbs, n), dtype=np.uint64)
+    top = int(_bit_length(num).max())
+    for bit in range(top - 1, -1, -1):
+        k, r = divmod(bit, 32)
+        r = np.uint64(r)
+        rem = _shl(rem, 1)
+        rem[0] |= (num[k] >> r) & _ONE
+        ge = _ge(rem, d)
+        if ge.any():
+            rem = np.where(ge, _sub(rem, d)[0], rem)
+            q[k] |= ge.astype(np.uint64) << r
+    return q
+
+
+def _fits_int128(mag: np.ndarray, neg: np.ndarray) -> np.ndarray:
+    """
+    Whether a magnitude (any number of limbs) with a sign fits in int128
+    """
+    upper = np.any(mag[4:], axis=0) if mag.shape[0] > 4 else np.zeros(mag.shape[1], dtype=bool)
+    top = mag[3] if mag.shape[0] > 3 else np.zeros(mag.shape[1], dtype=np.uint64)
+    low_zero = ~np.any(mag[:3], axis=0)
+    high_bit = (top >> np.uint64(31)) == _ONE
+    exactly_min = high_bit & (top == np.uint64(0x80000000)) & low_zero
+    return ~upper & (~high_bit | (neg & exactly_min))
+
+
+def _apply_sign(mag: np.ndarray, neg: np.ndarray) -> np.ndarray:
+    mag = _resize(mag, 4)
+    return np.where(neg, _neg(mag), mag)
+
+
+def _smul_shr(x: np.ndarray, y: np.ndarray, s: int):
+    """
+    floor((x * y) / 2^s) for signed packed x, y (arithmetic shift like `int256(x) * y >> s`).
+    Returns (magnitude, negative)
+    """
+    neg = _is_neg(x) ^ _is_neg(y)
+    p, _ = _mul(_abs(x), _abs(y))
+    q = _shr(p, s)
+    low = _shl(p, p.shape[0] * 32 - s) if s % 32 else p[:s // 32]
+    remainder = np.any(low, axis=0)
+    bump = neg & remainder
+    if bump.any():
+        one = np.zeros_like(q)
+        one[0] = bump.astype(np.uint64)
+        q = _add(q, one)[0]
+    neg = neg & ~_is_zero(q)
+    return q, neg
+
+
+# -------------------------------------------------------------------------- #
+#                                  library                                    #
+# -------------------------------------------------------------------------- #
+
+
+def fromUInt(x) -> np.ndarray:
+    """
+    numpy integer array -> packed 64.64 numbers
+    """
+    x = np.asarray(x)
+    _require((x >= 0) & (x <= 0x7FFFFFFFFFFFFFFF))
+    u = x.ravel().astype(np.uint64)
+    out = np.zeros((4, u.shape[0]), dtype=np.uint64)
+    out[2] = u & _MASK
+    out[3] = u >> _SHIFT
+    return out
+
+
+def toUInt(x: np.ndarray) -> np.ndarray:
+    """
+    Packed 64.64 numbers -> uint64 array (rounding down)
+    """
+    _require(~_is_neg(x))
+    return x[2] | (x[3] << _SHIFT)
+
+
+def add(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    s, _ = _add(_resize(x, 5, signed=True), _resize(y, 5, signed=True))
+    _require(s[4] == np.where(_is_neg(s[:4]), _MASK, _ZERO))
+    return s[:4]
+
+
+def sub(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    s, _ = _sub(_resize(x, 5, signed=True), _resize(y, 5, signed=True))
+    _require(s[4] == np.where(_is_neg(s[:4]), _MASK, _ZERO))
+    return s[:4]
+
+
+def mul(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    q, neg = _smul_shr(x, y, 64)
+    _require(_fits_int128(q, neg))
+    return _apply_sign(q, neg)
+
+
+def mulu(x: np.ndarray, y) -> np.ndarray:
+    """
+    `y` is a numpy integer array, an object array of python ints, or a packed uint256 array.
+    Returns packed uint256 values (unpack with `signed=False`)
+    """
+    if not (isinstance(y, np.ndarray) and y.dtype == np.uint64 and y.ndim == 2):
+        y = pack(y, LIMBS_UINT256)
+    y_zero = _is_zero(y)
+    _require(y_zero | ~_is_neg(x))
+    p, _ = _mul(np.where(y_zero, _ZERO, x), y)
+    q = _shr(p, 64)
+    _require(~np.any(q[8:], axis=0))
+    return q[:8]
+
+
+def div(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    _require(~_is_zero(y))
+    neg = _is_neg(x) ^ _is_neg(y)
+    num = _shl(_abs(x), 64, limbs=6)
+    q = _udiv(num, _abs(y))
+    neg = neg & ~_is_zero(q)
+    _require(_fits_int128(q, neg))
+    return _apply_sign(q, neg)
+
+
+def divu(x, y) -> np.ndarray:
+    """
+    `x` and `y` are numpy integer arrays, object arrays of python ints, or packed uint256 arrays
+    """
+    if not (isinstance(x, np.ndarray) and x.dtype == np.uint64 and x.ndim == 2):
+        x = pack(x, LIMBS_UINT256)
+    if not (isinstance(y, np.ndarray) and y.dtype == np.uint64 and y.ndim == 2):
+        y = pack(y, LIMBS_UINT256)
+    _require(~_is_zero(y))
+    # `divuu` returns floor(x * 2^64 / y) whenever the result fits in 128 bits
+    q = _udiv(_shl(x, 64, limbs=10), y)
+    _require(~np.any(q[4:], axis=0) & ((q[3] >> np.uint64(31)) == _ZERO))
+    return q[:4].copy()
+
+
+# `exp_2` multipliers are all in [2^128, 2^129), so x * m >> 128 == x + (x * (m - 2^128) >> 128)
+_EXP_2_LOW = [_const(m - (1 << 128), 4) for m in EXP_2_MULTIPLIERS]
+_LOG2_E = 0x171547652B82FE1777D0FFDA0D23A7D12
+_LN_2 = 0xB17217F7D1CF79ABC9E3B39803F2F6AF
+
+# The multiplications in `exp_2` run from the top fractional bit down and always start from 2^127,
+# so the state after the top `_EXP_2_TABLE_BITS` bits only depends on those bits and can be looked up
+_EXP_2_TABLE_BITS = 16
+_exp_2_table = None
+
+# lanes are processed in blocks that stay in cache
+_BLOCK = 8192
+
+
+def _get_exp_2_table() -> np.ndarray:
+    global _exp_2_table
+    if _exp_2_table is None:
+        states = [0x80000000000000000000000000000000]
+        for multiplier in EXP_2_MULTIPLIERS[:_EXP_2_TABLE_BITS]:
+            states = [v for state in states for v in (state, state * multiplier >> 128)]
+        _exp_2_table = pack(states, 4)
+    return _exp_2_table
+
+
+def _int_part(x: np.ndarray) -> np.ndarray:
+    """
+    x >> 64 for packed 64.64 numbers, as int64
+    """
+    return (x[2] | (x[3] << _SHIFT)).view(np.int64)
+
+
+def _exp_2_fraction(frac: np.ndarray) -> np.ndarray:
+    """
+    The multiplication chain of `exp_2` for the 64 fractional bits, before the final shift
+    """
+    result = _get_exp_2_table()[:, frac >> np.uint64(64 - _EXP_2_TABLE_BITS)]
+    for i in range(_EXP_2_TABLE_BITS, 64):
+        bit = np.uint64(63 - i)
+        lanes = np.flatnonzero((frac >> bit) & _ONE)
+        if lanes.size == 0:
+            continue
+        r = result[:, lanes]
+        p, _ = _mul(r, _EXP_2_LOW[i])
+        result[:, lanes] = _add(r, p[4:8])[0]
+    return result
+
+
+def exp_2(x: np.ndarray) -> np.ndarray:
+    xi = _int_part(x)
+    _require(xi < 64)  # Overflow
+    underflow = xi < -64
+    n = x.shape[1]
+
+    frac = x[0] | (x[1] << _SHIFT)
+    result = np.empty((4, n), dtype=np.uint64)
+    for start in range(0, n, _BLOCK):
+        result[:, start:start + _BLOCK] = _exp_2_fraction(frac[start:start + _BLOCK])
+
+    shift = np.where(underflow, 0, 63 - xi)
+    result = _shift_var(result, shift, left=False)
+    result[:, underflow] = _ZERO
+    _require((result[3] >> np.uint64(31)) == _ZERO)
+    return result
+
+
+def exp(x: np.ndarray) -> np.ndarray:
+    xi = _int_part(x)
+    _require(xi < 64)  # Overflow
+    underflow = xi < -64
+    q, neg = _smul_shr(x, _const(_LOG2_E, 5), 128)
+    y = _apply_sign(q, neg)
+    y[:, underflow] = _ZERO
+    result = exp_2(y)
+    result[:, underflow] = _ZERO
+    return result
+
+
+def _log_2_fraction(ux: np.ndarray) -> np.ndarray:
+    """
+    The squaring loop of `log_2`, `ux` is x normalized so its top bit is bit 127
+    """
+    frac = np.zeros(ux.shape[1], dtype=np.uint64)
+    for i in range(64):
+        sq, _ = _mul(ux, ux)
+        b = sq[7] >> np.uint64(31)
+        ux = np.where(b == _ONE, sq[4:8], _shr(sq, 127)[:4])
+        frac |= b << np.uint64(63 - i)
+    return frac
+
+
+def log_2(x: np.ndarray) -> np.ndarray:
+    _require(~_is_neg(x) & ~_is_zero(x))
+    msb = _bit_length(x) - 1
+    ux = _shift_var(x, 127 - msb, left=True)
+    n = x.shape[1]
+    frac = np.empty(n, dtype=np.uint64)
+    for start in range(0, n, _BLOCK):
+        frac[start:start + _BLOCK] = _log_2_fraction(ux[:, start:start + _BLOCK])
+    out = np.empty((4, n), dtype=np.uint64)
+    out[0] = frac & _MASK
+    out[1] = frac >> _SHIFT
+    hi = (msb - 64).astype(np.uint64)
+    out[2] = hi & _MASK
+    out[3] = hi >> _SHIFT
+    return out
+
+
+def ln(x: np.ndarray) -> np.ndarray:
+    q, neg = _smul_shr(log_2(x), _const(_LN_2, 5), 128)
+    return _apply_sign(q, neg)
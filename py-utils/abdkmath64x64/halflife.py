@@ -0,0 +1,302 @@
+"""
+Mirrors of the two libraries built on top of ABDKMath64x64:
+    - src/libraries/HalfLife.sol                    (nominations, 1 year half-life)
+    - src/libraries/HalfLifeCarbonCreditAuction.sol (auction price, 7 day half-life)
+
+Also carries the float reference and the divergence check that the Governance tests
+run through the `half_life` / `divergence_check` rust binaries in test/Governance/ffi,
+so those checks can run in-process.
+"""
+import numpy as np
+
+from . import batch, scalar
+
+SECONDS_IN_YEAR = 365 * 86400
+CARBON_CREDIT_AUCTION_HALVING_PERIOD = 7 * 86400
+
+# ABDKMath64x64.ln(ABDKMath64x64.divu(1, 2)), the same for every call
+LN_HALF = scalar.ln(scalar.divu(1, 2))
+
+
+def calculate_half_life_value(initialValue: int, elapsedSeconds: int, halfLifeSeconds: int = SECONDS_IN_YEAR) -> int:
+    """
+    `HalfLife.calculateHalfLifeValue`
+    """
+    tOverT = scalar.div(scalar.fromUInt(elapsedSeconds), scalar.fromUInt(halfLifeSeconds))
+    halfPowerTOverT = scalar.exp(scalar.mul(LN_HALF, tOverT))
+    return scalar.mulu(halfPowerTOverT, initialValue)
+
+
+def calculate_auction_half_life_value(initialValue: int, elapsedSeconds: int) -> int:
+    """
+    `HalfLifeCarbonCreditAuction.calculateHalfLifeValue`
+    """
+    if elapsedSeconds == 0:
+        return initialValue
+    return calculate_half_life_value(initialValue, elapsedSeconds, CARBON_CREDIT_AUCTION_HALVING_PERIOD)
+
+
+def _half_power_exact(elapsed: np.ndarray, halfLifeSeconds: int) -> np.ndarray:
+    """
+    (1/2)^(t/T) through the packed batch functions, every step exactly as in the library
+    """
+    tOverT = batch.div(batch.fromUInt(elapsed), batch.fromUInt(np.array([halfLifeSeconds])))
+    return batch.exp(batch.mul(batch.pack([LN_HALF]), tOverT))
+
+
+# -------------------------------------------------------------------------- #
+#                               fast exact path                               #
+# -------------------------------------------------------------------------- #
+#
+# For elapsed seconds below 2^32 the result is computed without the packed batch functions:
+#   - t/T, mul(ln(1/2), t/T) and the `exp` multiplication by log2(e) are done exactly on 32 bit limbs
+#     held in uint64 arrays, which gives the exact `exp_2` argument x
+#   - the 64 step multiplication chain of `exp_2` over the fraction bits of x is estimated with
+#     double-double floats (about 104 bits) from four 65536 entry tables, one per 16 fraction bits
+# Every floor in the chain loses less than one unit of a 128 bit number and the result is shifted right
+# by at least 64 bits, so the library's result is the floor of the estimate unless the estimate is
+# within the (tiny) error bound of an integer. Those lanes, and elapsed >= 2^32, use the exact batch path.
+
+_MASK32 = np.uint64(0xFFFFFFFF)
+_THIRTY_TWO = np.uint64(32)
+_FAST_MAX_ELAPSED = 1 << 32
+# the estimate is within 2^-35 of the library's value before the floor, lanes closer than this to an integer are redone
+_FAST_EPSILON = 2.0 ** -30
+_SPLITTER = 134217729.0  # 2^27 + 1
+_fraction_tables = None
+
+
+def _limbs(value: int, count: int) -> list:
+    return [np.uint64((value >> (32 * i)) & 0xFFFFFFFF) for i in range(count)]
+
+
+def _split(a):
+    t = a * _SPLITTER
+    hi = t - (t - a)
+    return hi, a - hi
+
+
+def _dd_mul(ah, al, bh, bl):
+    """
+    Double-double product (Dekker's two-product, no fma needed)
+    """
+    p = ah * bh
+    ahh, ahl = _split(ah)
+    bhh, bhl = _split(bh)
+    e = ((ahh * bhh - p) + ahh * bhl + ahl * bhh) + ahl * bhl
+    e += ah * bl + al * bh
+    s = p + e
+    return s, e - (s - p)
+
+
+def _get_fraction_tables() -> list:
+    """
+    For each 16 bit chunk of the fraction, the double-double product of the `exp_2` multipliers (/ 2^128) of its set bits
+    """
+    global _fraction_tables
+    if _fraction_tables is None:
+        _fraction_tables = []
+        for chunk in range(4):
+            hi = np.ones(1)
+            lo = np.zeros(1)
+            for multiplier in scalar.EXP_2_MULTIPLIERS[16 * chunk : 16 * chunk + 16]:
+                mh = multiplier / 2**128
+                ml = (multiplier - int(mh * 2**128)) / 2**128
+                nh, nl = _dd_mul(hi, lo, mh, ml)
+                # the multipliers run from the top bit down, so every step appends one lower bit to the index
+                hi = np.stack([hi, nh], axis=1).ravel()
+                lo = np.stack([lo, nl], axis=1).ravel()
+            _fraction_tables.append((hi, lo))
+    return _fraction_tables
+
+
+def _exp_2_argument(elapsed: np.ndarray, halfLifeSeconds: int):
+    """
+    -x for x = the `exp_2` argument of (1/2)^(elapsed / T), as 32 bit limbs (elapsed < 2^32, T < 2^32).
+    Returns (limbs, expUnderflow) where expUnderflow marks lanes where `exp` itself returns 0
+    """
+    T = np.uint64(halfLifeSeconds)
+    # t / T = floor(elapsed * 2^64 / T) = a * 2^64 + c * 2^32 + d
+    a = elapsed // T
+    b = elapsed % T
+    c = (b << _THIRTY_TWO) // T
+    d = (((b << _THIRTY_TWO) % T) << _THIRTY_TWO) // T
+
+    # mul(ln(1/2), t / T) = -M with M = ceil(L * (t / T) / 2^64) and L = -ln(1/2)
+    L0, L1 = _limbs(-LN_HALF, 2)
+    p00, p01, p10, p11 = L0 * d, L0 * c, L1 * d, L1 * c
+    mid = (p00 >> _THIRTY_TWO) + (p01 & _MASK32) + (p10 & _MASK32)
+    H = p11 + (p01 >> _THIRTY_TWO) + (p10 >> _THIRTY_TWO) + (mid >> _THIRTY_TWO)
+    H += (((p00 & _MASK32) | (mid & _MASK32)) != 0).astype(np.uint64)
+    La0, La1 = L0 * a, L1 * a
+    m0 = (La0 & _MASK32) + (H & _MASK32)
+    m1 = (La0 >> _THIRTY_TWO) + (La1 & _MASK32) + (H >> _THIRTY_TWO) + (m0 >> _THIRTY_TWO)
+    m2 = (La1 >> _THIRTY_TWO) + (m1 >> _THIRTY_TWO)
+    M = [m0 & _MASK32, m1 & _MASK32, m2]
+    # exp returns 0 below -64
+    expUnderflow = (m2 > 64) | ((m2 == 64) & ((M[0] | M[1]) != 0))
+
+    # exp: x = -ceil(M * log2(e) / 2^128)
+    C = _limbs(batch._LOG2_E, 5)
+    cols = [np.zeros_like(elapsed) for _ in range(9)]
+    for i in range(3):
+        for j in range(5):
+            p = M[i] * C[j]
+            cols[i + j] += p & _MASK32
+            cols[i + j + 1] += p >> _THIRTY_TWO
+    carry = np.zeros_like(elapsed)
+    product = []
+    for col in cols:
+        col = col + carry
+        product.append(col & _MASK32)
+        carry = col >> _THIRTY_TWO
+    X = product[4:8]
+    X0, X1, X2, X3 = X
+    round_up = (product[0] | product[1] | product[2] | product[3]) != 0
+    X0 = X0 + round_up.astype(np.uint64)
+    X1 = X1 + (X0 >> _THIRTY_TWO)
+    X2 = X2 + (X1 >> _THIRTY_TWO)
+    X3 = X3 + (X2 >> _THIRTY_TWO)
+    return [X0 & _MASK32, X1 & _MASK32, X2 & _MASK32, X3], expUnderflow
+
+
+def _half_power_fast(elapsed: np.ndarray, halfLifeSeconds: int):
+    """
+    (1/2)^(elapsed / T) as a uint64 64.64 fraction for elapsed < 2^32.
+    Returns (values, one, redo): `one` marks lanes equal to exactly 1 (elapsed == 0, 2^64 doesn't fit),
+    `redo` the lanes that have to go through the exact path
+    """
+    X, expUnderflow = _exp_2_argument(elapsed, halfLifeSeconds)
+    Xlo = X[0] | (X[1] << _THIRTY_TWO)
+    Xhi = X[2] | (X[3] << _THIRTY_TWO)
+    one = (Xlo == 0) & (Xhi == 0)
+    # x = -X: integer part floor(x / 2^64) = -ceil(X / 2^64), fraction bits (-X) mod 2^64
+    intPart = -(Xhi.astype(np.int64) + (Xlo != 0))
+    frac = np.uint64(0) - Xlo
+    underflow = expUnderflow | (Xhi > 64) | ((Xhi == 64) & (Xlo != 0))
+
+    tables = _get_fraction_tables()
+    hi, lo = tables[0][0][frac >> np.uint64(48)], tables[0][1][frac >> np.uint64(48)]
+    for chunk in range(1, 4):
+        idx = (frac >> np.uint64(48 - 16 * chunk)) & np.uint64(0xFFFF)
+        hi, lo = _dd_mul(hi, lo, tables[chunk][0][idx], tables[chunk][1][idx])
+    # the chain starts at 2^127 and is shifted right by 63 - intPart, i.e. the value is P * 2^(64 + intPart)
+    scale = np.clip(64 + intPart, 0, 63)
+    hi = np.ldexp(hi, scale)
+    lo = np.ldexp(lo, scale)
+    whole = np.floor(hi)
+    rest = (hi - whole) + lo
+    restFloor = np.floor(rest)
+    fraction = rest - restFloor
+    values = whole.astype(np.uint64) + restFloor.astype(np.int64).astype(np.uint64)
+    values[underflow | one] = 0
+    redo = ~(underflow | one) & ((fraction < _FAST_EPSILON) | (fraction > 1 - _FAST_EPSILON))
+    return values, one, redo
+
+
+def _half_power_uint64(elapsedSeconds, halfLifeSeconds: int):
+    """
+    (1/2)^(t/T) for every lane as (uint64 fraction, one): `one` marks the lanes that are exactly 1.0
+    """
+    elapsed = np.asarray(elapsedSeconds).ravel()
+    if elapsed.dtype.kind not in "iu":
+        elapsed = elapsed.astype(np.uint64)
+    if elapsed.size and elapsed.min() < 0:
+        raise ValueError("elapsed seconds must be non-negative")
+    elapsed = elapsed.astype(np.uint64)
+    n = elapsed.shape[0]
+    values = np.zeros(n, dtype=np.uint64)
+    one = np.zeros(n, dtype=bool)
+    fast = elapsed < _FAST_MAX_ELAPSED
+    if halfLifeSeconds >= _FAST_MAX_ELAPSED:
+        fast[:] = False
+    redo = ~fast
+    if fast.any():
+        lanes = np.flatnonzero(fast)
+        v, o, r = _half_power_fast(elapsed[lanes], halfLifeSeconds)
+        values[lanes] = v
+        one[lanes] = o
+        redo[lanes[r]] = True
+    if redo.any():
+        lanes = np.flatnonzero(redo)
+        exact = _half_power_exact(elapsed[lanes], halfLifeSeconds)
+        values[lanes] = exact[0] | (exact[1] << _THIRTY_TWO)
+        one[lanes] = exact[2] != 0
+    return values, one
+
+
+def half_power_batch(elapsedSeconds, halfLifeSeconds: int = SECONDS_IN_YEAR) -> np.ndarray:
+    """
+    (1/2)^(t/T) as packed 64.64 numbers for a numpy integer array of elapsed seconds
+    """
+    values, one = _half_power_uint64(elapsedSeconds, halfLifeSeconds)
+    out = np.zeros((4, values.shape[0]), dtype=np.uint64)
+    out[0] = values & _MASK32
+    out[1] = values >> _THIRTY_TWO
+    out[2] = one.astype(np.uint64)
+    return out
+
+
+def _mulu_uint64(values: np.ndarray, one: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    `mulu` of uint64 fractions (or exactly 1 where `one`) and uint64 integers: the high 64 bits of the product
+    """
+    x0, x1 = values & _MASK32, values >> _THIRTY_TWO
+    y0, y1 = y & _MASK32, y >> _THIRTY_TWO
+    p00, p01, p10, p11 = x0 * y0, x0 * y1, x1 * y0, x1 * y1
+    mid = (p00 >> _THIRTY_TWO) + (p01 & _MASK32) + (p10 & _MASK32)
+    high = p11 + (p01 >> _THIRTY_TWO) + (p10 >> _THIRTY_TWO) + (mid >> _THIRTY_TWO)
+    return np.where(one, y, high)
+
+
+def calculate_half_life_value_uint64(initialValues, elapsedSeconds, halfLifeSeconds: int = SECONDS_IN_YEAR) -> np.ndarray:
+    """
+    `HalfLife.calculateHalfLifeValue` for uint64 initial values, returns a uint64 array (the result never exceeds the input)
+    """
+    values, one = _half_power_uint64(elapsedSeconds, halfLifeSeconds)
+    initial = np.broadcast_to(np.asarray(initialValues, dtype=np.uint64).ravel(), values.shape)
+    return _mulu_uint64(values, one, initial)
+
+
+def calculate_half_life_value_batch(initialValues, elapsedSeconds, halfLifeSeconds: int = SECONDS_IN_YEAR) -> np.ndarray:
+    """
+    `HalfLife.calculateHalfLifeValue` for every (initialValue, elapsedSeconds) pair.
+    `initialValues` is a numpy integer array or a sequence of python ints, returns an object array of python ints
+    """
+    values, one = _half_power_uint64(elapsedSeconds, halfLifeSeconds)
+    halfPowerTOverT = values.astype(object)
+    halfPowerTOverT[one] = scalar.ONE
+    initial = np.broadcast_to(np.asarray(initialValues, dtype=object).ravel(), values.shape)
+    # mulu(x, y) == x * y >> 64 for 0 <= x <= 1.0, which can't overflow
+    return halfPowerTOverT * initial >> 64
+
+
+def calculate_auction_half_life_value_batch(initialValues, elapsedSeconds) -> np.ndarray:
+    """
+    `HalfLifeCarbonCreditAuction.calculateHalfLifeValue` for every (initialValue, elapsedSeconds) pair
+    """
+    elapsed = np.asarray(elapsedSeconds)
+    out = calculate_half_life_value_batch(initialValues, elapsed, CARBON_CREDIT_AUCTION_HALVING_PERIOD)
+    zero = np.flatnonzero(elapsed == 0)
+    if zero.size:
+        initial = np.asarray(initialValues, dtype=object).ravel()
+        out[zero] = [int(v) for v in initial[zero]]
+    return out
+
+
+def half_life_float(initialAmount: float, secondsPast) -> np.ndarray:
+    """
+    Same as test/Governance/ffi/half_life.rs (the float reference the Governance tests compare against)
+    """
+    daysPast = np.asarray(secondsPast, dtype=np.float64) / 86400.0
+    return initialAmount * np.power(0.5, daysPast / 365.0)
+
+
+def passes_divergence_check(solidityOutput, rustOutput) -> np.ndarray:
+    """
+    Same as test/Governance/ffi/divergence_check.rs: |solidity - float| <= float / 10000
+    """
+    solidity = np.asarray(solidityOutput, dtype=np.float64)
+    reference = np.asarray(rustOutput, dtype=np.float64)
+    difference = np.abs(solidity - np.trunc(reference))
+    return difference <= reference / 10000.0
@@ -0,0 +1,296 @@
+"""
+Scalar mirror of src/libraries/ABDKMath64x64.sol.
+
+Every function takes and returns python ints holding the raw int128 / uint256 values
+used by the solidity library, and reproduces its rounding bit-for-bit:
+    - `>>` on signed values is an arithmetic shift (floor), same as python
+    - signed `/` truncates towards zero (see `_sdiv`), python `//` floors
+    - a failing `require` raises `ABDKRevert`
+"""
+
+MIN_64x64 = -0x80000000000000000000000000000000
+MAX_64x64 = 0x7FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF
+
+ONE = 1 << 64
+
+UINT256_MAX = (1 << 256) - 1
+
+
+class ABDKRevert(Exception):
+    pass
+
+
+def _require(condition: bool):
+    if not condition:
+        raise ABDKRevert()
+
+
+def _sdiv(x: int, y: int) -> int:
+    """
+    Solidity signed division (rounds towards zero)
+    """
+    q = abs(x) // abs(y)
+    return q if (x < 0) == (y < 0) else -q
+
+
+def fromUInt(x: int) -> int:
+    _require(0 <= x <= 0x7FFFFFFFFFFFFFFF)
+    return x << 64
+
+
+def toUInt(x: int) -> int:
+    _require(x >= 0)
+    return x >> 64
+
+
+def add(x: int, y: int) -> int:
+    result = x + y
+    _require(MIN_64x64 <= result <= MAX_64x64)
+    return result
+
+
+def sub(x: int, y: int) -> int:
+    result = x - y
+    _require(MIN_64x64 <= result <= MAX_64x64)
+    return result
+
+
+def mul(x: int, y: int) -> int:
+    result = x * y >> 64
+    _require(MIN_64x64 <= result <= MAX_64x64)
+    return result
+
+
+def mulu(x: int, y: int) -> int:
+    if y == 0:
+        return 0
+
+    _require(x >= 0)
+
+    lo = (x * (y & 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF)) >> 64
+    hi = x * (y >> 128)
+
+    _require(hi <= 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF)
+    hi <<= 64
+
+    _require(hi <= UINT256_MAX - lo)
+    return hi + lo
+
+
+def div(x: int, y: int) -> int:
+    _require(y != 0)
+    result = _sdiv(x << 64, y)
+    _require(MIN_64x64 <= result <= MAX_64x64)
+    return result
+
+
+def divu(x: int, y: int) -> int:
+    _require(y != 0)
+    result = _divuu(x, y)
+    _require(result <= MAX_64x64)
+    return result
+
+
+def _divuu(x: int, y: int) -> int:
+    """
+    Private `divuu` of the library, including its uint256 wrapping in the `x > 2^192` branch
+    """
+    _require(y != 0)
+
+    if x <= 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF:
+        result = (x << 64) // y
+    else:
+        msb = 192 + (x >> 192).bit_length() - 1
+
+        result = ((x << (255 - msb)) & UINT256_MAX) // (((y - 1) >> (msb - 191)) + 1)
+        _require(result <= 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF)
+
+        hi = result * (y >> 128)
+        lo = result * (y & 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF)
+
+        xh = x >> 192
+        xl = (x << 64) & UINT256_MAX
+
+        if xl < lo:
+            xh -= 1
+        xl = (xl - lo) & UINT256_MAX  # We rely on overflow behavior here
+        lo = (hi << 128) & UINT256_MAX
+        if xl < lo:
+            xh -= 1
+        xl = (xl - lo) & UINT256_MAX  # We rely on overflow behavior here
+
+        result += xl // y if xh == hi >> 128 else 1
+
+    _require(result <= 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF)
+    return result
+
+
+def pow(x: int, y: int) -> int:
+    negative = x < 0 and y & 1 == 1
+
+    absX = abs(x)
+    absResult = 0x100000000000000000000000000000000
+
+    if absX <= 0x10000000000000000:
+        # the library unrolls this loop 4 bits at a time, the extra squarings don't touch the result
+        absX <<= 63
+        while y != 0:
+            if y & 0x1:
+                absResult = absResult * absX >> 127
+            absX = absX * absX >> 127
+            y >>= 1
+
+        absResult >>= 64
+    else:
+        # normalize absX to [2^127, 2^128), same as the chain of comparisons in the library
+        absXShift = 63 - (128 - absX.bit_length())
+        absX <<= 128 - absX.bit_length()
+
+        resultShift = 0
+        while y != 0:
+            _require(absXShift < 64)
+
+            if y & 0x1:
+                absResult = absResult * absX >> 127
+                resultShift += absXShift
+                if absResult > 0x100000000000000000000000000000000:
+                    absResult >>= 1
+                    resultShift += 1
+            absX = absX * absX >> 127
+            absXShift <<= 1
+            if absX >= 0x100000000000000000000000000000000:
+                absX >>= 1
+                absXShift += 1
+
+            y >>= 1
+
+        _require(resultShift < 64)
+        absResult >>= 64 - resultShift
+
+    result = -absResult if negative else absResult
+    _require(MIN_64x64 <= result <= MAX_64x64)
+    return result
+
+
+def log_2(x: int) -> int:
+    _require(x > 0)
+
+    msb = x.bit_length() - 1  # same as the binary search in the library
+
+    result = (msb - 64) << 64
+    ux = x << (127 - msb)
+    bit = 0x8000000000000000
+    while bit > 0:
+        ux *= ux
+        b = ux >> 255
+        ux >>= 127 + b
+        result += bit * b
+        bit >>= 1
+
+    return result
+
+
+def ln(x: int) -> int:
+    _require(x > 0)
+
+    # The library casts log_2 to uint256 before multiplying, the wrap around cancels out
+    # once the product is truncated back to int128, leaving an arithmetic shift
+    return log_2(x) * 0xB17217F7D1CF79ABC9E3B39803F2F6AF >> 128
+
+
+# Multipliers used by `exp_2`, index i is applied when bit (63 - i) of x is set
+EXP_2_MULTIPLIERS = (
+    0x16A09E667F3BCC908B2FB1366EA957D3E,  # bit 63
+    0x1306FE0A31B7152DE8D5A46305C85EDEC,  # bit 62
+    0x1172B83C7D517ADCDF7C8C50EB14A791F,  # bit 61
+    0x10B5586CF9890F6298B92B71842A98363,  # bit 60
+    0x1059B0D31585743AE7C548EB68CA417FD,  # bit 59
+    0x102C9A3E778060EE6F7CACA4F7A29BDE8,  # bit 58
+    0x10163DA9FB33356D84A66AE336DCDFA3F,  # bit 57
+    0x100B1AFA5ABCBED6129AB13EC11DC9543,  # bit 56
+    0x10058C86DA1C09EA1FF19D294CF2F679B,  # bit 55
+    0x1002C605E2E8CEC506D21BFC89A23A00F,  # bit 54
+    0x100162F3904051FA128BCA9C55C31E5DF,  # bit 53
+    0x1000B175EFFDC76BA38E31671CA939725,  # bit 52
+    0x100058BA01FB9F96D6CACD4B180917C3D,  # bit 51
+    0x10002C5CC37DA9491D0985C348C68E7B3,  # bit 50
+    0x1000162E525EE054754457D5995292026,  # bit 49
+    0x10000B17255775C040618BF4A4ADE83FC,  # bit 48
+    0x1000058B91B5BC9AE2EED81E9B7D4CFAB,  # bit 47
+    0x100002C5C89D5EC6CA4D7C8ACC017B7C9,  # bit 46
+    0x10000162E43F4F831060E02D839A9D16D,  # bit 45
+    0x100000B1721BCFC99D9F890EA06911763,  # bit 44
+    0x10000058B90CF1E6D97F9CA14DBCC1628,  # bit 43
+    0x1000002C5C863B73F016468F6BAC5CA2B,  # bit 42
+    0x100000162E430E5A18F6119E3C02282A5,  # bit 41
+    0x1000000B1721835514B86E6D96EFD1BFE,  # bit 40
+    0x100000058B90C0B48C6BE5DF846C5B2EF,  # bit 39
+    0x10000002C5C8601CC6B9E94213C72737A,  # bit 38
+    0x1000000162E42FFF037DF38AA2B219F06,  # bit 37
+    0x10000000B17217FBA9C739AA5819F44F9,  # bit 36
+    0x1000000058B90BFCDEE5ACD3C1CEDC823,  # bit 35
+    0x100000002C5C85FE31F35A6A30DA1BE50,  # bit 34
+    0x10000000162E42FF0999CE3541B9FFFCF,  # bit 33
+    0x100000000B17217F80F4EF5AADDA45554,  # bit 32
+    0x10000000058B90BFBF8479BD5A81B51AD,  # bit 31
+    0x1000000002C5C85FDF84BD62AE30A74CC,  # bit 30
+    0x100000000162E42FEFB2FED257559BDAA,  # bit 29
+    0x1000000000B17217F7D5A7716BBA4A9AE,  # bit 28
+    0x100000000058B90BFBE9DDBAC5E109CCE,  # bit 27
+    0x10000000002C5C85FDF4B15DE6F17EB0D,  # bit 26
+    0x1000000000162E42FEFA494F1478FDE05,  # bit 25
+    0x10000000000B17217F7D20CF927C8E94C,  # bit 24
+    0x1000000000058B90BFBE8F71CB4E4B33D,  # bit 23
+    0x100000000002C5C85FDF477B662B26945,  # bit 22
+    0x10000000000162E42FEFA3AE53369388C,  # bit 21
+    0x100000000000B17217F7D1D351A389D40,  # bit 20
+    0x10000000000058B90BFBE8E8B2D3D4EDE,  # bit 19
+    0x1000000000002C5C85FDF4741BEA6E77E,  # bit 18
+    0x100000000000162E42FEFA39FE95583C2,  # bit 17
+    0x1000000000000B17217F7D1CFB72B45E1,  # bit 16
+    0x100000000000058B90BFBE8E7CC35C3F0,  # bit 15
+    0x10000000000002C5C85FDF473E242EA38,  # bit 14
+    0x1000000000000162E42FEFA39F02B772C,  # bit 13
+    0x10000000000000B17217F7D1CF7D83C1A,  # bit 12
+    0x1000000000000058B90BFBE8E7BDCBE2E,  # bit 11
+    0x100000000000002C5C85FDF473DEA871F,  # bit 10
+    0x10000000000000162E42FEFA39EF44D91,  # bit 9
+    0x100000000000000B17217F7D1CF79E949,  # bit 8
+    0x10000000000000058B90BFBE8E7BCE544,  # bit 7
+    0x1000000000000002C5C85FDF473DE6ECA,  # bit 6
+    0x100000000000000162E42FEFA39EF366F,  # bit 5
+    0x1000000000000000B17217F7D1CF79AFA,  # bit 4
+    0x100000000000000058B90BFBE8E7BCD6D,  # bit 3
+    0x10000000000000002C5C85FDF473DE6B2,  # bit 2
+    0x1000000000000000162E42FEFA39EF358,  # bit 1
+    0x10000000000000000B17217F7D1CF79AB,  # bit 0
+)
+
+
+def exp_2(x: int) -> int:
+    _require(x < 0x400000000000000000)  # Overflow
+
+    if x < -0x400000000000000000:
+        return 0  # Underflow
+
+    result = 0x80000000000000000000000000000000
+    # python's `&` on negative ints behaves like two's complement, same as the int128 in solidity
+    frac = x & 0xFFFFFFFFFFFFFFFF
+    bit = 0x8000000000000000
+    for multiplier in EXP_2_MULTIPLIERS:
+        if frac & bit:
+            result = result * multiplier >> 128
+        bit >>= 1
+
+    result >>= 63 - (x >> 64)
+    _require(result <= MAX_64x64)
+    return result
+
+
+def exp(x: int) -> int:
+    _require(x < 0x400000000000000000)  # Overflow
+
+    if x < -0x400000000000000000:
+        return 0  # Underflow
+
+    return exp_2(x * 0x171547652B82FE1777D0FFDA0D23A7D12 >> 128)
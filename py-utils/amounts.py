@@ -0,0 +1,20 @@
+"""
+Token amounts on the command line: `1e18`, `96000000e18` or a full wei integer, parsed without going through a float.
+"""
+import argparse
+from decimal import Decimal, InvalidOperation
+
+
+def parse_amount(value: str) -> int:
+    """
+    argparse type of whole token amounts (in the token's smallest unit), rejects anything that isn't an integer >= 0
+    """
+    try:
+        amount = Decimal(value)
+    except InvalidOperation:
+        raise argparse.ArgumentTypeError(f"invalid amount: {value}")
+    if not amount.is_finite() or amount != amount.to_integral_value():
+        raise argparse.ArgumentTypeError(f"amount is not a whole number: {value}")
+    if amount < 0:
+        raise argparse.ArgumentTypeError(f"amount is negative: {value}")
+    return int(amount)
@@ -0,0 +1,228 @@
+"""
+Streaming model of the `BucketSubmission` reward buckets.
+
+`_addToCurrentBucket` splits every donation evenly over 192 weeks:
+`amount / 192` is added to bucket `currentBucket + 16` and deducted again at bucket `currentBucket + 208`,
+and `_rewardWithNeedsInitializing` walks backwards through `amountToDeduct` to find the amount in a bucket.
+Because every deduction lands exactly 192 buckets after its addition, the amount in bucket `id` is
+
+    amountInBucket(id) = P(id) - P(id - 192)
+
+where `P(k)` is the sum of `amount / 192` over all donations whose first bucket is <= `k`.
+This file only keeps one running total per week (not per bucket, not per donation) and a lazily rebuilt
+prefix sum over it, so ingesting a donation is O(1) and `reward(id)` is amortized O(1).
+Amounts stay python ints, so the results are exact for any uint256 donation.
+
+Only `amountInBucket` is modelled: `inheritedFromLastWeek` / `amountToDeduct` are storage bookkeeping
+and don't change how much can be claimed from a bucket.
+
+Usage:
+    python3 bucket_rewards.py donations.csv --range 0 340 > buckets.csv
+    python3 bucket_rewards.py donations.csv --ids 16 17 18
+where donations.csv has a `timestamp,amount` header
+"""
+import argparse
+import csv
+import sys
+
+import numpy as np
+
+# Constants from BucketSubmission.sol / Constants.sol
+OFFSET_LEFT = 16
+OFFSET_RIGHT = 208
+TOTAL_VESTING_PERIODS = OFFSET_RIGHT - OFFSET_LEFT
+BUCKET_DURATION = 7 * 86400
+GENESIS_TIMESTAMP = 1700352000
+
+
+class BucketRewards:
+    def __init__(self, genesis_timestamp: int = GENESIS_TIMESTAMP, bucket_duration: int = BUCKET_DURATION):
+        self.genesis_timestamp = genesis_timestamp
+        self.bucket_duration = bucket_duration
+        # _weekly[k] is the amount added to bucket `_first + k`, _prefix[k] = sum(_weekly[:k + 1])
+        self._first = None
+        self._weekly = []
+        self._prefix = []
+        # _prefix is valid up to (not including) this index
+        self._clean = 0
+        self._last_updated_bucket = 0
+        self.total_donated = 0
+        # what is lost to `amount / TOTAL_VESTING_PERIODS` rounding down
+        self.undistributed = 0
+
+    # ---------------------------------------------------------------------- #
+    #                                 ingest                                  #
+    # ---------------------------------------------------------------------- #
+
+    def current_bucket(self, timestamp: int) -> int:
+        return (timestamp - self.genesis_timestamp) // self.bucket_duration
+
+    def _ensure_week(self, bucket: int) -> int:
+        """
+        Grows the weekly array so `bucket` has a slot and returns its index
+        """
+        if self._first is None:
+            self._first = bucket
+        if bucket < self._first:
+            gap = self._first - bucket
+            self._weekly[:0] = [0] * gap
+            self._prefix[:0] = [0] * gap
+            self._first = bucket
+            self._clean = 0
+        idx = bucket - self._first
+        if idx >= len(self._weekly):
+            gap = idx + 1 - len(self._weekly)
+            self._weekly.extend([0] * gap)
+            self._prefix.extend([0] * gap)
+        return idx
+
+    def _add_to_week(self, bucketToAddTo: int, amountToAdd: int):
+        idx = self._ensure_week(bucketToAddTo)
+        self._weekly[idx] += amountToAdd
+        if idx < self._clean:
+            self._clean = idx
+        # zero donations also move the tracker in the contract
+        if bucketToAddTo > self._last_updated_bucket:
+            self._last_updated_bucket = bucketToAddTo
+
+    def add_donation(self, timestamp: int, amount: int):
+        """
+        `_addToCurrentBucket(amount)` at `timestamp`. Donations don't need to arrive in timestamp order
+        """
+        bucketToAddTo = self.current_bucket(timestamp) + OFFSET_LEFT
+        amountToAddOrSubtract = amount // TOTAL_VESTING_PERIODS
+        self._add_to_week(bucketToAddTo, amountToAddOrSubtract)
+        self.total_donated += amount
+        self.undistributed += amount - amountToAddOrSubtract * TOTAL_VESTING_PERIODS
+
+    def ingest(self, donations):
+        """
+        Consumes an iterable of (timestamp, amount) pairs without holding on to it
+        """
+        for timestamp, amount in donations:
+            self.add_donation(int(timestamp), int(amount))
+        return self
+
+    def add_donations(self, timestamps, amounts):
+        """
+        Bulk version of `add_donation` for numpy arrays.
+        Donations are summed per week in int64 when that can't overflow, otherwise in python ints.
+        """
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        amounts = np.asarray(amounts)
+        if timestamps.shape != amounts.shape:
+            raise ValueError("timestamps and amounts must be the same shape")
+        if timestamps.size == 0:
+            return self
+        buckets = (timestamps - self.genesis_timestamp) // self.bucket_duration + OFFSET_LEFT
+        weeks, inverse = np.unique(buckets, return_inverse=True)
+        if amounts.dtype.kind in "iu" and int(amounts.max()) * amounts.size < 2**63:
+            amounts = amounts.astype(np.int64)
+            perWeek = amounts // TOTAL_VESTING_PERIODS
+            sums = np.zeros(weeks.size, dtype=np.int64)
+            np.add.at(sums, inverse, perWeek)
+            sums = sums.tolist()
+            self.total_donated += int(amounts.sum())
+            self.undistributed += int((amounts - perWeek * TOTAL_VESTING_PERIODS).sum())
+        else:
+            sums = [0] * weeks.size
+            for i, amount in zip(inverse.tolist(), amounts.tolist()):
+                amount = int(amount)
+                perWeek = amount // TOTAL_VESTING_PERIODS
+                sums[i] += perWeek
+                self.total_donated += amount
+                self.undistributed += amount - perWeek * TOTAL_VESTING_PERIODS
+        for week, total in zip(weeks.tolist(), sums):
+            self._add_to_week(week, total)
+        return self
+
+    # ---------------------------------------------------------------------- #
+    #                                 queries                                 #
+    # ---------------------------------------------------------------------- #
+
+    def _refresh(self):
+        prefix = self._prefix
+        weekly = self._weekly
+        running = prefix[self._clean - 1] if self._clean else 0
+        for k in range(self._clean, len(weekly)):
+            running += weekly[k]
+            prefix[k] = running
+        self._clean = len(weekly)
+
+    def _cumulative(self, bucket: int) -> int:
+        """
+        P(bucket): the total ever added to buckets <= `bucket`
+        """
+        if self._first is None or bucket < self._first:
+            return 0
+        idx = bucket - self._first
+        if idx >= len(self._prefix):
+            idx = len(self._prefix) - 1
+        return self._prefix[idx]
+
+    def reward(self, id: int) -> int:
+        """
+        `reward(id).amountInBucket`
+        """
+        if self._clean != len(self._weekly):
+            self._refresh()
+        return self._cumulative(id) - self._cumulative(id - TOTAL_VESTING_PERIODS)
+
+    def rewards(self, ids) -> list:
+        """
+        `reward(id).amountInBucket` for every id
+        """
+        return [self.reward(int(id)) for id in ids]
+
+    def rewards_range(self, start: int, end: int) -> list:
+        """
+        `reward(id).amountInBucket` for every id in [start, end]
+        """
+        return self.rewards(range(start, end + 1))
+
+    @property
+    def last_updated_bucket(self) -> int:
+        """
+        `bucketTracker.lastUpdatedBucket`
+        """
+        return self._last_updated_bucket
+
+    @property
+    def max_bucket_id(self) -> int:
+        """
+        `bucketTracker.maxBucketId`
+        """
+        if self._first is None:
+            return 0
+        return self._last_updated_bucket + TOTAL_VESTING_PERIODS - 1
+
+
+def read_donations_csv(path: str):
+    """
+    Yields (timestamp, amount) rows from a csv with a `timestamp,amount` header one at a time
+    """
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            yield int(row["timestamp"]), int(row["amount"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay BucketSubmission donations and print bucket rewards")
+    parser.add_argument("donations", help="csv with a timestamp,amount header")
+    parser.add_argument("--genesis", type=int, default=GENESIS_TIMESTAMP)
+    parser.add_argument("--bucket-duration", type=int, default=BUCKET_DURATION)
+    parser.add_argument("--ids", type=int, nargs="*", default=None)
+    parser.add_argument("--range", type=int, nargs=2, default=None, metavar=("START", "END"))
+    args = parser.parse_args()
+
+    buckets = BucketRewards(args.genesis, args.bucket_duration).ingest(read_donations_csv(args.donations))
+    if args.range is not None:
+        ids = range(args.range[0], args.range[1] + 1)
+    elif args.ids:
+        ids = args.ids
+    else:
+        ids = range(0, buckets.max_bucket_id + 2)
+    writer = csv.writer(sys.stdout)
+    writer.writerow(["id", "amountInBucket"])
+    for id in ids:
+        writer.writerow([id, buckets.reward(id)])
@@ -0,0 +1,321 @@
+"""
+Bulk model of `MinerPoolAndGCA.claimRewardFromBucket`.
+
+For a finalized bucket with packed global state
+
+    [0-127]   totalNewGCC
+    [128-191] totalGLWRewardsWeight
+    [192-255] totalUSDCRewardsWeight
+
+a leaf (payoutWallet, glwWeight, usdcWeight) is paid
+
+    usdc = amountInBucket * usdcWeight / totalUSDCWeight
+    glw  = GLOW_REWARDS_PER_BUCKET * glwWeight / totalGlwWeight
+
+`ClaimEngine` loads every bucket's packed state and `amountInBucket` once, through a user supplied loader,
+into an LRU cache, and evaluates those two formulas for every leaf of a report in one vectorized pass
+(numpy object arrays of python ints, so the amounts are exact).
+
+`ClaimEngine.claim` also replays the state a claim changes: the per-bucket pushed weights checked by
+`_checkWeightsForOverflow` and the per-user claim bitmaps, stored with the `bucketClaimBitmap` layout
+(one 256 bit word per `bucketId / 256`, bit `bucketId % 256`). Every leaf is treated as its own transaction:
+a reverting claim gets a status and changes nothing, exactly as on chain.
+
+Merkle proofs and signatures aren't checked, the leaves are assumed to be in the submitted report
+(see merkle_tree.py for the proofs).
+
+Usage:
+    python3 claim_engine.py states.csv report.csv --bucket 16 > payouts.csv
+where states.csv has a `bucketId,packedGlobalState,amountInBucket` header and
+report.csv a `payoutWallet,glwWeight,usdcWeight` header
+"""
+import argparse
+import csv
+import sys
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+# Constants from MinerPoolAndGCA.sol
+GLOW_REWARDS_PER_BUCKET = 175_000 * 10**18
+BITS_IN_UINT = 256
+UINT64_MASK = (1 << 64) - 1
+UINT128_MASK = (1 << 128) - 1
+
+# claim statuses, in the order claimRewardFromBucket checks them
+OK = 0
+WEIGHT_NOT_UINT64 = 1  # SafeCast.toUint64 in _checkWeightsForOverflow
+# (pushed weights are uint64, a sum above 2^64 - 1 panics instead, it is reported as the weight overflow it also is)
+GLOW_WEIGHT_OVERFLOW = 2
+USDC_WEIGHT_OVERFLOW = 3
+USER_ALREADY_CLAIMED = 4
+DIVISION_BY_ZERO = 5  # a total weight of 0
+
+STATUS_NAMES = {
+    OK: "OK",
+    WEIGHT_NOT_UINT64: "SafeCastOverflowedUintDowncast",
+    GLOW_WEIGHT_OVERFLOW: "GlowWeightOverflow",
+    USDC_WEIGHT_OVERFLOW: "USDCWeightOverflow",
+    USER_ALREADY_CLAIMED: "UserAlreadyClaimed",
+    DIVISION_BY_ZERO: "panic: division by zero",
+}
+
+BucketState = namedtuple("BucketState", ["totalNewGCC", "totalGlwWeight", "totalUSDCWeight", "amountInBucket"])
+ClaimResult = namedtuple("ClaimResult", ["status", "usdc", "glw"])
+
+
+def unpack_global_state(packedGlobalState: int) -> tuple:
+    """
+    (totalNewGCC, totalGlwWeight, totalUSDCWeight) from `getPackedBucketGlobalState`
+    """
+    return packedGlobalState & UINT128_MASK, packedGlobalState >> 128 & UINT64_MASK, packedGlobalState >> 192
+
+
+def pack_global_state(totalNewGCC: int, totalGlwWeight: int, totalUSDCWeight: int) -> int:
+    return totalNewGCC | (totalGlwWeight << 128) | (totalUSDCWeight << 192)
+
+
+def _as_objects(values) -> np.ndarray:
+    return np.asarray([int(v) for v in values] if not isinstance(values, np.ndarray) else values, dtype=object)
+
+
+class ClaimEngine:
+    def __init__(self, load_bucket, cache_size: int = 1024):
+        """
+        `load_bucket(bucketId)` returns (packedGlobalState, amountInBucket) of a finalized bucket,
+        it is called at most once per bucket while the bucket stays in the cache.
+        """
+        self.load_bucket = load_bucket
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self.loads = 0
+        # bucketId -> [pushedGlwWeight, pushedUSDCWeight]
+        self._pushed = {}
+        # buckets whose totalNewGCC was minted to the carbon credit auction, bucketId -> amount
+        self.minted_to_auction = {}
+        # payoutWallet -> user id, the row of the user in the bitmap arrays
+        self._users = {}
+        # bucketId / 256 -> (users, 4) uint64 array, the 256 bit word of every user as 4 little endian limbs
+        self._bitmaps = {}
+
+    # ---------------------------------------------------------------------- #
+    #                               bucket cache                              #
+    # ---------------------------------------------------------------------- #
+
+    def bucket(self, bucketId: int) -> BucketState:
+        state = self._cache.get(bucketId)
+        if state is not None:
+            self._cache.move_to_end(bucketId)
+            return state
+        packedGlobalState, amountInBucket = self.load_bucket(bucketId)
+        self.loads += 1
+        state = BucketState(*unpack_global_state(int(packedGlobalState)), int(amountInBucket))
+        self._cache[bucketId] = state
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return state
+
+    # ---------------------------------------------------------------------- #
+    #                                  amounts                                #
+    # ---------------------------------------------------------------------- #
+
+    def claim_amounts(self, bucketId: int, glwWeights, usdcWeights) -> tuple:
+        """
+        (usdc, glw) object arrays the leaves of a bucket would be paid, ignoring claim state.
+        Leaves whose weight exceeds the total (they'd revert) and buckets with a total weight of 0 are paid 0.
+        """
+        state = self.bucket(bucketId)
+        glwWeights = _as_objects(glwWeights)
+        usdcWeights = _as_objects(usdcWeights)
+        usdc = np.zeros(usdcWeights.shape[0], dtype=object)
+        glw = np.zeros(glwWeights.shape[0], dtype=object)
+        if state.totalUSDCWeight:
+            usdc = usdcWeights * state.amountInBucket // state.totalUSDCWeight
+            usdc[usdcWeights > state.totalUSDCWeight] = 0
+        if state.totalGlwWeight:
+            glw = glwWeights * GLOW_REWARDS_PER_BUCKET // state.totalGlwWeight
+            glw[glwWeights > state.totalGlwWeight] = 0
+        return usdc, glw
+
+    # ---------------------------------------------------------------------- #
+    #                               claim bitmaps                             #
+    # ---------------------------------------------------------------------- #
+
+    def user_ids(self, users) -> np.ndarray:
+        """
+        Dense ids of payout wallets (registering new ones). `claim` and `has_claimed` take either wallets or these ids,
+        passing ids skips the lookup when the same wallets are claimed for many buckets.
+        """
+        if isinstance(users, np.ndarray) and users.dtype.kind in "iu":
+            if users.size and users.max() >= len(self._users):
+                raise KeyError("unknown user id")
+            return users.astype(np.int64, copy=False)
+        known = self._users
+        ids = np.empty(len(users), dtype=np.int64)
+        for i, user in enumerate(users):
+            user = user.lower()
+            row = known.get(user)
+            if row is None:
+                row = known[user] = len(known)
+            ids[i] = row
+        return ids
+
+    def _bitmap(self, key: int) -> np.ndarray:
+        words = self._bitmaps.get(key)
+        if words is None or words.shape[0] < len(self._users):
+            grown = np.zeros((max(16, 2 * len(self._users)), 4), dtype=np.uint64)
+            if words is not None:
+                grown[: words.shape[0]] = words
+            words = self._bitmaps[key] = grown
+        return words
+
+    def bucketClaimBitmap(self, bucketId: int, user: str) -> int:
+        """
+        `MinerPoolAndGCA.bucketClaimBitmap`: the 256 bit word holding the flags of buckets
+        256 * (bucketId / 256) ... 256 * (bucketId / 256) + 255
+        """
+        row = self._users.get(user.lower())
+        words = self._bitmaps.get(bucketId // BITS_IN_UINT)
+        if row is None or words is None or row >= words.shape[0]:
+            return 0
+        return sum(int(limb) << (64 * i) for i, limb in enumerate(words[row]))
+
+    def has_claimed(self, bucketId: int, users) -> np.ndarray:
+        rows = self.user_ids(users)
+        words = self._bitmap(bucketId // BITS_IN_UINT)
+        shift = bucketId % BITS_IN_UINT
+        return (words[rows, shift // 64] >> np.uint64(shift % 64)) & np.uint64(1) == 1
+
+    # ---------------------------------------------------------------------- #
+    #                                  claims                                 #
+    # ---------------------------------------------------------------------- #
+
+    def claim(self, bucketId: int, users, glwWeights, usdcWeights) -> ClaimResult:
+        """
+        Replays `claimRewardFromBucket` for every leaf in order (`users` are payout wallets or ids from `user_ids`). Returns the status of every claim
+        and the usdc / glw it was paid (0 for a reverted claim).
+        """
+        state = self.bucket(bucketId)
+        n = len(users)
+        glw, glwFits = _as_uint64(glwWeights)
+        usdc, usdcFits = _as_uint64(usdcWeights)
+        rows = self.user_ids(users)
+        words = self._bitmap(bucketId // BITS_IN_UINT)
+        limb, bit = (bucketId % BITS_IN_UINT) // 64, np.uint64(1) << np.uint64(bucketId % 64)
+        pushed = self._pushed.setdefault(bucketId, [0, 0])
+        # room left under the totals, both fit in a uint64
+        glwRoom = np.uint64(state.totalGlwWeight - pushed[0])
+        usdcRoom = np.uint64(state.totalUSDCWeight - pushed[1])
+
+        status = np.full(n, OK, dtype=np.int8)
+        status[~(glwFits & usdcFits)] = WEIGHT_NOT_UINT64
+        claimedBefore = (words[rows, limb] & bit) != 0
+
+        if state.totalGlwWeight == 0 or state.totalUSDCWeight == 0:
+            # nothing can be pushed, and whatever passes the checks divides by zero and reverts
+            status[(status == OK) & (glw > glwRoom)] = GLOW_WEIGHT_OVERFLOW
+            status[(status == OK) & (usdc > usdcRoom)] = USDC_WEIGHT_OVERFLOW
+            status[(status == OK) & claimedBefore] = USER_ALREADY_CLAIMED
+            status[status == OK] = DIVISION_BY_ZERO
+            return ClaimResult(status, np.zeros(n, dtype=object), np.zeros(n, dtype=object))
+
+        # assume no weight overflows: then a uint64 leaf succeeds unless its user claimed before the batch
+        # or in an earlier uint64 leaf of the batch
+        candidates = np.flatnonzero(status == OK)
+        _, first = np.unique(rows[candidates], return_index=True)
+        claimed = claimedBefore.copy()
+        repeat = np.ones(candidates.shape[0], dtype=bool)
+        repeat[first] = False
+        claimed[candidates[repeat]] = True
+        succeeds = (status == OK) & ~claimed
+        overflows = (status == OK) & (
+            _exceeds_room(np.where(succeeds, glw, 0), glw, glwRoom)
+            | _exceeds_room(np.where(succeeds, usdc, 0), usdc, usdcRoom)
+        )
+        # the first overflow breaks the assumption, from there on (a faulty report) the leaves are replayed one by one
+        stop = int(np.argmax(overflows)) if overflows.any() else n
+        status[:stop][(status[:stop] == OK) & claimed[:stop]] = USER_ALREADY_CLAIMED
+        pushed[0] += int(glw[:stop][succeeds[:stop]].sum(dtype=object) or 0)
+        pushed[1] += int(usdc[:stop][succeeds[:stop]].sum(dtype=object) or 0)
+        claimedRows = set(rows[:stop][status[:stop] == OK].tolist())
+        for i in range(stop, n):
+            if status[i] != OK:
+                continue
+            if pushed[0] + int(glw[i]) > state.totalGlwWeight:
+                status[i] = GLOW_WEIGHT_OVERFLOW
+            elif pushed[1] + int(usdc[i]) > state.totalUSDCWeight:
+                status[i] = USDC_WEIGHT_OVERFLOW
+            elif claimedBefore[i] or int(rows[i]) in claimedRows:
+                status[i] = USER_ALREADY_CLAIMED
+            else:
+                pushed[0] += int(glw[i])
+                pushed[1] += int(usdc[i])
+                claimedRows.add(int(rows[i]))
+
+        ok = status == OK
+        if ok.any() and bucketId not in self.minted_to_auction:
+            self.minted_to_auction[bucketId] = state.totalNewGCC
+        words[rows[ok], limb] |= bit
+
+        usdcPaid = np.zeros(n, dtype=object)
+        glwPaid = np.zeros(n, dtype=object)
+        if ok.any():
+            usdcPaid[ok] = usdc[ok].astype(object) * state.amountInBucket // state.totalUSDCWeight
+            glwPaid[ok] = glw[ok].astype(object) * GLOW_REWARDS_PER_BUCKET // state.totalGlwWeight
+        return ClaimResult(status, usdcPaid, glwPaid)
+
+
+def _as_uint64(values) -> tuple:
+    """
+    (uint64 array, fits) where `fits` marks the values that are a uint64, the others are stored as 0
+    """
+    if isinstance(values, np.ndarray) and values.dtype.kind == "u":
+        return values.astype(np.uint64, copy=False), np.ones(values.shape[0], dtype=bool)
+    objects = _as_objects(values)
+    fits = np.asarray((objects >= 0) & (objects <= UINT64_MASK), dtype=bool)
+    return np.where(fits, objects, 0).astype(np.uint64), fits
+
+
+def _exceeds_room(pushedWeights: np.ndarray, weights: np.ndarray, room: np.uint64) -> np.ndarray:
+    """
+    Whether the weights pushed before every leaf plus its own weight exceed `room`, without wrapping uint64
+    """
+    # the running sum can wrap, but only after a leaf where it exceeded the room (which is at most 2^64 - 1),
+    # and only the first leaf that exceeds the room is used
+    before = np.cumsum(pushedWeights, dtype=np.uint64) - pushedWeights
+    return (before > room) | (weights > room - np.minimum(before, room))
+
+
+def read_states_csv(path: str) -> dict:
+    """
+    bucketId -> (packedGlobalState, amountInBucket) from a csv with a `bucketId,packedGlobalState,amountInBucket` header,
+    the packed state may be decimal or 0x hex
+    """
+    states = {}
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            states[int(row["bucketId"])] = (int(row["packedGlobalState"], 0), int(row["amountInBucket"]))
+    return states
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Price out every leaf of a weekly report")
+    parser.add_argument("states", help="csv with a bucketId,packedGlobalState,amountInBucket header")
+    parser.add_argument("report", help="csv with a payoutWallet,glwWeight,usdcWeight header")
+    parser.add_argument("--bucket", type=int, required=True)
+    args = parser.parse_args()
+
+    states = read_states_csv(args.states)
+    engine = ClaimEngine(states.__getitem__)
+    with open(args.report, newline="") as f:
+        rows = list(csv.DictReader(f))
+    result = engine.claim(
+        args.bucket,
+        [r["payoutWallet"] for r in rows],
+        [r["glwWeight"] for r in rows],
+        [r["usdcWeight"] for r in rows],
+    )
+    writer = csv.writer(sys.stdout)
+    writer.writerow(["payoutWallet", "status", "usdc", "glw"])
+    for row, status, usdc, glw in zip(rows, result.status, result.usdc, result.glw):
+        writer.writerow([row["payoutWallet"], STATUS_NAMES[int(status)], usdc, glw])
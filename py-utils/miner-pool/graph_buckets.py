@@ -1,38 +1,185 @@
-import matplotlib.pyplot as plt
-import json 
+"""
+Exports the buckets test/Math/MinerDistributionMath.t.sol saves to data/buckets.json.
+
+The file is parsed incrementally (one bucket object at a time) and every bucket is written out as soon
+as it is read, so memory doesn't grow with the number of buckets (except for --plot, which needs every amount):
+    - data/buckets.csv with an `id,amountInBucket,inheritedFromLastWeek,amountToDeduct` header (always)
+    - one .npy file per column in a directory (with --npy), amount columns are uint64 when every amount fits,
+      otherwise (n, 4) little endian uint64 limbs of the uint256. The row count and the widths are only known
+      at the end of the file, so the columns are spooled to temporary files and copied into the .npy files
+    - a bar chart of amountInBucket rendered headlessly to an image (with --plot)
+numpy and matplotlib are only imported when .npy files or a plot are asked for, so the default run
+(the one `showGraph` triggers through `vm.ffi`) only needs the standard library.
+
+Usage (from the repo root, like the ffi call):
+    python3 ./py-utils/miner-pool/graph_buckets.py
+    python3 ./py-utils/miner-pool/graph_buckets.py --npy ./py-utils/miner-pool/data/buckets --plot buckets.png
+"""
+import argparse
 import csv
-import sys
+import json
+import os
+
 from constants import BUCKETS_FILE_NAME
 
 bucket_path = f"./py-utils/miner-pool/data/{BUCKETS_FILE_NAME}"
-#revert and exit
-def revert(message:str):
-    raise Exception(message)
-# revert("Error In Buckets")
-with open(bucket_path) as f:
-    data = json.load(f)
-    
+csv_path = "./py-utils/miner-pool/data/buckets.csv"
+FIELDNAMES = ["id", "amountInBucket", "inheritedFromLastWeek", "amountToDeduct"]
+_READ_SIZE = 1 << 16
+_UINT64_MAX = (1 << 64) - 1
+_WRITE_ROWS = 1 << 16
+
+
+def iter_buckets(path: str, read_size: int = _READ_SIZE):
+    """
+    Yields the objects of a json array one by one without loading the whole file
+    """
+    decoder = json.JSONDecoder()
+    with open(path) as f:
+        buffer = ""
+        pos = 0
+        started = False
+        eof = False
+        while True:
+            # skip whitespace and the array punctuation between objects
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,[]":
+                if buffer[pos] == "[":
+                    started = True
+                pos += 1
+            if pos == len(buffer):
+                if eof:
+                    return
+                buffer = f.read(read_size)
+                pos = 0
+                eof = not buffer
+                continue
+            if not started:
+                raise ValueError("expected a json array of buckets")
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # the object continues in the next read
+                more = f.read(read_size)
+                if not more:
+                    raise
+                buffer = buffer[pos:] + more
+                pos = 0
+                continue
+            yield value
+            pos = end
+
+
+class _Column:
+    """
+    .npy output of a column written while the file is read: the values are spooled to a temporary file
+    `_WRITE_ROWS` at a time (amounts as their 4 uint64 limbs, the dtype is only known at the end)
+    and copied block by block into the memory-mapped .npy by `save`
+    """
+
+    def __init__(self, kind: str, directory: str):
+        import tempfile
+
+        self.kind = kind
+        self.fits_uint64 = True
+        self.rows = 0
+        self.pending = []
+        self.spool = tempfile.TemporaryFile(dir=directory)
+
+    def append(self, value):
+        if self.kind == "int":
+            if not 0 <= value <= _UINT64_MAX:
+                self.fits_uint64 = False
+            value = [(value >> (64 * i)) & _UINT64_MAX for i in range(4)]
+        self.pending.append(value)
+        if len(self.pending) == _WRITE_ROWS:
+            self._spool()
+
+    def _spool(self):
+        import numpy as np
+
+        if self.pending:
+            np.array(self.pending, dtype=bool if self.kind == "bool" else "<u8").tofile(self.spool)
+            self.rows += len(self.pending)
+            self.pending = []
+
+    def save(self, path: str):
+        import numpy as np
+
+        self._spool()
+        self.spool.seek(0)
+        if self.kind == "bool":
+            dtype, width, shape = bool, 1, (self.rows,)
+        else:
+            dtype, width, shape = "<u8", 4, (self.rows,) if self.fits_uint64 else (self.rows, 4)
+        out = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+        for row in range(0, self.rows, _WRITE_ROWS):
+            block = np.fromfile(self.spool, dtype=dtype, count=_WRITE_ROWS * width)
+            if self.kind == "int":
+                block = block.reshape(-1, 4)
+                block = block[:, 0] if self.fits_uint64 else block
+            out[row:row + len(block)] = block
+        out.flush()
+        del out
+        self.spool.close()
+
+
+def export(source: str = bucket_path, csv_out: str = csv_path, npy_dir: str = None, collect: bool = False) -> dict:
+    """
+    Streams `source` into `csv_out` (and the .npy columns in `npy_dir`) in one pass.
+    Returns the number of buckets under "count", and the ids and amounts under "ids" / "amounts" when `collect` is set.
+    """
+    columns = None
+    if npy_dir:
+        os.makedirs(npy_dir, exist_ok=True)
+        columns = {name: _Column("bool" if name == "inheritedFromLastWeek" else "int", npy_dir) for name in FIELDNAMES}
     ids = []
     amounts = []
-    inheritedFromLastWeeks = []
-    amountToDeduct = []
-    for i in data:
-        ids.append(i['id'])
-        amounts.append(i['amountInBucket'])
-        inheritedFromLastWeeks.append(i['inheritedFromLastWeek'])
-        amountToDeduct.append(i['amountToDeduct'])
-
-    #write it to a csv 
-    with open('./py-utils/miner-pool/data/buckets.csv', 'w', newline='') as csvfile:
-        fieldnames = ['id', 'amountInBucket', 'inheritedFromLastWeek', 'amountToDeduct']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        for i in range(len(ids)):
-            writer.writerow({'id': ids[i], 'amountInBucket': amounts[i], 'inheritedFromLastWeek': inheritedFromLastWeeks[i], 'amountToDeduct': amountToDeduct[i]})
-
-    #plot the data
-    plt.bar(ids,amounts)
-    plt.xlabel('Bucket ID')
-    plt.ylabel('Amount in Bucket')
-    plt.title('Amount in each Bucket')
-    plt.show()
\ No newline at end of file
+    count = 0
+    with open(csv_out, "w", newline="") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(FIELDNAMES)
+        for bucket in iter_buckets(source):
+            row = [bucket[name] for name in FIELDNAMES]
+            writer.writerow(row)
+            if columns is not None:
+                for name, value in zip(FIELDNAMES, row):
+                    columns[name].append(value)
+            if collect:
+                ids.append(bucket["id"])
+                amounts.append(bucket["amountInBucket"])
+            count += 1
+    if columns is not None:
+        for name, column in columns.items():
+            column.save(os.path.join(npy_dir, f"{name}.npy"))
+    return {"count": count, "ids": ids, "amounts": amounts}
+
+
+def plot(ids, amounts, out: str):
+    """
+    Bar chart of the amount in every bucket, rendered without a display
+    """
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots()
+    ax.bar(ids, [float(a) for a in amounts])
+    ax.set_xlabel("Bucket ID")
+    ax.set_ylabel("Amount in Bucket")
+    ax.set_title("Amount in each Bucket")
+    fig.savefig(out)
+    plt.close(fig)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the buckets saved by MinerDistributionMath.t.sol")
+    parser.add_argument("--input", default=bucket_path)
+    parser.add_argument("--csv", default=csv_path)
+    parser.add_argument("--npy", default=None, metavar="DIR", help="also write one .npy file per column to DIR")
+    parser.add_argument("--plot", default=None, metavar="FILE", help="render the amounts to an image file")
+    args = parser.parse_args()
+
+    result = export(args.input, args.csv, args.npy, collect=args.plot is not None)
+    if args.plot is not None:
+        plot(result["ids"], result["amounts"], args.plot)
@@ -0,0 +1,113 @@
+"""
+Batched keccak256 (the Ethereum one, not NIST SHA3-256) in numpy.
+
+`keccak256_batch` hashes many equal-length messages (shorter than one 136 byte block) at once:
+the 25 lanes of every state are kept as a (5, 5, n) uint64 array so every step of Keccak-f[1600]
+is a handful of array operations over all messages.
+Messages are processed in blocks of `_BLOCK` lanes to stay in cache.
+"""
+import numpy as np
+
+RATE = 136
+_BLOCK = 2048
+
+_ROUND_CONSTANTS = np.array(
+    [
+        0x0000000000000001, 0x0000000000008082, 0x800000000000808A, 0x8000000080008000,
+        0x000000000000808B, 0x0000000080000001, 0x8000000080008081, 0x8000000000008009,
+        0x000000000000008A, 0x0000000000000088, 0x0000000080008009, 0x000000008000000A,
+        0x000000008000808B, 0x800000000000008B, 0x8000000000008089, 0x8000000000008003,
+        0x8000000000008002, 0x8000000000000080, 0x000000000000800A, 0x800000008000000A,
+        0x8000000080008081, 0x8000000000008080, 0x0000000080000001, 0x8000000080008008,
+    ],
+    dtype=np.uint64,
+)
+
+# rotation offsets r[x][y]
+_ROTATIONS = [
+    [0, 36, 3, 41, 18],
+    [1, 44, 10, 45, 2],
+    [62, 6, 43, 15, 61],
+    [28, 55, 25, 21, 56],
+    [27, 20, 39, 8, 14],
+]
+
+# the state is laid out as A[x, y] -> flat index x * 5 + y
+_LEFT = np.array([_ROTATIONS[x][y] for x in range(5) for y in range(5)], dtype=np.uint64).reshape(25, 1)
+_RIGHT = (np.uint64(64) - _LEFT) % np.uint64(64)
+# pi: B[y, 2x + 3y] = A[x, y]
+_PI = np.empty(25, dtype=np.intp)
+for _x in range(5):
+    for _y in range(5):
+        _PI[_y * 5 + (2 * _x + 3 * _y) % 5] = _x * 5 + _y
+# lane i of the message block is A[i % 5, i // 5]
+_LANE_TO_FLAT = np.array([(i % 5) * 5 + i // 5 for i in range(RATE // 8)], dtype=np.intp)
+# x + 1, x - 1 and x + 2 along the first axis
+_NEXT = np.array([1, 2, 3, 4, 0], dtype=np.intp)
+_PREV = np.array([4, 0, 1, 2, 3], dtype=np.intp)
+_NEXT_NEXT = np.array([2, 3, 4, 0, 1], dtype=np.intp)
+_ONE = np.uint64(1)
+_SIXTY_THREE = np.uint64(63)
+
+
+def keccak_f(state: np.ndarray) -> np.ndarray:
+    """
+    Keccak-f[1600] on a (25, n) uint64 state (flat index x * 5 + y), returns the new state.
+    The input array is overwritten.
+    """
+    n = state.shape[1]
+    A = state.reshape(5, 5, n)
+    rotated = np.empty((25, n), dtype=np.uint64)
+    for rc in _ROUND_CONSTANTS:
+        # theta
+        C = np.bitwise_xor.reduce(A, axis=1)
+        C1 = C[_NEXT]
+        D = C[_PREV]
+        D ^= (C1 << _ONE) | (C1 >> _SIXTY_THREE)
+        A ^= D[:, None, :]
+        # rho and pi
+        flat = A.reshape(25, n)
+        np.left_shift(flat, _LEFT, out=rotated)
+        flat >>= _RIGHT
+        rotated |= flat
+        B = rotated[_PI].reshape(5, 5, n)
+        # chi
+        A = np.invert(B[_NEXT])
+        A &= B[_NEXT_NEXT]
+        A ^= B
+        # iota
+        A[0, 0] ^= rc
+    return A.reshape(25, n)
+
+
+def keccak256_batch(messages: np.ndarray) -> np.ndarray:
+    """
+    keccak256 of every row of an (n, L) uint8 array (L < 136), returns an (n, 32) uint8 array
+    """
+    messages = np.ascontiguousarray(messages, dtype=np.uint8)
+    n, length = messages.shape
+    if length >= RATE:
+        raise ValueError(f"messages must be shorter than {RATE} bytes")
+    out = np.empty((n, 32), dtype=np.uint8)
+    for start in range(0, n, _BLOCK):
+        stop = min(start + _BLOCK, n)
+        block = np.zeros((stop - start, RATE), dtype=np.uint8)
+        block[:, :length] = messages[start:stop]
+        # keccak padding (pad10*1 with the 0x01 domain byte)
+        block[:, length] ^= 0x01
+        block[:, RATE - 1] ^= 0x80
+        lanes = block.view("<u8").T
+        state = np.zeros((25, stop - start), dtype=np.uint64)
+        state[_LANE_TO_FLAT] = lanes
+        state = keccak_f(state)
+        # the digest is lanes 0..3, i.e. A[0..3, 0]
+        digest = np.ascontiguousarray(state[[0, 5, 10, 15]].T).astype("<u8")
+        out[start:stop] = digest.view(np.uint8).reshape(-1, 32)
+    return out
+
+
+def keccak256(data: bytes) -> bytes:
+    """
+    keccak256 of a single message shorter than one block
+    """
+    return keccak256_batch(np.frombuffer(data, dtype=np.uint8).reshape(1, -1))[0].tobytes()
@@ -0,0 +1,373 @@
+"""
+Streaming builder and bulk proof server for the weekly-report Merkle trees.
+
+GCAs submit one root per bucket in `GCA.submitWeeklyReport` and miners claim in
+`MinerPoolAndGCA.claimRewardFromBucket` with the leaf
+
+    keccak256(abi.encodePacked(payoutWallet, glwWeight, usdcWeight))
+
+which `_checkProof` verifies with solady's `MerkleProofLib` (hashes of sorted pairs).
+The tree is the one test/MinerPoolAndGCA/CreateMerkleRoot.ts builds with merkletreejs `{ sort: true }`:
+    - the leaves are sorted (byte order)
+    - every pair is hashed sorted, `keccak256(min(a, b) ++ max(a, b))`
+    - an odd node at the end of a level is promoted to the next level unchanged
+so the roots and proofs are interchangeable with the ones from the TS scripts.
+
+Leaves are read in chunks and hashed with the batched keccak in keccak.py, every level is hashed in one
+vectorized pass over the level below. The whole tree is persisted in a directory as
+    nodes.bin - every level, leaves first, as consecutive 32 byte rows
+    meta.json - the number of leaves, the offset and size of every level and the root
+and `MerkleTree.open` memory maps it, so proofs are served without rebuilding (or even reading) the tree.
+A proof for a leaf is a binary search in the sorted leaves plus one row per level.
+
+Usage:
+    python3 merkle_tree.py build leaves.csv tree/           # leaves.csv has a payoutWallet,glwWeight,usdcWeight header
+    python3 merkle_tree.py build hashes.txt tree/ --hashed  # one 0x leaf hash per line
+    python3 merkle_tree.py root tree/
+    python3 merkle_tree.py proof tree/ 0xWallet 100 200
+    python3 merkle_tree.py proofs tree/ leaves.csv > proofs.jsonl
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from keccak import keccak256_batch
+
+LEAF_BYTES = 20 + 32 + 32
+NODES_FILE_NAME = "nodes.bin"
+META_FILE_NAME = "meta.json"
+CHUNK_SIZE = 1 << 16
+# levels smaller than this are hashed in-process even when workers are given
+_PARALLEL_THRESHOLD = 1 << 18
+
+
+# -------------------------------------------------------------------------- #
+#                                   leaves                                    #
+# -------------------------------------------------------------------------- #
+
+
+def encode_leaves(payoutWallets, glwWeights, usdcWeights) -> np.ndarray:
+    """
+    `abi.encodePacked(payoutWallet, glwWeight, usdcWeight)` for every leaf, an (n, 84) uint8 array.
+    Wallets are 0x hex strings or 20 byte values, weights are ints below 2^256.
+    """
+    n = len(payoutWallets)
+    packed = np.empty((n, LEAF_BYTES), dtype=np.uint8)
+    buffer = bytearray(n * LEAF_BYTES)
+    for i, (wallet, glwWeight, usdcWeight) in enumerate(zip(payoutWallets, glwWeights, usdcWeights)):
+        if isinstance(wallet, str):
+            wallet = bytes.fromhex(wallet[2:] if wallet.startswith("0x") else wallet)
+        if len(wallet) != 20:
+            raise ValueError(f"payout wallet {i} is not 20 bytes")
+        offset = i * LEAF_BYTES
+        buffer[offset : offset + 20] = wallet
+        buffer[offset + 20 : offset + 52] = int(glwWeight).to_bytes(32, "big")
+        buffer[offset + 52 : offset + 84] = int(usdcWeight).to_bytes(32, "big")
+    packed[:] = np.frombuffer(bytes(buffer), dtype=np.uint8).reshape(n, LEAF_BYTES)
+    return packed
+
+
+def leaf_hashes(payoutWallets, glwWeights, usdcWeights) -> np.ndarray:
+    """
+    The leaves `_checkProof` computes, an (n, 32) uint8 array
+    """
+    return keccak256_batch(encode_leaves(payoutWallets, glwWeights, usdcWeights))
+
+
+def read_leaves_csv(path: str, chunk_size: int = CHUNK_SIZE):
+    """
+    Yields (n, 32) leaf hash chunks from a csv with a `payoutWallet,glwWeight,usdcWeight` header
+    """
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        rows = []
+        for row in reader:
+            rows.append((row["payoutWallet"], row["glwWeight"], row["usdcWeight"]))
+            if len(rows) == chunk_size:
+                yield leaf_hashes(*zip(*rows))
+                rows = []
+        if rows:
+            yield leaf_hashes(*zip(*rows))
+
+
+def read_leaf_hashes(path: str, chunk_size: int = CHUNK_SIZE):
+    """
+    Yields (n, 32) leaf hash chunks from a file with one already hashed 0x leaf per line
+    (what CreateMerkleRoot.ts takes as `--leaves`)
+    """
+    with open(path) as f:
+        chunk = []
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if len(line) != 66:
+                raise ValueError("Leaves must be 32 bytes long")
+            chunk.append(bytes.fromhex(line[2:]))
+            if len(chunk) == chunk_size:
+                yield np.frombuffer(b"".join(chunk), dtype=np.uint8).reshape(-1, 32)
+                chunk = []
+        if chunk:
+            yield np.frombuffer(b"".join(chunk), dtype=np.uint8).reshape(-1, 32)
+
+
+# -------------------------------------------------------------------------- #
+#                                   levels                                    #
+# -------------------------------------------------------------------------- #
+
+
+def level_sizes(n: int) -> list:
+    """
+    Number of nodes on every level, leaves first (an odd node is promoted, so m -> ceil(m / 2))
+    """
+    if n <= 0:
+        raise ValueError("a tree needs at least one leaf")
+    sizes = [n]
+    while sizes[-1] > 1:
+        sizes.append((sizes[-1] + 1) // 2)
+    return sizes
+
+
+def hash_sorted_pairs(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """
+    keccak256 of every (left, right) pair of 32 byte rows, smaller node first
+    """
+    left = np.ascontiguousarray(left)
+    right = np.ascontiguousarray(right)
+    a = left.view(">u8")
+    b = right.view(">u8")
+    # lexicographic left > right over the four big endian words
+    greater = a[:, 3] > b[:, 3]
+    for word in (2, 1, 0):
+        greater = (a[:, word] > b[:, word]) | ((a[:, word] == b[:, word]) & greater)
+    pairs = np.empty((left.shape[0], 64), dtype=np.uint8)
+    pairs[:, :32] = np.where(greater[:, None], right, left)
+    pairs[:, 32:] = np.where(greater[:, None], left, right)
+    return keccak256_batch(pairs)
+
+
+def _hash_level_chunk(args):
+    path, offset, start, stop, out_offset = args
+    nodes = np.memmap(path, dtype=np.uint8, mode="r+").reshape(-1, 32)
+    nodes[out_offset + start : out_offset + stop] = hash_sorted_pairs(
+        nodes[offset + 2 * start : offset + 2 * stop : 2], nodes[offset + 2 * start + 1 : offset + 2 * stop : 2]
+    )
+    nodes.flush()
+
+
+def _hash_level(nodes: np.ndarray, path: str, offset: int, size: int, out_offset: int, pool):
+    pairs = size // 2
+    if pool is not None and pairs >= _PARALLEL_THRESHOLD:
+        nodes.flush()
+        tasks = [
+            (path, offset, start, min(start + CHUNK_SIZE, pairs), out_offset) for start in range(0, pairs, CHUNK_SIZE)
+        ]
+        list(pool.map(_hash_level_chunk, tasks))
+    else:
+        for start in range(0, pairs, CHUNK_SIZE):
+            stop = min(start + CHUNK_SIZE, pairs)
+            nodes[out_offset + start : out_offset + stop] = hash_sorted_pairs(
+                nodes[offset + 2 * start : offset + 2 * stop : 2], nodes[offset + 2 * start + 1 : offset + 2 * stop : 2]
+            )
+    if size % 2:
+        nodes[out_offset + pairs] = nodes[offset + size - 1]
+
+
+def build(leafChunks, directory: str, workers: int = 0) -> "MerkleTree":
+    """
+    Builds the tree of the leaf hashes yielded by `leafChunks` ((k, 32) uint8 arrays, any order)
+    into `directory` and returns it opened. With `workers` > 0 large levels are hashed by a process pool.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, NODES_FILE_NAME)
+    unsorted_path = path + ".unsorted"
+
+    # spill the leaf hashes to disk so only one chunk of input is in memory
+    n = 0
+    with open(unsorted_path, "wb") as f:
+        for chunk in leafChunks:
+            chunk = np.ascontiguousarray(chunk, dtype=np.uint8)
+            f.write(chunk.tobytes())
+            n += chunk.shape[0]
+    sizes = level_sizes(n)
+    offsets = np.concatenate([[0], np.cumsum(sizes)]).tolist()
+
+    unsorted = np.memmap(unsorted_path, dtype=np.uint8, mode="r").reshape(n, 32)
+    nodes = np.memmap(path, dtype=np.uint8, mode="w+", shape=(offsets[-1], 32))
+    # void rows compare like memcmp, so this is the byte order merkletreejs sorts the leaves in
+    nodes[:n] = unsorted[np.argsort(unsorted.view("V32").ravel(), kind="stable")]
+    del unsorted
+    os.remove(unsorted_path)
+
+    pool = ProcessPoolExecutor(workers) if workers > 0 and n // 2 >= _PARALLEL_THRESHOLD else None
+    try:
+        for level, size in enumerate(sizes[:-1]):
+            _hash_level(nodes, path, offsets[level], size, offsets[level + 1], pool)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    nodes.flush()
+
+    meta = {
+        "leaves": n,
+        "levels": [{"offset": offset, "size": size} for offset, size in zip(offsets, sizes)],
+        "root": "0x" + bytes(nodes[offsets[-2]]).hex(),
+    }
+    del nodes
+    with open(os.path.join(directory, META_FILE_NAME), "w") as f:
+        json.dump(meta, f, indent=2)
+    return MerkleTree.open(directory)
+
+
+# -------------------------------------------------------------------------- #
+#                                proof server                                 #
+# -------------------------------------------------------------------------- #
+
+
+class MerkleTree:
+    def __init__(self, nodes: np.ndarray, offsets: list, sizes: list):
+        self.nodes = nodes
+        self.offsets = offsets
+        self.sizes = sizes
+        self.leaves = nodes[: sizes[0]]
+        self._sortedLeaves = self.leaves.view("V32").ravel()
+        # the first 8 bytes of every leaf as a native integer, searched before comparing whole leaves
+        self._prefixes = self.leaves.view(">u8")[:, 0].astype(np.uint64)
+
+    @classmethod
+    def open(cls, directory: str) -> "MerkleTree":
+        with open(os.path.join(directory, META_FILE_NAME)) as f:
+            meta = json.load(f)
+        nodes = np.memmap(os.path.join(directory, NODES_FILE_NAME), dtype=np.uint8, mode="r").reshape(-1, 32)
+        return cls(nodes, [l["offset"] for l in meta["levels"]], [l["size"] for l in meta["levels"]])
+
+    def __len__(self):
+        return self.sizes[0]
+
+    @property
+    def root(self) -> bytes:
+        return bytes(self.nodes[self.offsets[-1]])
+
+    @property
+    def depth(self) -> int:
+        return len(self.sizes) - 1
+
+    def find(self, leafHashes) -> np.ndarray:
+        """
+        Index of every leaf hash ((k, 32) uint8 array or list of bytes) in the sorted leaves, -1 if it isn't a leaf
+        """
+        if not isinstance(leafHashes, np.ndarray):
+            leafHashes = np.frombuffer(b"".join(leafHashes), dtype=np.uint8).reshape(-1, 32)
+        leafHashes = np.ascontiguousarray(leafHashes, dtype=np.uint8)
+        keys = leafHashes.view("V32").ravel()
+        idx = np.searchsorted(self._prefixes, leafHashes.view(">u8")[:, 0].astype(np.uint64))
+        found = idx < len(self)
+        found[found] = self._sortedLeaves[idx[found]] == keys[found]
+        # leaves sharing their first 8 bytes with another leaf need the full search
+        retry = np.flatnonzero(~found & (idx < len(self) - 1))
+        if retry.size:
+            idx[retry] = np.searchsorted(self._sortedLeaves, keys[retry])
+            again = idx[retry] < len(self)
+            found[retry[again]] = self._sortedLeaves[idx[retry[again]]] == keys[retry[again]]
+        return np.where(found, idx, -1)
+
+    def proofs(self, indices) -> tuple:
+        """
+        Proofs for many leaf indices at once.
+
+        Returns (siblings, present): siblings is a (k, depth, 32) uint8 array and present a (k, depth) bool array,
+        a level where the node has no sibling (the odd node that was promoted) contributes nothing to the proof,
+        so the proof of leaf j is `siblings[j][present[j]]`.
+        """
+        idx = np.asarray(indices, dtype=np.int64).copy()
+        if idx.size and (idx.min() < 0 or idx.max() >= len(self)):
+            raise IndexError("leaf index out of range")
+        siblings = np.zeros((idx.shape[0], self.depth, 32), dtype=np.uint8)
+        present = np.zeros((idx.shape[0], self.depth), dtype=bool)
+        for level in range(self.depth):
+            sibling = idx ^ 1
+            has = sibling < self.sizes[level]
+            present[:, level] = has
+            # a missing sibling reads some other node of the level, masked out by `present`
+            siblings[:, level] = self.nodes[self.offsets[level] + np.minimum(sibling, self.sizes[level] - 1)]
+            idx >>= 1
+        return siblings, present
+
+    def proof(self, index: int) -> list:
+        """
+        The proof of the leaf at `index` (of the sorted leaves), a list of 32 byte nodes
+        """
+        siblings, present = self.proofs([index])
+        return [bytes(node) for node in siblings[0][present[0]]]
+
+    def proof_for(self, payoutWallet, glwWeight: int, usdcWeight: int) -> list:
+        """
+        The proof `claimRewardFromBucket` takes for a leaf
+        """
+        index = int(self.find(leaf_hashes([payoutWallet], [glwWeight], [usdcWeight]))[0])
+        if index < 0:
+            raise KeyError("leaf is not in the tree")
+        return self.proof(index)
+
+
+def verify(proof, root: bytes, leaf: bytes) -> bool:
+    """
+    `MerkleProofLib.verify`: hash the leaf up with every proof node, sorted pairs
+    """
+    node = np.frombuffer(leaf, dtype=np.uint8).reshape(1, 32)
+    for sibling in proof:
+        node = hash_sorted_pairs(node, np.frombuffer(sibling, dtype=np.uint8).reshape(1, 32))
+    return bytes(node[0]) == root
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build weekly-report Merkle trees and serve proofs")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = commands.add_parser("build", help="build a tree from a leaves file")
+    build_parser.add_argument("leaves", help="csv with a payoutWallet,glwWeight,usdcWeight header")
+    build_parser.add_argument("directory")
+    build_parser.add_argument("--hashed", action="store_true", help="the file has one 0x leaf hash per line")
+    build_parser.add_argument("--workers", type=int, default=0)
+
+    root_parser = commands.add_parser("root", help="print the root of a built tree")
+    root_parser.add_argument("directory")
+
+    proof_parser = commands.add_parser("proof", help="print the proof of one leaf")
+    proof_parser.add_argument("directory")
+    proof_parser.add_argument("payoutWallet")
+    proof_parser.add_argument("glwWeight", type=int)
+    proof_parser.add_argument("usdcWeight", type=int)
+
+    proofs_parser = commands.add_parser("proofs", help="print one json line per leaf of a leaves csv")
+    proofs_parser.add_argument("directory")
+    proofs_parser.add_argument("leaves", help="csv with a payoutWallet,glwWeight,usdcWeight header")
+
+    args = parser.parse_args()
+    if args.command == "build":
+        chunks = read_leaf_hashes(args.leaves) if args.hashed else read_leaves_csv(args.leaves)
+        print("0x" + build(chunks, args.directory, args.workers).root.hex())
+    elif args.command == "root":
+        print("0x" + MerkleTree.open(args.directory).root.hex())
+    elif args.command == "proof":
+        tree = MerkleTree.open(args.directory)
+        print(json.dumps(["0x" + node.hex() for node in tree.proof_for(args.payoutWallet, args.glwWeight, args.usdcWeight)]))
+    else:
+        tree = MerkleTree.open(args.directory)
+        with open(args.leaves, newline="") as f:
+            rows = list(csv.DictReader(f))
+        for start in range(0, len(rows), CHUNK_SIZE):
+            chunk = rows[start : start + CHUNK_SIZE]
+            leaves = leaf_hashes(*zip(*((r["payoutWallet"], r["glwWeight"], r["usdcWeight"]) for r in chunk)))
+            idx = tree.find(leaves)
+            if (idx < 0).any():
+                raise KeyError(f"leaf {start + int(np.flatnonzero(idx < 0)[0])} is not in the tree")
+            siblings, present = tree.proofs(idx)
+            for row, nodes, has in zip(chunk, siblings, present):
+                proof = ["0x" + bytes(node).hex() for node in nodes[has]]
+                sys.stdout.write(json.dumps({"payoutWallet": row["payoutWallet"], "proof": proof}) + "\n")
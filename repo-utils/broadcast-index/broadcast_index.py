@@ -0,0 +1,372 @@
+"""
+SQLite index over the Foundry broadcast artifacts (broadcast/<Script>.s.sol/<chainId>/run-*.json).
+
+Every run file is read once and reduced to:
+    runs          one row per file: script, chain, run timestamp, commit, whether it is run-latest.json
+    transactions  hash, type, contract, function, from / to, nonce, gas limit, value and its receipt
+                  (block, gas used, effective gas price, status), matched by transaction hash
+    contracts     every address a run created: the CREATE / CREATE2 transactions and their `additionalContracts`
+The bytecode (`input` / `initCode`) isn't stored, only its size.
+
+Updates are incremental: a file whose size and mtime didn't change is skipped, a changed one is hashed and only
+re-read when its content changed, files that disappeared are dropped from the index.
+run-latest.json is a copy of the newest run-<timestamp>.json of its directory, so queries leave it out
+unless asked for (`latest=True` looks only at the latest runs).
+
+Usage (from the repo root):
+    python3 repo-utils/broadcast-index/broadcast_index.py update
+    python3 repo-utils/broadcast-index/broadcast_index.py address GCC --chain 5
+    python3 repo-utils/broadcast-index/broadcast_index.py address GCC --chain 5 --run 1697551551
+    python3 repo-utils/broadcast-index/broadcast_index.py contracts --chain 5 --run 1697551551
+    python3 repo-utils/broadcast-index/broadcast_index.py tx 0x5be6f6dd...
+    python3 repo-utils/broadcast-index/broadcast_index.py gas --script DeployGuardedLaunch --chain 5
+The index lives in the .git directory (broadcast-index.sqlite) unless --db is given.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+
+BROADCAST_DIR = "broadcast"
+DB_FILE_NAME = "broadcast-index.sqlite"
+_SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    script TEXT NOT NULL,
+    chain INTEGER NOT NULL,
+    run INTEGER NOT NULL,
+    latest INTEGER NOT NULL,
+    git_commit TEXT,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    hash TEXT,
+    type TEXT,
+    contract_name TEXT,
+    contract_address TEXT,
+    function TEXT,
+    arguments TEXT,
+    sender TEXT,
+    recipient TEXT,
+    nonce INTEGER,
+    gas_limit INTEGER,
+    value TEXT,
+    input_size INTEGER,
+    block_number INTEGER,
+    gas_used INTEGER,
+    effective_gas_price INTEGER,
+    status INTEGER,
+    PRIMARY KEY (run_id, position)
+);
+CREATE TABLE IF NOT EXISTS contracts (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT,
+    address TEXT NOT NULL,
+    kind TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transactions_hash ON transactions(hash);
+CREATE INDEX IF NOT EXISTS contracts_name ON contracts(name);
+CREATE INDEX IF NOT EXISTS contracts_address ON contracts(address);
+CREATE INDEX IF NOT EXISTS runs_chain ON runs(chain, run);
+"""
+
+
+def default_db_path(root: str = ".") -> str:
+    try:
+        gitDir = subprocess.run(["git", "-C", root, "rev-parse", "--absolute-git-dir"], check=True,
+                                capture_output=True).stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return os.path.join(root, DB_FILE_NAME)
+    return os.path.join(gitDir, DB_FILE_NAME)
+
+
+def _int(value):
+    """
+    Receipt / transaction quantities are hex strings, a few older files have plain numbers
+    """
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return value
+    return int(value, 16) if value.startswith("0x") else int(value)
+
+
+def _lower(address):
+    return address.lower() if address else None
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_run(data: dict) -> tuple:
+    """
+    (transaction rows, contract rows) of a run file, without the run id
+    """
+    receipts = {r.get("transactionHash"): r for r in data.get("receipts", [])}
+    transactions = []
+    contracts = []
+    for position, tx in enumerate(data.get("transactions", [])):
+        inner = tx.get("transaction") or {}
+        receipt = receipts.get(tx.get("hash")) or {}
+        calldata = inner.get("input") or inner.get("data") or ""
+        txType = tx.get("transactionType")
+        value = _int(inner.get("value"))
+        transactions.append((
+            position,
+            _lower(tx.get("hash")),
+            txType,
+            tx.get("contractName"),
+            _lower(tx.get("contractAddress")),
+            tx.get("function"),
+            None if tx.get("arguments") is None else json.dumps(tx["arguments"]),
+            _lower(inner.get("from")),
+            _lower(inner.get("to")),
+            _int(inner.get("nonce")),
+            _int(inner.get("gas")),
+            None if value is None else str(value),  # can exceed sqlite's int64
+            max(len(calldata) - 2, 0) // 2,
+            _int(receipt.get("blockNumber")),
+            _int(receipt.get("gasUsed")),
+            _int(receipt.get("effectiveGasPrice")),
+            _int(receipt.get("status")),
+        ))
+        if txType in ("CREATE", "CREATE2") and tx.get("contractAddress"):
+            contracts.append((position, tx.get("contractName"), _lower(tx["contractAddress"]), txType))
+        for extra in tx.get("additionalContracts") or []:
+            if extra.get("address"):
+                contracts.append((position, extra.get("contractName"), _lower(extra["address"]),
+                                  f"additional {extra.get('transactionType', '')}".strip()))
+    return transactions, contracts
+
+
+class BroadcastIndex:
+    def __init__(self, db: str = None, root: str = "."):
+        self.root = root
+        self.db = db or default_db_path(root)
+        self.connection = sqlite3.connect(self.db)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+            self.connection.executescript("DROP TABLE IF EXISTS contracts; DROP TABLE IF EXISTS transactions; DROP TABLE IF EXISTS runs;")
+            self.connection.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+        self.connection.executescript(_SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------------------------------------------------------------------- #
+    #                                 update                                  #
+    # ---------------------------------------------------------------------- #
+
+    def _run_files(self, broadcastDir: str):
+        """
+        (relative path, script, chain, latest) of every run file
+        """
+        base = os.path.join(self.root, broadcastDir)
+        for script in sorted(os.listdir(base)) if os.path.isdir(base) else []:
+            for chain in sorted(os.listdir(os.path.join(base, script))):
+                chainDir = os.path.join(base, script, chain)
+                if not chain.isdigit() or not os.path.isdir(chainDir):
+                    continue
+                for name in sorted(os.listdir(chainDir)):
+                    if not (name.startswith("run-") and name.endswith(".json")):
+                        continue
+                    stem = name[len("run-") : -len(".json")]
+                    if stem != "latest" and not stem.isdigit():
+                        continue
+                    scriptName = script[: -len(".s.sol")] if script.endswith(".s.sol") else script
+                    yield os.path.join(broadcastDir, script, chain, name), scriptName, int(chain), stem == "latest"
+
+    def update(self, broadcastDir: str = BROADCAST_DIR) -> dict:
+        """
+        Brings the index in line with the run files, returns the number of files added / updated / removed / unchanged
+        """
+        known = {path: (runId, size, mtime, digest) for runId, path, size, mtime, digest in
+                 self.connection.execute("SELECT id, path, size, mtime_ns, sha256 FROM runs")}
+        counts = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        seen = set()
+        with self.connection:
+            for path, script, chain, latest in self._run_files(broadcastDir):
+                seen.add(path)
+                stat = os.stat(os.path.join(self.root, path))
+                previous = known.get(path)
+                if previous is not None and previous[1:3] == (stat.st_size, stat.st_mtime_ns):
+                    counts["unchanged"] += 1
+                    continue
+                digest = _sha256(os.path.join(self.root, path))
+                if previous is not None and previous[3] == digest:
+                    self.connection.execute("UPDATE runs SET size = ?, mtime_ns = ? WHERE id = ?",
+                                            (stat.st_size, stat.st_mtime_ns, previous[0]))
+                    counts["unchanged"] += 1
+                    continue
+                with open(os.path.join(self.root, path), "rb") as f:
+                    data = json.load(f)
+                if previous is not None:
+                    self.connection.execute("DELETE FROM runs WHERE id = ?", (previous[0],))
+                runId = self.connection.execute(
+                    "INSERT INTO runs (path, script, chain, run, latest, git_commit, size, mtime_ns, sha256)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (path, script, chain, int(data.get("timestamp", 0)), int(latest), data.get("commit"),
+                     stat.st_size, stat.st_mtime_ns, digest),
+                ).lastrowid
+                transactions, contracts = parse_run(data)
+                self.connection.executemany(
+                    f"INSERT INTO transactions VALUES ({', '.join(['?'] * 18)})", [(runId,) + row for row in transactions]
+                )
+                self.connection.executemany("INSERT INTO contracts VALUES (?, ?, ?, ?, ?)", [(runId,) + row for row in contracts])
+                counts["updated" if previous is not None else "added"] += 1
+            for path, (runId, *_) in known.items():
+                if path not in seen:
+                    self.connection.execute("DELETE FROM runs WHERE id = ?", (runId,))
+                    counts["removed"] += 1
+        return counts
+
+    # ---------------------------------------------------------------------- #
+    #                                 queries                                 #
+    # ---------------------------------------------------------------------- #
+
+    @staticmethod
+    def _filters(chain=None, run=None, script=None, latest=False) -> tuple:
+        clauses = ["runs.latest = ?"]
+        params = [int(latest)]
+        for column, value in (("runs.chain", chain), ("runs.run", run), ("runs.script", script)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        return " AND ".join(clauses), params
+
+    def _query(self, sql: str, params) -> list:
+        cursor = self.connection.execute(sql, params)
+        columns = [c[0] for c in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor]
+
+    def address(self, name: str, chain: int = None, run: int = None, script: str = None, latest: bool = False) -> list:
+        """
+        Deployments of contract `name`, newest run first
+        """
+        where, params = self._filters(chain, run, script, latest)
+        return self._query(
+            "SELECT contracts.address, contracts.kind, runs.script, runs.chain, runs.run, runs.git_commit, runs.path"
+            f" FROM contracts JOIN runs ON runs.id = contracts.run_id WHERE contracts.name = ? AND {where}"
+            " ORDER BY runs.run DESC, contracts.position",
+            [name] + params,
+        )
+
+    def contracts(self, chain: int = None, run: int = None, script: str = None, latest: bool = False) -> list:
+        where, params = self._filters(chain, run, script, latest)
+        return self._query(
+            "SELECT contracts.name, contracts.address, contracts.kind, runs.script, runs.chain, runs.run"
+            f" FROM contracts JOIN runs ON runs.id = contracts.run_id WHERE {where}"
+            " ORDER BY runs.run DESC, contracts.position",
+            params,
+        )
+
+    def find_address(self, address: str) -> list:
+        """
+        Which contract an address is, in every run that created it
+        """
+        return self._query(
+            "SELECT contracts.name, contracts.kind, runs.script, runs.chain, runs.run, runs.latest, runs.path"
+            " FROM contracts JOIN runs ON runs.id = contracts.run_id WHERE contracts.address = ? ORDER BY runs.run DESC",
+            [address.lower()],
+        )
+
+    def transaction(self, txHash: str) -> list:
+        return self._query(
+            "SELECT transactions.*, runs.script, runs.chain, runs.run, runs.latest, runs.path"
+            " FROM transactions JOIN runs ON runs.id = transactions.run_id WHERE transactions.hash = ?",
+            [txHash.lower()],
+        )
+
+    def gas_totals(self, chain: int = None, run: int = None, script: str = None, latest: bool = False) -> list:
+        """
+        Per run: transactions, receipts, total gas used and total fee in wei (fees summed in python, they overflow int64)
+        """
+        where, params = self._filters(chain, run, script, latest)
+        totals = {}
+        for runId, script_, chain_, run_, position, gasUsed, price in self.connection.execute(
+            "SELECT runs.id, runs.script, runs.chain, runs.run, transactions.position, transactions.gas_used,"
+            " transactions.effective_gas_price"
+            f" FROM runs LEFT JOIN transactions ON transactions.run_id = runs.id WHERE {where}"
+            " ORDER BY runs.run, transactions.position",
+            params,
+        ):
+            row = totals.setdefault(runId, {"script": script_, "chain": chain_, "run": run_, "transactions": 0,
+                                            "receipts": 0, "gas_used": 0, "fee_wei": 0})
+            # position is NOT NULL, it is only null on the LEFT JOIN row of a run without transactions
+            if position is not None:
+                row["transactions"] += 1
+            if gasUsed is not None:
+                row["receipts"] += 1
+                row["gas_used"] += gasUsed
+                row["fee_wei"] += gasUsed * (price or 0)
+        return list(totals.values())
+
+
+def _print_rows(rows: list):
+    if not rows:
+        print("no results")
+        return
+    columns = list(rows[0].keys())
+    print("\t".join(columns))
+    for row in rows:
+        print("\t".join("" if row[c] is None else str(row[c]) for c in columns))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index and query the Foundry broadcast artifacts")
+    parser.add_argument("--db", default=None, help=f"index file (default .git/{DB_FILE_NAME})")
+    parser.add_argument("--root", default=".", help="repo root holding the broadcast directory")
+    parser.add_argument("--no-update", action="store_true", help="query without refreshing the index first")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("update")
+    queries = {}
+    for command in ("address", "contracts", "gas"):
+        queries[command] = sub = subparsers.add_parser(command)
+        if command == "address":
+            sub.add_argument("name")
+        sub.add_argument("--chain", type=int, default=None)
+        sub.add_argument("--run", type=int, default=None, help="run timestamp (the N of run-N.json)")
+        sub.add_argument("--script", default=None, help="script name without .s.sol, e.g. DeployFull")
+        sub.add_argument("--latest", action="store_true", help="only the run-latest.json files")
+    subparsers.add_parser("whois").add_argument("address")
+    subparsers.add_parser("tx").add_argument("hash")
+    args = parser.parse_args()
+
+    with BroadcastIndex(args.db, args.root) as index:
+        if args.command == "update" or not args.no_update:
+            counts = index.update()
+            if args.command == "update":
+                print(" ".join(f"{k}: {v}" for k, v in counts.items()))
+                sys.exit(0)
+        if args.command == "address":
+            _print_rows(index.address(args.name, args.chain, args.run, args.script, args.latest))
+        elif args.command == "contracts":
+            _print_rows(index.contracts(args.chain, args.run, args.script, args.latest))
+        elif args.command == "gas":
+            _print_rows(index.gas_totals(args.chain, args.run, args.script, args.latest))
+        elif args.command == "whois":
+            _print_rows(index.find_address(args.address))
+        elif args.command == "tx":
+            _print_rows(index.transaction(args.hash))
@@ -1,53 +1,222 @@
+"""
+Checks the swap-and-commit fuzzing outputs swap-succeses.csv and swap-succeses-usdc.csv.
+
+Rows are `totalReserves,amount,optimalAmount,leftoverGCC,leftoverUSDC,success,optimalAmountGreaterThanReserves`.
+A row fails when the leftover (GCC for swap-succeses.csv, USDC for swap-succeses-usdc.csv) is at least
+`--error-threshold` of the amount while the amount is at most `--max-amount-over-reserves` times the reserves.
+
+The files are split into byte ranges on line boundaries and the ranges of both files are checked in a
+process pool, every range as whole numpy columns, so memory is bounded by `--chunk-size` per worker.
+Every failure is counted (the first `--show` of each file are printed with their line numbers) and the
+leftover / amount ratios of all rows and of the failures are summarized as log10 histograms.
+Rows that can't be evaluated (non numeric values, a zero amount) are reported as invalid.
+
+Usage (from the directory holding the csv files):
+    python3 main.py
+    python3 main.py --workers 8 --chunk-size 67108864 --histogram-csv histograms.csv
+Exits with 1 if any row failed or was invalid, and prints "Success" otherwise.
+"""
+import argparse
 import csv
+import io
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+FILES = (("swap-succeses.csv", "leftoverGCC"), ("swap-succeses-usdc.csv", "leftoverUSDC"))
+COLUMNS = ["totalReserves", "amount", "optimalAmount", "leftoverGCC", "leftoverUSDC", "success", "optimalAmountGreaterThanReserves"]
+ERROR_THRESHOLD = 0.0001
+MAX_AMOUNT_OVER_RESERVES = 15
+CHUNK_SIZE = 32 << 20
+
+# log10(leftover / amount) bins, plus one bin for a zero leftover below the first edge
+HISTOGRAM_EDGES = np.arange(-12, 3, dtype=np.float64)
+
+
+def split_ranges(path: str, chunkSize: int) -> list:
+    """
+    (start, end) byte ranges of about `chunkSize` bytes, each ending on a line boundary
+    """
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, "rb") as f:
+        start = 0
+        while start < size:
+            f.seek(min(start + chunkSize, size))
+            f.readline()
+            end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def _histogram(ratios: np.ndarray) -> np.ndarray:
+    """
+    Counts of log10(ratio) per bin: [zero, below -12, -12..-11, ..., 1..2, above 2]
+    """
+    zero = int((ratios == 0).sum())
+    with np.errstate(divide="ignore"):
+        logs = np.log10(ratios[ratios > 0])
+    inner, _ = np.histogram(logs, HISTOGRAM_EDGES)
+    return np.concatenate([[zero, (logs < HISTOGRAM_EDGES[0]).sum()], inner, [(logs > HISTOGRAM_EDGES[-1]).sum()]])
+
+
+def _parse_slowly(data: bytes, n: int, leftoverIndex: int) -> tuple:
+    """
+    (values, bad) for a range where some rows aren't numbers or don't have every column
+    """
+    rows = [line.split(b",") for line in data.split(b"\n")[:n]]
+    shaped = np.array([r if len(r) == len(COLUMNS) else [b""] * len(COLUMNS) for r in rows], dtype="S")
+    columns = np.stack([shaped[:, 0], shaped[:, 1], shaped[:, leftoverIndex]])
+    values = np.full(columns.shape, np.nan)
+    for i in range(n):
+        try:
+            values[:, i] = columns[:, i].astype(np.float64)
+        except ValueError:
+            pass
+    return values, np.isnan(values).any(axis=0)
+
+
+def check_range(path: str, leftoverColumn: str, start: int, end: int, errorThreshold: float,
+                maxAmountOverReserves: float, keep: int) -> dict:
+    """
+    Checks the lines in [start, end) of `path`. Line numbers in the result are relative to the range
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start).replace(b"\r", b"")
+    lineCount = data.count(b"\n") + (1 if data and not data.endswith(b"\n") else 0)
+    header = 0
+    firstLine = data[: data.find(b"\n")] if b"\n" in data else data
+    if start == 0 and [field.strip() for field in firstLine.decode(errors="replace").split(",")] == COLUMNS:
+        # a header row
+        header = 1
+        data = data[data.find(b"\n") + 1 if b"\n" in data else len(data) :]
+    n = lineCount - header
+    result = {"lines": lineCount, "rows": n, "failures": 0, "invalid": 0, "examples": [], "invalid_examples": [],
+              "all": np.zeros(len(HISTOGRAM_EDGES) + 2, dtype=np.int64),
+              "failed": np.zeros(len(HISTOGRAM_EDGES) + 2, dtype=np.int64),
+              "failed_amount_over_reserves": np.zeros(4, dtype=np.int64)}
+    if n == 0:
+        return result
+
+    leftoverIndex = COLUMNS.index(leftoverColumn)
+    try:
+        values = np.loadtxt(io.BytesIO(data), delimiter=",", usecols=(0, 1, leftoverIndex), dtype=np.float64,
+                            comments=None, ndmin=2).T
+        if values.shape[1] != n:
+            # blank lines are skipped by loadtxt, take the slow path to keep the line numbers
+            raise ValueError("blank lines")
+        bad = np.zeros(n, dtype=bool)
+    except ValueError:
+        values, bad = _parse_slowly(data, n, leftoverIndex)
+    totalReserves, amount, leftover = values
+    bad |= amount == 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        leftoverOverAmount = leftover / amount
+        amountOverReserves = amount / totalReserves
+
+    valid = ~bad
+    failed = valid & ~(leftoverOverAmount < errorThreshold) & (amountOverReserves <= maxAmountOverReserves)
+    result["failures"] = int(failed.sum())
+    result["invalid"] = int(bad.sum())
+    result["all"] += _histogram(leftoverOverAmount[valid])
+    result["failed"] += _histogram(leftoverOverAmount[failed])
+    result["failed_amount_over_reserves"] += np.histogram(amountOverReserves[failed], [0, 0.01, 1, 10, np.inf])[0]
+    for i in np.flatnonzero(failed)[:keep]:
+        result["examples"].append((int(i) + header, float(amount[i]), float(leftoverOverAmount[i]), float(amountOverReserves[i])))
+    badRows = np.flatnonzero(bad)[:keep]
+    if badRows.size:
+        lines = data.split(b"\n")
+        for i in badRows:
+            result["invalid_examples"].append((int(i) + header, lines[i].decode(errors="replace")))
+    return result
+
+
+def check_files(files, workers: int = None, chunkSize: int = CHUNK_SIZE, errorThreshold: float = ERROR_THRESHOLD,
+                maxAmountOverReserves: float = MAX_AMOUNT_OVER_RESERVES, keep: int = 10) -> dict:
+    """
+    {(path, leftover column): merged result} for every pair, with 1-based line numbers in the examples
+    """
+    tasks = [(path, column, start, end) for path, column in files for start, end in split_ranges(path, chunkSize)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(check_range, *task, errorThreshold, maxAmountOverReserves, keep) for task in tasks]
+        merged = {}
+        lineOffset = {}
+        for (path, column, *_), future in zip(tasks, futures):
+            part = future.result()
+            key = (path, column)
+            offset = lineOffset.get(key, 0)
+            lineOffset[key] = offset + part["lines"]
+            total = merged.get(key)
+            if total is None:
+                merged[key] = total = {key: value for key, value in part.items() if key not in ("examples", "invalid_examples")}
+                total["examples"] = []
+                total["invalid_examples"] = []
+            else:
+                for name in ("lines", "rows", "failures", "invalid", "all", "failed", "failed_amount_over_reserves"):
+                    total[name] = total[name] + part[name]
+            for line, *rest in part["examples"]:
+                if len(total["examples"]) < keep:
+                    total["examples"].append((offset + line + 1, *rest))
+            for line, text in part["invalid_examples"]:
+                if len(total["invalid_examples"]) < keep:
+                    total["invalid_examples"].append((offset + line + 1, text))
+    return merged
+
+
+def histogram_labels() -> list:
+    edges = HISTOGRAM_EDGES.astype(int).tolist()
+    return ["0", f"<1e{edges[0]}"] + [f"1e{a}..1e{b}" for a, b in zip(edges, edges[1:])] + [f">1e{edges[-1]}"]
+
+
+def write_histograms(results: dict, path: str):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(["file", "leftover", "rows", "leftoverOverAmount", "count"])
+        for (file, column), result in results.items():
+            for rows in ("all", "failed"):
+                for label, count in zip(histogram_labels(), result[rows].tolist()):
+                    writer.writerow([file, column, rows, label, count])
+
+
+def print_report(results: dict):
+    labels = histogram_labels()
+    for (file, column), result in results.items():
+        print(f"{file}: {result['rows']} rows, {result['failures']} failures, {result['invalid']} invalid")
+        for line, amount, ratio, overReserves in result["examples"]:
+            print(f"  line {line}: amount {amount} {column} / amount {ratio} amount / totalReserves {overReserves}")
+        for line, text in result["invalid_examples"]:
+            print(f"  line {line}: invalid row {text!r}")
+        print(f"  {column} / amount (all rows | failures):")
+        for label, everything, failed in zip(labels, result["all"].tolist(), result["failed"].tolist()):
+            if everything:
+                print(f"    {label:>14} {everything:>12} | {failed}")
+        if result["failures"]:
+            counts = result["failed_amount_over_reserves"].tolist()
+            print(f"  amount / totalReserves of the failures: <0.01: {counts[0]} 0.01..1: {counts[1]} 1..10: {counts[2]} >=10: {counts[3]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the leftover ratios of the swap-and-commit fuzzing outputs")
+    parser.add_argument("--gcc-file", default=FILES[0][0])
+    parser.add_argument("--usdc-file", default=FILES[1][0])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="bytes per task")
+    parser.add_argument("--error-threshold", type=float, default=ERROR_THRESHOLD)
+    parser.add_argument("--max-amount-over-reserves", type=float, default=MAX_AMOUNT_OVER_RESERVES)
+    parser.add_argument("--show", type=int, default=10, help="failures printed per file")
+    parser.add_argument("--histogram-csv", default=None)
+    args = parser.parse_args()
 
-#Read in  ./swap-successes.csv
-
-file = open('swap-succeses.csv', 'r')
-reader = csv.reader(file)
-swap_successes = list(reader)
-
-#totalReserves,amount,optimalAmount,leftoverGCC,leftoverUSDC,success,optimalAmountGreaterThanReserves
-
-error_threshold = 0.0001
-for row in swap_successes:
-    (totalReserves,amount,optimalAmount,leftoverGCC,leftoverUSDC,success,optimalAmountGreaterThanReserves) = row
-    #Find leftover GCC / amount
-    leftoverGCC = float(leftoverGCC)
-    amount = float(amount)
-    leftoverGCCOverAmount = leftoverGCC / amount
-    #Make sure that leftoverGCCOverAmount is less than 0.001
-    if leftoverGCCOverAmount < error_threshold:
-        continue
-    else:
-        amountDivTotalReserves = amount / float(totalReserves)
-        if amountDivTotalReserves <= 15:
-            print(f"Amount {amount}")
-            print(f"Failure: {leftoverGCCOverAmount}")
-            raise Exception("Failure")
-
-
-
-#do the same for swap-succeses-usdc
-file = open('swap-succeses-usdc.csv', 'r')
-reader = csv.reader(file)
-swap_successes = list(reader)
-
-#totalReserves,amount,optimalAmount,leftoverGCC,leftoverUSDC,success,optimalAmountGreaterThanReserves
-
-for row in swap_successes:
-    (totalReserves,amount,optimalAmount,leftoverGCC,leftoverUSDC,success,optimalAmountGreaterThanReserves) = row
-    #Find leftover GCC / amount
-    leftoverUSDC = float(leftoverUSDC)
-    amount = float(amount)
-    leftoverUSDCOverAmount = leftoverUSDC / amount
-    #Make sure that leftoverGCCOverAmount is less than 0.001
-    if leftoverUSDCOverAmount < error_threshold:
-        continue
-    else:
-        amountDivTotalReserves = amount / float(totalReserves)
-        if amountDivTotalReserves <= 15:
-            print(f"Amount {amount}")
-            print(f"Failure: {leftoverUSDCOverAmount}")
-            raise Exception("Failure")
-        
-print("Success")
\ No newline at end of file
+    files = [(args.gcc_file, FILES[0][1]), (args.usdc_file, FILES[1][1])]
+    results = check_files(files, args.workers, args.chunk_size, args.error_threshold, args.max_amount_over_reserves, args.show)
+    print_report(results)
+    if args.histogram_csv:
+        write_histograms(results, args.histogram_csv)
+    if any(r["failures"] or r["invalid"] for r in results.values()):
+        print("Failure")
+        sys.exit(1)
+    print("Success")
@@ -0,0 +1,388 @@
+"""
+Parameter sweep over the EarlyLiquidity launch curve.
+
+calc_starting_price.py converts one starting price, this file evaluates whole grids of
+    - starting prices (USDC per 0.01 GLW increment, 0.003 in the contract)
+    - doubling intervals (increments sold per price doubling, the 100,000,000 of `_getFirstTermInSeries`)
+    - buy size distributions (lognormal buy sizes in increments, by median and sigma)
+against the 12M token cap (`TOTAL_INCREMENTS_TO_SELL`) with the closed form of the geometric sums:
+    price(x)         = s * r^x                                   r = 2^(1 / doublingInterval)
+    cost(x, n)       = s * r^x * (r^n - 1) / (r - 1)             (`_getPrice(x, n)`)
+    revenue(0 -> x)  = cost(0, x)
+All sums are evaluated with expm1 so they stay accurate for r this close to 1.
+The float results diverge from the contract's 64.64 pipeline by less than 1e-7 (see price_curve.py for the exact one).
+
+Every cell reports revenue, the price path at `--path-points` fractions of the cap, the
+`invariant_priceShouldNeverBeGreaterThanMaxPrice` bounds (the current price is at most 4096 times the starting
+price and the cost of the remaining increments at most 4096 times the starting price per increment, checked at
+every path point and before every simulated buy), whether every 64.64 intermediate stays in range, and buy
+statistics from a seeded sequence of up to `--max-buys` buys (slippage over the spot price, the largest buy,
+how far the buys got). A buy that would cross the cap is cut to the increments left, as a buyer would have
+to after `AllSold`.
+
+Cells are split into tasks that run in a process pool. Every task writes its rows to its own file in the
+checkpoint directory (`<out>.parts` by default) once it is done, so an interrupted sweep started again with the
+same arguments only runs the missing tasks. Each cell seeds its buys from (seed, cell index), results don't
+depend on the task size or the number of workers. The merged results are written as one compressed npz with the
+grid axes and one column per metric (cells in C order over the axes, see `load_results`).
+
+Usage:
+    python3 param_sweep.py --starting-prices 0.002 0.003 0.004 --doubling-intervals 5e7 1e8 2e8 \\
+        --buy-medians 100 1000 10000 --buy-sigmas 0.5 1.5 --out sweep.npz --workers 8
+    python3 param_sweep.py ... --out sweep.npz    # same arguments again: resumes from sweep.npz.parts
+"""
+import argparse
+import hashlib
+import json
+import math
+import multiprocessing as mp
+import os
+import shutil
+
+import numpy as np
+
+from price_curve import TOTAL_INCREMENTS_TO_SELL, USDC_DECIMALS
+
+STARTING_PRICE = 0.003
+DOUBLING_INTERVAL = 100_000_000
+# MAX_PRICE_EVER = STARTING_USDC_PRICE * 4096 in test/EarlyLiquidity/EarlyLiquidity.t.sol
+MAX_PRICE_MULTIPLE = 4096
+# ABDKMath64x64.exp reverts from 0x400000000000000000 and its result has to fit in int128
+_MAX_EXP_ARGUMENT = min(64.0, 63 * math.log(2))
+_MAX_64x64 = float(2**63)
+
+AXES = ["starting_price", "doubling_interval", "buy_median", "buy_sigma"]
+METRICS = [
+    "revenue",                # USDC for selling every increment
+    "final_price",            # USDC for the last increment
+    "price_multiple",         # final_price / starting price
+    "invariant_ok",           # both invariant bounds hold at every checked point
+    "worst_price_over_max",   # largest current price / MAX_PRICE_EVER
+    "worst_cost_over_max",    # largest cost of the remaining increments / (MAX_PRICE_EVER * remaining)
+    "fits_64x64",             # no exp argument or intermediate of `_getPrice` leaves the 64.64 range
+    "denominator_error",      # relative rounding error of (1 - r) stored as a 64.64 constant
+    "buys",                   # simulated buys
+    "sold_fraction",          # increments sold by the simulated buys / TOTAL_INCREMENTS_TO_SELL
+    "buys_to_sell_out",       # the simulated buys if they sold out, otherwise extrapolated from the mean buy
+    "mean_slippage",          # cost / (increments * spot price) - 1 over the simulated buys
+    "p99_slippage",
+    "max_slippage",
+    "max_buy_cost",           # USDC
+    "simulated_revenue",      # USDC paid by the simulated buys
+]
+PATH_METRICS = ["path_price", "path_revenue"]
+
+_PART_FORMAT = "part-{:09d}.npz"
+_GRID_FILE = "grid.json"
+
+
+def starting_price_constant(startingPrice: float) -> int:
+    """
+    The 64.64 first term constant for a starting price, as calc_starting_price.py computes it
+    """
+    return int(startingPrice * (10**USDC_DECIMALS) * (2**64))
+
+
+def geometric_factor(n, lnRatio):
+    """
+    (r^n - 1) / (r - 1) for r = e^lnRatio
+    """
+    return np.expm1(np.multiply(n, lnRatio)) / np.expm1(lnRatio)
+
+
+class Grid:
+    """
+    The cartesian product of the axes, flattened in C order
+    """
+
+    def __init__(self, startingPrices, doublingIntervals, buyMedians, buySigmas, totalIncrements: int = TOTAL_INCREMENTS_TO_SELL,
+                 maxBuys: int = 100_000, pathPoints: int = 11, seed: int = 0):
+        self.axes = {
+            "starting_price": np.asarray(startingPrices, dtype=np.float64).ravel(),
+            "doubling_interval": np.asarray(doublingIntervals, dtype=np.float64).ravel(),
+            "buy_median": np.asarray(buyMedians, dtype=np.float64).ravel(),
+            "buy_sigma": np.asarray(buySigmas, dtype=np.float64).ravel(),
+        }
+        self.totalIncrements = int(totalIncrements)
+        self.maxBuys = int(maxBuys)
+        self.pathPoints = int(pathPoints)
+        self.seed = int(seed)
+
+    @property
+    def shape(self) -> tuple:
+        return tuple(self.axes[a].shape[0] for a in AXES)
+
+    def __len__(self):
+        return math.prod(self.shape)
+
+    def cell(self, index: int) -> tuple:
+        """
+        (starting price, doubling interval, buy median, buy sigma) of a flat cell index
+        """
+        return tuple(float(self.axes[a][i]) for a, i in zip(AXES, np.unravel_index(index, self.shape)))
+
+    def spec(self) -> dict:
+        return {
+            "axes": {a: self.axes[a].tolist() for a in AXES},
+            "total_increments": self.totalIncrements,
+            "max_buys": self.maxBuys,
+            "path_points": self.pathPoints,
+            "seed": self.seed,
+        }
+
+    @classmethod
+    def from_spec(cls, spec: dict) -> "Grid":
+        axes = spec["axes"]
+        return cls(*(axes[a] for a in AXES), spec["total_increments"], spec["max_buys"], spec["path_points"], spec["seed"])
+
+    def fingerprint(self) -> str:
+        return hashlib.sha256(json.dumps(self.spec(), sort_keys=True).encode()).hexdigest()
+
+
+# -------------------------------------------------------------------------- #
+#                                 one cell                                    #
+# -------------------------------------------------------------------------- #
+
+
+def simulate_buys(rng: np.random.Generator, buyMedian: float, buySigma: float, maxBuys: int, totalIncrements: int) -> np.ndarray:
+    """
+    Up to `maxBuys` lognormal buy sizes (whole increments, at least 1), stopping at the cap with the last buy cut
+    to the increments left
+    """
+    sizes = np.maximum(np.rint(rng.lognormal(math.log(buyMedian), buySigma, maxBuys)), 1.0)
+    sold = np.cumsum(sizes)
+    end = int(np.searchsorted(sold, totalIncrements))
+    if end < maxBuys:
+        sizes = sizes[: end + 1]
+        sizes[end] -= sold[end] - totalIncrements
+    return sizes
+
+
+def evaluate_cell(grid: Grid, index: int) -> dict:
+    """
+    Every metric of one cell
+    """
+    startingPrice, doublingInterval, buyMedian, buySigma = grid.cell(index)
+    N = grid.totalIncrements
+    lnRatio = math.log(2) / doublingInterval
+    maxPriceEver = startingPrice * MAX_PRICE_MULTIPLE
+
+    # price path at fractions of the cap, the last point is the price of the last increment
+    fractions = np.linspace(0.0, 1.0, grid.pathPoints)
+    sold = np.floor(fractions * N)
+    pathPrice = startingPrice * np.exp(np.minimum(sold, N - 1) * lnRatio)
+    pathRevenue = startingPrice * geometric_factor(sold, lnRatio)
+    revenue = float(pathRevenue[-1])
+    finalPrice = float(pathPrice[-1])
+
+    # buys
+    rng = np.random.default_rng(np.random.SeedSequence(grid.seed, spawn_key=(index,)))
+    sizes = simulate_buys(rng, buyMedian, buySigma, grid.maxBuys, N)
+    before = np.concatenate([[0.0], np.cumsum(sizes)[:-1]])
+    spot = startingPrice * np.exp(before * lnRatio)
+    costs = spot * geometric_factor(sizes, lnRatio)
+    slippage = costs / (sizes * spot) - 1
+    soldBySimulation = float(before[-1] + sizes[-1]) if sizes.size else 0.0
+
+    # invariant bounds at the path points and before every buy
+    points = np.concatenate([sold[:-1], before])
+    remaining = N - points
+    price = startingPrice * np.exp(points * lnRatio)
+    remainingCost = price * geometric_factor(remaining, lnRatio)
+    worstPrice = float(price.max() / maxPriceEver)
+    worstCost = float((remainingCost / (maxPriceEver * remaining)).max())
+
+    # 64.64 ranges of `_getPrice(x, n)`: exp(ln2 * x / interval), exp(n * lnRatio), the series factor and the first term
+    largestExponent = (N - 1) * lnRatio
+    firstTermScaled = startingPrice * 10**USDC_DECIMALS * math.exp(min(largestExponent, 700.0))
+    seriesFactor = float(geometric_factor(N, lnRatio))
+    fits = largestExponent < _MAX_EXP_ARGUMENT and N * lnRatio < _MAX_EXP_ARGUMENT \
+        and firstTermScaled < _MAX_64x64 and seriesFactor < _MAX_64x64
+    denominator = math.expm1(lnRatio) * 2**64
+    denominatorError = abs(round(denominator) - denominator) / denominator if denominator >= 1 else 1.0
+
+    soldOut = soldBySimulation >= N
+    return {
+        "revenue": revenue,
+        "final_price": finalPrice,
+        "price_multiple": finalPrice / startingPrice,
+        "invariant_ok": worstPrice <= 1 and worstCost <= 1,
+        "worst_price_over_max": worstPrice,
+        "worst_cost_over_max": worstCost,
+        "fits_64x64": fits,
+        "denominator_error": denominatorError,
+        "buys": sizes.shape[0],
+        "sold_fraction": soldBySimulation / N,
+        "buys_to_sell_out": float(sizes.shape[0]) if soldOut else N / float(sizes.mean()),
+        "mean_slippage": float(slippage.mean()),
+        "p99_slippage": float(np.quantile(slippage, 0.99)),
+        "max_slippage": float(slippage.max()),
+        "max_buy_cost": float(costs.max()),
+        "simulated_revenue": float(costs.sum()),
+        "path_price": pathPrice,
+        "path_revenue": pathRevenue,
+    }
+
+
+# -------------------------------------------------------------------------- #
+#                            tasks and checkpoints                            #
+# -------------------------------------------------------------------------- #
+
+
+def _empty_columns(grid: Grid, n: int) -> dict:
+    columns = {m: np.zeros(n, dtype=bool if m in ("invariant_ok", "fits_64x64") else np.int64 if m == "buys" else np.float64)
+               for m in METRICS}
+    for m in PATH_METRICS:
+        columns[m] = np.zeros((n, grid.pathPoints), dtype=np.float64)
+    return columns
+
+
+def evaluate_range(grid: Grid, start: int, stop: int) -> dict:
+    """
+    Metric columns for the cells [start, stop)
+    """
+    columns = _empty_columns(grid, stop - start)
+    for row, index in enumerate(range(start, stop)):
+        for name, value in evaluate_cell(grid, index).items():
+            columns[name][row] = value
+    return columns
+
+
+def _run_task(args):
+    """
+    Worker entrypoint: evaluates a range and writes it to its part file (renamed into place once complete)
+    """
+    spec, start, stop, directory = args
+    columns = evaluate_range(Grid.from_spec(spec), start, stop)
+    path = os.path.join(directory, _PART_FORMAT.format(start))
+    temporary = path + ".tmp.npz"
+    np.savez(temporary, start=start, stop=stop, **columns)
+    os.replace(temporary, path)
+    return start, stop
+
+
+def _prepare_checkpoint(grid: Grid, directory: str, restart: bool):
+    gridFile = os.path.join(directory, _GRID_FILE)
+    if restart and os.path.isdir(directory):
+        shutil.rmtree(directory)
+    if os.path.exists(gridFile):
+        with open(gridFile) as f:
+            if json.load(f)["fingerprint"] != grid.fingerprint():
+                raise ValueError(f"{directory} holds a sweep over another grid, pass --restart to discard it")
+        return
+    os.makedirs(directory, exist_ok=True)
+    with open(gridFile, "w") as f:
+        json.dump({"fingerprint": grid.fingerprint(), "spec": grid.spec()}, f)
+
+
+def _done_tasks(directory: str) -> set:
+    return {int(name[5:-4]) for name in os.listdir(directory)
+            if name.startswith("part-") and name.endswith(".npz") and not name.endswith(".tmp.npz")}
+
+
+def run_sweep(grid: Grid, out: str, checkpoint: str = None, taskSize: int = 16, workers: int = None,
+              restart: bool = False, keepCheckpoint: bool = False, progress: bool = True) -> dict:
+    """
+    Runs the missing tasks of the sweep, merges every part into `out` and returns the merged columns
+    """
+    checkpoint = checkpoint or out + ".parts"
+    _prepare_checkpoint(grid, checkpoint, restart)
+    spec = grid.spec()
+    done = _done_tasks(checkpoint)
+    starts = list(range(0, len(grid), taskSize))
+    tasks = [(spec, s, min(s + taskSize, len(grid)), checkpoint) for s in starts if s not in done]
+    if progress:
+        print(f"cells: {len(grid)} tasks: {len(starts)} already done: {len(starts) - len(tasks)}")
+
+    if tasks:
+        if workers == 1:
+            finished = map(_run_task, tasks)
+        else:
+            pool = mp.Pool(processes=workers)
+            finished = pool.imap_unordered(_run_task, tasks)
+        try:
+            for count, _ in enumerate(finished, 1):
+                if progress and (count % max(1, len(tasks) // 20) == 0 or count == len(tasks)):
+                    print(f"  {count}/{len(tasks)} tasks")
+        finally:
+            if workers != 1:
+                pool.terminate()
+
+    columns = merge_parts(grid, checkpoint, starts, taskSize)
+    save_results(out, grid, columns)
+    if not keepCheckpoint:
+        shutil.rmtree(checkpoint)
+    return columns
+
+
+def merge_parts(grid: Grid, directory: str, starts: list, taskSize: int) -> dict:
+    columns = _empty_columns(grid, len(grid))
+    for start in starts:
+        with np.load(os.path.join(directory, _PART_FORMAT.format(start))) as part:
+            if int(part["stop"]) != min(start + taskSize, len(grid)):
+                raise ValueError(f"part {start} was written with another task size, pass --restart")
+            for name in columns:
+                columns[name][start : int(part["stop"])] = part[name]
+    return columns
+
+
+# -------------------------------------------------------------------------- #
+#                                  results                                    #
+# -------------------------------------------------------------------------- #
+
+
+def save_results(path: str, grid: Grid, columns: dict):
+    axes = {f"axis_{a}": grid.axes[a] for a in AXES}
+    np.savez_compressed(path, spec=json.dumps(grid.spec()), path_fractions=np.linspace(0.0, 1.0, grid.pathPoints),
+                        **axes, **columns)
+
+
+def load_results(path: str, shaped: bool = False) -> tuple:
+    """
+    (grid, columns) of a results file, with `shaped` every column is reshaped to the grid shape
+    (plus the path points for the path columns)
+    """
+    with np.load(path) as data:
+        grid = Grid.from_spec(json.loads(str(data["spec"])))
+        columns = {name: data[name] for name in METRICS + PATH_METRICS}
+    if shaped:
+        columns = {name: values.reshape(grid.shape + values.shape[1:]) for name, values in columns.items()}
+    return grid, columns
+
+
+def print_best(grid: Grid, columns: dict, count: int):
+    """
+    The cells with the most revenue among those that keep both invariant bounds and the 64.64 ranges
+    """
+    ok = np.flatnonzero(columns["invariant_ok"] & columns["fits_64x64"])
+    print(f"cells within bounds: {ok.shape[0]}/{len(grid)}")
+    print(",".join(AXES + ["revenue", "price_multiple", "buys_to_sell_out", "mean_slippage", "max_buy_cost"]))
+    for index in ok[np.argsort(-columns["revenue"][ok], kind="stable")][:count]:
+        values = [repr(v) for v in grid.cell(int(index))]
+        values += [f"{columns[m][index]:.6g}" for m in ("revenue", "price_multiple", "buys_to_sell_out", "mean_slippage", "max_buy_cost")]
+        print(",".join(values))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep EarlyLiquidity launch parameters")
+    parser.add_argument("--starting-prices", type=float, nargs="+", default=[STARTING_PRICE], help="USDC per increment")
+    parser.add_argument("--doubling-intervals", type=float, nargs="+", default=[DOUBLING_INTERVAL], help="increments per doubling")
+    parser.add_argument("--buy-medians", type=float, nargs="+", default=[1000.0], help="median buy in increments")
+    parser.add_argument("--buy-sigmas", type=float, nargs="+", default=[1.0], help="sigma of the lognormal buy sizes")
+    parser.add_argument("--total-increments", type=int, default=TOTAL_INCREMENTS_TO_SELL)
+    parser.add_argument("--max-buys", type=int, default=100_000, help="simulated buys per cell")
+    parser.add_argument("--path-points", type=int, default=11)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=str, default="sweep.npz")
+    parser.add_argument("--checkpoint", type=str, default=None, help="part directory (default <out>.parts)")
+    parser.add_argument("--task-size", type=int, default=16, help="cells per task")
+    parser.add_argument("--workers", type=int, default=None, help="defaults to os.cpu_count()")
+    parser.add_argument("--restart", action="store_true", help="discard the parts of an earlier sweep")
+    parser.add_argument("--keep-checkpoint", action="store_true")
+    parser.add_argument("--best", type=int, default=10, help="cells printed at the end")
+    args = parser.parse_args()
+
+    grid = Grid(args.starting_prices, args.doubling_intervals, args.buy_medians, args.buy_sigmas, args.total_increments,
+                args.max_buys, args.path_points, args.seed)
+    columns = run_sweep(grid, args.out, args.checkpoint, args.task_size, args.workers, args.restart, args.keep_checkpoint)
+    print_best(grid, columns, args.best)
@@ -0,0 +1,339 @@
+"""
+Native python reference for `EarlyLiquidity._getPrice`.
+
+Reproduces the 64x64 fixed point pipeline of the contract exactly (see py-utils/abdkmath64x64):
+    price(totalIncrementsSold, n) = (firstTerm(totalIncrementsSold) * divisionResult(n) >> 64) >> 64
+where
+    firstTerm(s)      = 0.003 * 2^(s / 1e8)     (`_getFirstTermInSeries`)
+    divisionResult(n) = (1 - r^n) / (1 - r)     (the geometric series part of `_getPrice`)
+
+Since the two factors only depend on one input each, a (totalIncrementsSold x incrementsToBuy) grid
+only needs one `exp` per distinct row and per distinct column; the grid itself is an exact
+128-bit multiply done on 32-bit limbs in numpy.
+
+`PriceTable` precomputes both factors for a window of totalIncrementsSold and a range of
+incrementsToBuy into memory-mapped npy files, so `get_price` lookups don't need an RPC call or an `exp`.
+
+Usage:
+    python3 price_curve.py price 0 100
+    python3 price_curve.py build-table ./price-table --sold-start 0 --sold-count 10000000 --max-increments 1000000
+    python3 price_curve.py lookup ./price-table 5000 100
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "py-utils"))
+import abdkmath64x64 as abdk  # noqa: E402
+
+# Constants from EarlyLiquidity.sol
+_RATIO = 18446744201572638720
+_POINT_ZERO_ZERO_THREE = 55340232221128654848000
+_ONE = 18446744073709551616
+_LN_RATIO = 127863086660
+_ONE_HUNDRED_MILLION = 100_000_000 << 64
+_LN_2 = 12786308645202655659
+_DENOMINATOR = -127863086349
+USDC_DECIMALS = 6
+TOTAL_INCREMENTS_TO_SELL = 1_200_000_000
+MIN_TOKEN_INCREMENT = 10**16
+
+# Written into grids where `totalIncrementsSold + incrementsToBuy > TOTAL_INCREMENTS_TO_SELL`
+ALL_SOLD = np.iinfo(np.uint64).max
+
+
+class AllSold(Exception):
+    pass
+
+
+def get_first_term_in_series(totalIncrementsSold: int) -> int:
+    """
+    `EarlyLiquidity._getFirstTermInSeries`, returns the raw 64x64 value
+    """
+    floatingPointTotalSold = abdk.fromUInt(totalIncrementsSold)
+    exponent = abdk.div(abdk.mul(_LN_2, floatingPointTotalSold), _ONE_HUNDRED_MILLION)
+    baseResult = abdk.exp(exponent)
+    return abdk.mul(_POINT_ZERO_ZERO_THREE, baseResult)
+
+
+def get_division_result(incrementsToBuy: int) -> int:
+    """
+    (1 - r^n) / (1 - r) as computed in `EarlyLiquidity._getPrice`, returns the raw 64x64 value
+    """
+    n = abdk.fromUInt(incrementsToBuy)
+    rToTheN = abdk.exp(abdk.mul(n, _LN_RATIO))
+    numerator = abdk.sub(_ONE, rToTheN)
+    return abdk.div(numerator, _DENOMINATOR)
+
+
+def get_price(totalIncrementsSold: int, incrementsToBuy: int) -> int:
+    """
+    `EarlyLiquidity._getPrice`, returns the price in USDC (6 decimals)
+    """
+    if totalIncrementsSold + incrementsToBuy > TOTAL_INCREMENTS_TO_SELL:
+        raise AllSold()
+    divisionResult = get_division_result(incrementsToBuy)
+    firstTermInSeries = get_first_term_in_series(totalIncrementsSold)
+    return (firstTermInSeries * divisionResult >> 64) >> 64
+
+
+def get_price_float(totalIncrementsSold: int, incrementsToBuy: int) -> float:
+    """
+    The float closed form used by test/EarlyLiquidity/EarlyLiquidity.test.ts, handy to eyeball divergence
+    """
+    ratio = 1.0000000069314718
+    firstTerm = 0.003 * 2 ** (totalIncrementsSold / 100_000_000)
+    return firstTerm * ((1 - ratio**incrementsToBuy) / (1 - ratio)) * 10**USDC_DECIMALS
+
+
+# -------------------------------------------------------------------------- #
+#                                    bulk                                     #
+# -------------------------------------------------------------------------- #
+
+
+def _join(row) -> int:
+    lo, hi = row.tolist()
+    return lo | (hi << 64)
+
+
+def _to_limbs(lohi: np.ndarray):
+    """
+    (n, 2) uint64 -> four 32-bit limbs (least significant first), each a uint64 array
+    """
+    mask = np.uint64(0xFFFFFFFF)
+    lo = lohi[..., 0]
+    hi = lohi[..., 1]
+    return [lo & mask, lo >> np.uint64(32), hi & mask, hi >> np.uint64(32)]
+
+
+def mul_shr_128(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    floor(a * b / 2^128) for broadcastable arrays of unsigned 128-bit values stored as [..., 2] uint64 [lo, hi].
+    The result must fit in 64 bits (it always does for `_getPrice`), it is returned as a uint64 array.
+    """
+    mask = np.uint64(0xFFFFFFFF)
+    shift = np.uint64(32)
+    al = _to_limbs(a)
+    bl = _to_limbs(b)
+    shape = np.broadcast_shapes(a.shape[:-1], b.shape[:-1])
+    cols = [np.zeros(shape, dtype=np.uint64) for _ in range(9)]
+    for i in range(4):
+        for j in range(4):
+            p = al[i] * bl[j]  # < 2^64, never wraps
+            cols[i + j] += p & mask
+            cols[i + j + 1] += p >> shift
+    carry = np.zeros(shape, dtype=np.uint64)
+    limbs = []
+    for k in range(8):
+        c = cols[k] + carry
+        limbs.append(c & mask)
+        carry = c >> shift
+    if np.any(limbs[6] | limbs[7] | carry | cols[8]):
+        raise OverflowError("price does not fit in 64 bits")
+    return limbs[4] | (limbs[5] << shift)
+
+
+def _packed_to_lohi(packed: np.ndarray) -> np.ndarray:
+    """
+    non-negative packed `abdk.batch` values -> (n, 2) uint64 [lo, hi]
+    """
+    shift = np.uint64(32)
+    out = np.empty((packed.shape[1], 2), dtype=np.uint64)
+    out[:, 0] = packed[0] | (packed[1] << shift)
+    out[:, 1] = packed[2] | (packed[3] << shift)
+    return out
+
+
+def _first_terms_chunk(values):
+    B = abdk.batch
+    floatingPointTotalSold = B.fromUInt(np.asarray(values, dtype=np.uint64))
+    exponent = B.div(B.mul(B.pack([_LN_2]), floatingPointTotalSold), B.pack([_ONE_HUNDRED_MILLION]))
+    baseResult = B.exp(exponent)
+    return _packed_to_lohi(B.mul(B.pack([_POINT_ZERO_ZERO_THREE]), baseResult))
+
+
+def _division_results_chunk(values):
+    B = abdk.batch
+    n = B.fromUInt(np.asarray(values, dtype=np.uint64))
+    rToTheN = B.exp(B.mul(n, B.pack([_LN_RATIO])))
+    numerator = B.sub(B.pack([_ONE]), rToTheN)
+    return _packed_to_lohi(B.div(numerator, B.pack([_DENOMINATOR])))
+
+
+def _map_chunks(fn, values, workers: int = None, chunk_size: int = 200_000):
+    values = np.asarray(values, dtype=np.uint64)
+    chunks = [values[i:i + chunk_size] for i in range(0, len(values), chunk_size)]
+    if not chunks:
+        return np.empty((0, 2), dtype=np.uint64)
+    if workers == 1 or len(chunks) <= 1:
+        results = [fn(c) for c in chunks]
+    else:
+        with mp.Pool(processes=workers) as pool:
+            results = pool.map(fn, chunks)
+    return np.concatenate(results)
+
+
+def first_terms(totalIncrementsSold, workers: int = None) -> np.ndarray:
+    """
+    `_getFirstTermInSeries` for every value, as an (n, 2) uint64 [lo, hi] array
+    """
+    return _map_chunks(_first_terms_chunk, totalIncrementsSold, workers)
+
+
+def division_results(incrementsToBuy, workers: int = None) -> np.ndarray:
+    """
+    The geometric series factor of `_getPrice` for every value, as an (n, 2) uint64 [lo, hi] array
+    """
+    return _map_chunks(_division_results_chunk, incrementsToBuy, workers)
+
+
+def price_grid(totalIncrementsSold, incrementsToBuy, workers: int = None) -> np.ndarray:
+    """
+    `_getPrice` over the full grid, returns a (len(totalIncrementsSold), len(incrementsToBuy)) uint64 array.
+    Cells that would revert with `AllSold` hold `ALL_SOLD`.
+    """
+    sold = np.asarray(totalIncrementsSold, dtype=np.int64)
+    buy = np.asarray(incrementsToBuy, dtype=np.int64)
+    unique_sold, sold_idx = np.unique(sold, return_inverse=True)
+    unique_buy, buy_idx = np.unique(buy, return_inverse=True)
+    ft = first_terms(unique_sold.tolist(), workers)[sold_idx]
+    dr = division_results(unique_buy.tolist(), workers)[buy_idx]
+    grid = mul_shr_128(ft[:, None, :], dr[None, :, :])
+    grid[(sold[:, None] + buy[None, :]) > TOTAL_INCREMENTS_TO_SELL] = ALL_SOLD
+    return grid
+
+
+def prices(totalIncrementsSold, incrementsToBuy, workers: int = None) -> np.ndarray:
+    """
+    `_getPrice` for paired inputs (same length), returns a uint64 array with `ALL_SOLD` where it would revert
+    """
+    sold = np.asarray(totalIncrementsSold, dtype=np.int64)
+    buy = np.asarray(incrementsToBuy, dtype=np.int64)
+    if sold.shape != buy.shape:
+        raise ValueError("inputs must be the same shape")
+    unique_sold, sold_idx = np.unique(sold, return_inverse=True)
+    unique_buy, buy_idx = np.unique(buy, return_inverse=True)
+    ft = first_terms(unique_sold.tolist(), workers)[sold_idx]
+    dr = division_results(unique_buy.tolist(), workers)[buy_idx]
+    out = mul_shr_128(ft, dr)
+    out[(sold + buy) > TOTAL_INCREMENTS_TO_SELL] = ALL_SOLD
+    return out
+
+
+# -------------------------------------------------------------------------- #
+#                                 price table                                 #
+# -------------------------------------------------------------------------- #
+
+_META_FILE = "meta.json"
+_FIRST_TERMS_FILE = "first_terms.npy"
+_DIVISION_RESULTS_FILE = "division_results.npy"
+
+
+class PriceTable:
+    """
+    Memory-mapped `_getPrice` lookup table.
+
+    Holds `_getFirstTermInSeries` for totalIncrementsSold in [sold_start, sold_start + sold_count)
+    and the series factor for incrementsToBuy in [0, max_increments], 16 bytes per entry.
+    Lookups outside the table fall back to the exact computation.
+    """
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, _META_FILE)) as f:
+            meta = json.load(f)
+        self.sold_start = meta["sold_start"]
+        self.sold_count = meta["sold_count"]
+        self.max_increments = meta["max_increments"]
+        # plain ndarray views over the mapping, indexing a np.memmap is several times slower
+        self.first_terms = np.asarray(np.load(os.path.join(path, _FIRST_TERMS_FILE), mmap_mode="r"))
+        self.division_results = np.asarray(np.load(os.path.join(path, _DIVISION_RESULTS_FILE), mmap_mode="r"))
+
+    @staticmethod
+    def build(path: str, sold_start: int, sold_count: int, max_increments: int, workers: int = None,
+              chunk_size: int = 1_000_000):
+        """
+        Writes a table to `path` (a directory), streaming chunks so memory stays flat
+        """
+        os.makedirs(path, exist_ok=True)
+        ft = np.lib.format.open_memmap(os.path.join(path, _FIRST_TERMS_FILE), mode="w+", dtype=np.uint64,
+                                       shape=(sold_count, 2))
+        for start in range(0, sold_count, chunk_size):
+            stop = min(start + chunk_size, sold_count)
+            ft[start:stop] = first_terms(range(sold_start + start, sold_start + stop), workers)
+            ft.flush()
+        del ft
+
+        dr = np.lib.format.open_memmap(os.path.join(path, _DIVISION_RESULTS_FILE), mode="w+", dtype=np.uint64,
+                                       shape=(max_increments + 1, 2))
+        for start in range(0, max_increments + 1, chunk_size):
+            stop = min(start + chunk_size, max_increments + 1)
+            dr[start:stop] = division_results(range(start, stop), workers)
+            dr.flush()
+        del dr
+
+        with open(os.path.join(path, _META_FILE), "w") as f:
+            json.dump({"sold_start": sold_start, "sold_count": sold_count, "max_increments": max_increments}, f)
+        return PriceTable(path)
+
+    def get_price(self, totalIncrementsSold: int, incrementsToBuy: int) -> int:
+        """
+        Same result as `get_price`, in O(1) when both inputs are inside the table
+        """
+        if totalIncrementsSold + incrementsToBuy > TOTAL_INCREMENTS_TO_SELL:
+            raise AllSold()
+        i = totalIncrementsSold - self.sold_start
+        if 0 <= i < self.sold_count:
+            firstTerm = _join(self.first_terms[i])
+        else:
+            firstTerm = get_first_term_in_series(totalIncrementsSold)
+        if incrementsToBuy <= self.max_increments:
+            divisionResult = _join(self.division_results[incrementsToBuy])
+        else:
+            divisionResult = get_division_result(incrementsToBuy)
+        return (firstTerm * divisionResult >> 64) >> 64
+
+    def get_prices(self, totalIncrementsSold: int, incrementsToBuy) -> np.ndarray:
+        """
+        Vectorized lookup of many buy sizes at the current totalIncrementsSold (all must be inside the table)
+        """
+        buy = np.asarray(incrementsToBuy, dtype=np.int64)
+        i = totalIncrementsSold - self.sold_start
+        if not 0 <= i < self.sold_count:
+            raise IndexError("totalIncrementsSold is outside of the table")
+        out = mul_shr_128(np.asarray(self.first_terms[i]), np.asarray(self.division_results[buy]))
+        out[totalIncrementsSold + buy > TOTAL_INCREMENTS_TO_SELL] = ALL_SOLD
+        return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EarlyLiquidity price curve")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("price")
+    p.add_argument("total_increments_sold", type=int)
+    p.add_argument("increments_to_buy", type=int)
+
+    b = sub.add_parser("build-table")
+    b.add_argument("path")
+    b.add_argument("--sold-start", type=int, default=0)
+    b.add_argument("--sold-count", type=int, default=1_000_000)
+    b.add_argument("--max-increments", type=int, default=1_000_000)
+    b.add_argument("--workers", type=int, default=None)
+
+    lk = sub.add_parser("lookup")
+    lk.add_argument("path")
+    lk.add_argument("total_increments_sold", type=int)
+    lk.add_argument("increments_to_buy", type=int)
+
+    args = parser.parse_args()
+    if args.command == "price":
+        print(get_price(args.total_increments_sold, args.increments_to_buy))
+    elif args.command == "build-table":
+        PriceTable.build(args.path, args.sold_start, args.sold_count, args.max_increments, args.workers)
+        print("done")
+    elif args.command == "lookup":
+        print(PriceTable(args.path).get_price(args.total_increments_sold, args.increments_to_buy))
@@ -0,0 +1,639 @@
+"""
+Columnar store of the protocol's decoded event logs.
+
+The event ABIs are read from the `event` declarations under src/ (there is no compiled `out/` to read them from):
+enums are `uint8`, contract and interface types are `address`, and every distinct signature gets its topic0
+from keccak.py. Logs come from raw dumps: `eth_getLogs` results (a JSON-RPC response, a list of logs, or json lines
+of either, e.g. from a local anvil node) and are decoded per event type in batches: the static head of the data and
+the topics of all logs of one event are hex-decoded as one buffer and sliced column by column, only the dynamic
+values (`bytes`, `string`, `T[]`) are read log by log.
+
+Layout of a store:
+    <store>/manifest.json                           last ingested block, the parts of every table and week
+    <store>/<Event>/week=<w>/<part>/<column>.npy    one file per column
+where `w` is the protocol week (bucket) of the block timestamp, `(timestamp - GENESIS_TIMESTAMP) // BUCKET_DURATION`.
+Columns are plain .npy files, so `np.load(path, mmap_mode="r")` maps them without parsing anything:
+    blockNumber, logIndex, transactionIndex     uint64
+    timestamp                                   int64
+    address, transactionHash                    (n, 20) / (n, 32) uint8
+    one column per event parameter:
+        uint8..uint64 / int8..int64             uint64 / int64
+        bool                                    bool
+        address, bytesN                         (n, 20) / (n, N) uint8
+        anything wider (uint256, ...)           (n, 32) uint8, big endian (`words_to_int` turns it into python ints)
+        T[k]                                    (n, k, ...) of the column of T
+        bytes, string, T[]                      <name>.npy with the values of all rows, <name>.offsets.npy (n + 1)
+        an indexed dynamic value                (n, 32) uint8, its topic (the keccak256 of the value)
+A parameter named like one of the log columns (e.g. `timestamp`) gets a `_` appended.
+A table is named after its event, with the first 4 bytes of topic0 appended when two events share a name
+but not a signature.
+
+Ingestion is incremental by block number: logs at or below the manifest's `lastBlock` are skipped and every
+ingest appends new parts (nothing is rewritten), so a dump has to hold whole blocks. Parts are written under a
+temporary name and renamed, the manifest is replaced last, so an interrupted ingest leaves the store as it was.
+Logs with `"removed": true`, anonymous events and logs whose topic0 is not one of ours are counted and dropped.
+Block timestamps are taken from `blockTimestamp` on the logs, or from an `eth_getBlockByNumber` dump (`--blocks`).
+
+Usage (from the repo root):
+    python3 repo-utils/event-store/event_store.py events
+    python3 repo-utils/event-store/event_store.py check
+    python3 repo-utils/event-store/event_store.py ingest ./logs-store dump-*.json --blocks blocks.jsonl
+    python3 repo-utils/event-store/event_store.py info ./logs-store
+    python3 repo-utils/event-store/event_store.py show ./logs-store BucketSubmissionEvent --week 42
+From python:
+    store = EventStore("./logs-store")
+    donations = store.read("AmountDonatedToBucket", columns=["bucketId", "totalAmountDonated"])
+    amounts = words_to_int(donations["totalAmountDonated"])
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import shutil
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "py-utils", "miner-pool"))
+from bucket_rewards import BUCKET_DURATION, GENESIS_TIMESTAMP  # noqa: E402
+from keccak import keccak256  # noqa: E402
+
+SOURCE_DIR = "src"
+MANIFEST_FILE_NAME = "manifest.json"
+_STORE_VERSION = 1
+
+META_COLUMNS = ("blockNumber", "logIndex", "transactionIndex", "timestamp", "address", "transactionHash")
+
+EventAbi = namedtuple("EventAbi", ["name", "signature", "topic0", "inputs", "table"])
+# type: canonical abi type, indexed: bool
+EventInput = namedtuple("EventInput", ["name", "type", "indexed"])
+
+
+class UnsupportedType(Exception):
+    pass
+
+
+# -------------------------------------------------------------------------- #
+#                                    abis                                     #
+# -------------------------------------------------------------------------- #
+
+_COMMENTS = re.compile(r"//[^\n]*|/\*.*?\*/", re.S)
+_EVENT = re.compile(r"\bevent\s+(\w+)\s*\(([^)]*)\)\s*(anonymous)?\s*;")
+_ENUM = re.compile(r"\benum\s+(\w+)\s*\{")
+_CONTRACT = re.compile(r"\b(?:contract|interface|library)\s+(\w+)")
+_STRUCT = re.compile(r"\bstruct\s+(\w+)\s*\{")
+_ELEMENTARY = re.compile(r"^(u?int(\d*)|address|bool|string|bytes(\d*))$")
+_ARRAY = re.compile(r"^(.*)\[(\d*)\]$")
+
+
+def _canonical(solidityType: str, enums: set, contracts: set) -> str:
+    array = _ARRAY.match(solidityType)
+    if array:
+        return f"{_canonical(array.group(1), enums, contracts)}[{array.group(2)}]"
+    if solidityType in ("uint", "int"):
+        return solidityType + "256"
+    if solidityType == "address payable":
+        return "address"
+    if _ELEMENTARY.match(solidityType):
+        return solidityType
+    name = solidityType.split(".")[-1]
+    if name in enums:
+        return "uint8"
+    if name in contracts:
+        return "address"
+    raise UnsupportedType(solidityType)
+
+
+def parse_events(sourceDir: str = SOURCE_DIR) -> tuple:
+    """
+    ({topic0: EventAbi}, {declaration: reason}) of every non anonymous event declared under sourceDir
+    """
+    sources = {}
+    for path in sorted(glob.glob(os.path.join(sourceDir, "**", "*.sol"), recursive=True)):
+        with open(path) as f:
+            sources[path] = _COMMENTS.sub("", f.read())
+    enums = {m for source in sources.values() for m in _ENUM.findall(source)}
+    structs = {m for source in sources.values() for m in _STRUCT.findall(source)}
+    contracts = {m for source in sources.values() for m in _CONTRACT.findall(source)} - structs
+    events, skipped = {}, {}
+    for path, source in sources.items():
+        for match in _EVENT.finditer(source):
+            name, params, anonymous = match.groups()
+            if anonymous:
+                skipped[f"{path}:{name}"] = "anonymous"
+                continue
+            inputs = []
+            try:
+                for i, param in enumerate(p.split() for p in params.split(",") if p.strip()):
+                    indexed = "indexed" in param
+                    words = [w for w in param if w != "indexed"]
+                    typeWords = words[:2] if words[:2] == ["address", "payable"] else words[:1]
+                    paramName = words[len(typeWords)] if len(words) > len(typeWords) else f"arg{i}"
+                    if paramName in META_COLUMNS:
+                        paramName += "_"
+                    inputs.append(EventInput(paramName, _canonical(" ".join(typeWords), enums, contracts), indexed))
+            except UnsupportedType as e:
+                skipped[f"{path}:{name}"] = f"unsupported type {e}"
+                continue
+            signature = f"{name}({','.join(i.type for i in inputs)})"
+            topic0 = keccak256(signature.encode())
+            if topic0 not in events:
+                events[topic0] = EventAbi(name, signature, topic0, tuple(inputs), name)
+    # two signatures with the same name get their topic0 in the table name
+    byName = {}
+    for abi in events.values():
+        byName.setdefault(abi.name, []).append(abi.topic0)
+    for name, topics in byName.items():
+        if len(topics) > 1:
+            for topic0 in topics:
+                events[topic0] = events[topic0]._replace(table=f"{name}_{topic0[:4].hex()}")
+    return events, skipped
+
+
+# -------------------------------------------------------------------------- #
+#                                  decoding                                   #
+# -------------------------------------------------------------------------- #
+
+
+def _is_dynamic(abiType: str) -> bool:
+    array = _ARRAY.match(abiType)
+    if array:
+        return array.group(2) == "" or _is_dynamic(array.group(1))
+    return abiType in ("bytes", "string")
+
+
+def _head_words(abiType: str) -> int:
+    array = _ARRAY.match(abiType)
+    if array and not _is_dynamic(abiType):
+        return int(array.group(2)) * _head_words(array.group(1))
+    return 1
+
+
+def _bits(abiType: str) -> int:
+    digits = abiType.lstrip("uint")
+    return int(digits) if digits else 256
+
+
+def _decode_words(words: np.ndarray, abiType: str) -> np.ndarray:
+    """
+    Column of a static type from its (..., head words * 32) uint8 encoding
+    """
+    array = _ARRAY.match(abiType)
+    if array:
+        size = _head_words(array.group(1)) * 32
+        count = int(array.group(2))
+        elements = words.reshape(words.shape[:-1] + (count, size))
+        return _decode_words(elements, array.group(1))
+    if abiType == "bool":
+        return words[..., 31] != 0
+    if abiType == "address":
+        return np.ascontiguousarray(words[..., 12:])
+    if abiType.startswith("bytes"):
+        return np.ascontiguousarray(words[..., : int(abiType[5:])])
+    if abiType.startswith(("uint", "int")) and _bits(abiType) <= 64:
+        low = np.ascontiguousarray(words[..., 24:])
+        if abiType.startswith("int"):
+            return low.view(">i8")[..., 0].astype(np.int64)
+        return low.view(">u8")[..., 0].astype(np.uint64)
+    return np.ascontiguousarray(words)
+
+
+def _dynamic_value(data: bytes, offset: int, abiType: str):
+    length = int.from_bytes(data[offset:offset + 32], "big")
+    start = offset + 32
+    if abiType in ("bytes", "string"):
+        return np.frombuffer(data[start:start + length], dtype=np.uint8)
+    element = _ARRAY.match(abiType).group(1)
+    if _is_dynamic(element):
+        raise UnsupportedType(abiType)
+    size = _head_words(element) * 32
+    words = np.frombuffer(data[start:start + length * size], dtype=np.uint8).reshape(length, size)
+    return _decode_words(words, element)
+
+
+def _hex_rows(values, size: int) -> np.ndarray:
+    """
+    (n, size) uint8 of n hex strings of `size` bytes each, decoded as one buffer
+    """
+    joined = "".join(v[2:] if v.startswith("0x") else v for v in values)
+    return np.frombuffer(bytes.fromhex(joined), dtype=np.uint8).reshape(len(values), size)
+
+
+def column_types(abi: EventAbi) -> dict:
+    """
+    {column: abi type} of a table, indexed values stored as their topic are `bytes32`
+    """
+    types = {"blockNumber": "uint64", "logIndex": "uint64", "transactionIndex": "uint64", "timestamp": "int64",
+             "address": "address", "transactionHash": "bytes32"}
+    for param in abi.inputs:
+        hashed = param.indexed and (_is_dynamic(param.type) or _ARRAY.match(param.type))
+        types[param.name] = "bytes32" if hashed else param.type
+    return types
+
+
+def decode_logs(abi: EventAbi, logs: list) -> tuple:
+    """
+    ({column: array}, rejected) for logs of one event (same topic0), rejected are logs whose topics or data
+    don't fit the abi (e.g. the same signature with other parameters indexed)
+    """
+    indexed = [i for i in abi.inputs if i.indexed]
+    body = [i for i in abi.inputs if not i.indexed]
+    headSize = 32 * sum(_head_words(i.type) for i in body)
+    fits = [log for log in logs if len(log["topics"]) == 1 + len(indexed) and (len(log["data"]) - 2) // 2 >= headSize]
+    rejected = len(logs) - len(fits)
+    n = len(fits)
+    columns = {
+        "blockNumber": np.array([_int(log["blockNumber"]) for log in fits], dtype=np.uint64),
+        "logIndex": np.array([_int(log.get("logIndex", 0)) for log in fits], dtype=np.uint64),
+        "transactionIndex": np.array([_int(log.get("transactionIndex", 0)) for log in fits], dtype=np.uint64),
+        "timestamp": np.array([log["_timestamp"] for log in fits], dtype=np.int64),
+        "address": _hex_rows([log["address"] for log in fits], 20),
+        "transactionHash": _hex_rows([log.get("transactionHash") or "0x" + "00" * 32 for log in fits], 32),
+    }
+    for k, param in enumerate(indexed, start=1):
+        topics = _hex_rows([log["topics"][k] for log in fits], 32)
+        # indexed dynamic values and arrays are only there as their hash
+        columns[param.name] = topics if _is_dynamic(param.type) or _ARRAY.match(param.type) else _decode_words(topics, param.type)
+    heads = _hex_rows([log["data"][: 2 + 2 * headSize] for log in fits], headSize)
+    dynamic = [i for i in body if _is_dynamic(i.type)]
+    data = [bytes.fromhex(log["data"][2:]) for log in fits] if dynamic else None
+    position = 0
+    for param in body:
+        size = 32 * _head_words(param.type)
+        words = heads[:, position:position + size]
+        if _is_dynamic(param.type):
+            offsets = _decode_words(words, "uint64").tolist()
+            values = [_dynamic_value(data[row], offsets[row], param.type) for row in range(n)]
+            lengths = np.array([len(v) for v in values], dtype=np.int64)
+            columns[param.name + ".offsets"] = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+            columns[param.name] = np.concatenate(values) if n else np.zeros(0, dtype=np.uint8)
+        else:
+            columns[param.name] = _decode_words(words, param.type)
+        position += size
+    return columns, rejected
+
+
+# -------------------------------------------------------------------------- #
+#                                    store                                    #
+# -------------------------------------------------------------------------- #
+
+
+def _int(value) -> int:
+    return int(value, 16) if isinstance(value, str) else int(value)
+
+
+def _concat(parts: list, column: str):
+    if column.endswith(".offsets"):
+        shifted, total = [], 0
+        for i, offsets in enumerate(parts):
+            shifted.append(np.asarray(offsets[(1 if i else 0):]) + total)
+            total += int(offsets[-1])
+        return np.concatenate(shifted)
+    return np.concatenate(parts)
+
+
+class EventStore:
+    def __init__(self, root: str, sourceDir: str = SOURCE_DIR, genesisTimestamp: int = None,
+                 bucketDuration: int = None):
+        self.root = root
+        self.sourceDir = sourceDir
+        self._events = None
+        path = os.path.join(root, MANIFEST_FILE_NAME)
+        if os.path.exists(path):
+            with open(path) as f:
+                self.manifest = json.load(f)
+            if self.manifest.get("version") != _STORE_VERSION:
+                raise ValueError(f"{root} was written by another version of the store")
+        else:
+            self.manifest = {
+                "version": _STORE_VERSION,
+                "genesisTimestamp": GENESIS_TIMESTAMP if genesisTimestamp is None else genesisTimestamp,
+                "bucketDuration": BUCKET_DURATION if bucketDuration is None else bucketDuration,
+                "lastBlock": -1,
+                "ingests": 0,
+                "signatures": {},
+                "columns": {},
+                "parts": {},
+                "dropped": {"removed": 0, "unknown": 0, "rejected": 0},
+            }
+
+    @property
+    def events(self) -> dict:
+        if self._events is None:
+            self._events = parse_events(self.sourceDir)[0]
+        return self._events
+
+    @property
+    def last_block(self) -> int:
+        return self.manifest["lastBlock"]
+
+    def week(self, timestamps: np.ndarray) -> np.ndarray:
+        return (np.asarray(timestamps, dtype=np.int64) - self.manifest["genesisTimestamp"]) // self.manifest["bucketDuration"]
+
+    def ingest(self, logs, timestamps: dict = None, toBlock: int = None) -> dict:
+        """
+        Decodes and appends the logs of blocks after `last_block` (up to `toBlock`, if given).
+        `timestamps` maps block numbers to timestamps for logs without `blockTimestamp`.
+        Returns the number of rows written per table and what was dropped
+        """
+        lastBlock = self.last_block
+        newLast = lastBlock if toBlock is None else max(lastBlock, toBlock)
+        groups = {}
+        counts = {"skipped": 0, "removed": 0, "unknown": 0, "rejected": 0}
+        events = self.events
+        for log in logs:
+            if log.get("blockNumber") is None:
+                # pending
+                counts["skipped"] += 1
+                continue
+            block = _int(log["blockNumber"])
+            if block <= lastBlock or (toBlock is not None and block > toBlock):
+                counts["skipped"] += 1
+                continue
+            newLast = max(newLast, block)
+            if log.get("removed"):
+                counts["removed"] += 1
+                continue
+            topics = log.get("topics") or []
+            topic0 = bytes.fromhex(topics[0][2:]) if topics else None
+            if topic0 not in events:
+                counts["unknown"] += 1
+                continue
+            timestamp = log.get("blockTimestamp")
+            if timestamp is None:
+                if timestamps is None or block not in timestamps:
+                    raise ValueError(f"no timestamp for block {block}, pass the blocks (eth_getBlockByNumber) dump")
+                timestamp = timestamps[block]
+            log["_timestamp"] = _int(timestamp)
+            groups.setdefault(topic0, []).append(log)
+
+        sequence = self.manifest["ingests"]
+        written = {}
+        for topic0, group in groups.items():
+            abi = events[topic0]
+            group.sort(key=lambda log: (_int(log["blockNumber"]), _int(log.get("logIndex", 0))))
+            columns, rejected = decode_logs(abi, group)
+            counts["rejected"] += rejected
+            if not len(columns["blockNumber"]):
+                continue
+            weeks = self.week(columns["timestamp"])
+            self.manifest["signatures"][abi.table] = abi.signature
+            self.manifest["columns"][abi.table] = column_types(abi)
+            for week in np.unique(weeks).tolist():
+                rows = np.flatnonzero(weeks == week)
+                self._write_part(abi.table, week, sequence, columns, rows)
+            written[abi.table] = written.get(abi.table, 0) + len(columns["blockNumber"])
+
+        self.manifest["lastBlock"] = newLast
+        self.manifest["ingests"] = sequence + 1
+        for key in ("removed", "unknown", "rejected"):
+            self.manifest["dropped"][key] += counts[key]
+        self._save_manifest()
+        return {**written, **counts}
+
+    def _write_part(self, table: str, week: int, sequence: int, columns: dict, rows: np.ndarray):
+        blocks = columns["blockNumber"][rows]
+        name = f"{int(blocks[0]):012d}-{int(blocks[-1]):012d}-{sequence}"
+        weekDir = os.path.join(self.root, table, f"week={week}")
+        os.makedirs(weekDir, exist_ok=True)
+        tmp = os.path.join(weekDir, f".{name}.tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for column, values in columns.items():
+            if column.endswith(".offsets"):
+                continue
+            offsets = columns.get(column + ".offsets")
+            if offsets is not None:
+                starts, ends = offsets[rows], offsets[rows + 1]
+                lengths = ends - starts
+                np.save(os.path.join(tmp, f"{column}.offsets.npy"), np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64))
+                pieces = [values[s:e] for s, e in zip(starts.tolist(), ends.tolist())]
+                np.save(os.path.join(tmp, f"{column}.npy"), np.concatenate(pieces) if pieces else values[:0])
+            else:
+                np.save(os.path.join(tmp, f"{column}.npy"), values[rows])
+        final = os.path.join(weekDir, name)
+        # left over by an interrupted ingest, never made it into the manifest
+        shutil.rmtree(final, ignore_errors=True)
+        os.replace(tmp, final)
+        self.manifest["parts"].setdefault(table, {}).setdefault(str(week), []).append(name)
+
+    def _save_manifest(self):
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, MANIFEST_FILE_NAME)
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(path + ".tmp", path)
+
+    # ---------------------------------------------------------------------- #
+    #                                 reading                                 #
+    # ---------------------------------------------------------------------- #
+
+    def tables(self) -> list:
+        return sorted(self.manifest["parts"])
+
+    def weeks(self, table: str) -> list:
+        return sorted(int(week) for week in self.manifest["parts"].get(table, {}))
+
+    def parts(self, table: str, weeks=None, columns=None, mmap: bool = True):
+        """
+        Yields {column: array} of every part of a table (in week, then ingestion order), memory mapped
+        """
+        wanted = None if weeks is None else {int(week) for week in weeks}
+        order = {column: i for i, column in enumerate(self.manifest["columns"].get(table, {}))}
+        for week in self.weeks(table):
+            if wanted is not None and week not in wanted:
+                continue
+            for name in self.manifest["parts"][table][str(week)]:
+                partDir = os.path.join(self.root, table, f"week={week}", name)
+                part = {}
+                files = sorted(os.listdir(partDir), key=lambda file: (order.get(file.split(".")[0], len(order)), file))
+                for file in files:
+                    column = file[:-len(".npy")]
+                    if columns is None or column.split(".")[0] in columns:
+                        part[column] = np.load(os.path.join(partDir, file), mmap_mode="r" if mmap else None)
+                yield part
+
+    def read(self, table: str, weeks=None, columns=None) -> dict:
+        """
+        {column: array} of the whole table (or of some weeks), rows in (block, log index) order.
+        A table with a single part is returned memory mapped, several parts are concatenated in the order
+        `parts` yields them: weeks follow block timestamps and ingests follow block numbers, so that is block order
+        """
+        parts = list(self.parts(table, weeks, columns))
+        if not parts:
+            return {}
+        if len(parts) == 1:
+            return parts[0]
+        return {column: _concat([part[column] for part in parts], column) for column in parts[0]}
+
+
+def words_to_int(words: np.ndarray) -> np.ndarray:
+    """
+    Python ints (object array) of an (..., 32) big endian uint8 column, e.g. a uint256 column
+    """
+    words = np.asarray(words)
+    flat = words.reshape(-1, words.shape[-1])
+    values = np.empty(flat.shape[0], dtype=object)
+    values[:] = [int.from_bytes(row.tobytes(), "big") for row in flat]
+    return values.reshape(words.shape[:-1])
+
+
+def to_hex(column: np.ndarray) -> list:
+    """
+    0x strings of an (n, size) uint8 column (addresses, hashes, bytes32)
+    """
+    return ["0x" + row.tobytes().hex() for row in np.asarray(column)]
+
+
+def ragged(values: np.ndarray, offsets: np.ndarray, row: int) -> np.ndarray:
+    """
+    Value of one row of a `bytes` / `string` / `T[]` column
+    """
+    return values[int(offsets[row]):int(offsets[row + 1])]
+
+
+# -------------------------------------------------------------------------- #
+#                                   inputs                                    #
+# -------------------------------------------------------------------------- #
+
+
+def _json_values(path: str):
+    with open(path) as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield json.load(f)
+
+
+def _flatten(value):
+    if isinstance(value, list):
+        for item in value:
+            yield from _flatten(item)
+    elif isinstance(value, dict) and "result" in value:
+        yield from _flatten(value["result"])
+    elif isinstance(value, dict):
+        yield value
+
+
+def read_logs(path: str):
+    """
+    Logs of an `eth_getLogs` dump: responses, lists of logs or single logs, as json or json lines
+    """
+    for value in _json_values(path):
+        for item in _flatten(value):
+            if "topics" in item:
+                yield item
+
+
+def read_blocks(path: str) -> dict:
+    """
+    {number: timestamp} of an `eth_getBlockByNumber` dump (same formats as `read_logs`)
+    """
+    timestamps = {}
+    for value in _json_values(path):
+        for item in _flatten(value):
+            if "number" in item and "timestamp" in item:
+                timestamps[_int(item["number"])] = _int(item["timestamp"])
+    return timestamps
+
+
+def check_read(sourceDir: str = SOURCE_DIR):
+    """
+    Ingests synthetic `AmountDonatedToBucket` logs in two dumps spanning several weeks into a temporary store and
+    checks that `read` returns them in block order, with and without a column subset
+    """
+    import tempfile
+
+    store = EventStore(tempfile.mkdtemp(prefix="event-store-check-"), sourceDir, genesisTimestamp=0, bucketDuration=100)
+    topic0 = next(abi.topic0 for abi in store.events.values() if abi.name == "AmountDonatedToBucket")
+    blocks = list(range(1, 10))
+
+    def log(block):
+        return {"blockNumber": hex(block), "logIndex": "0x0", "blockTimestamp": hex(block * 40),
+                "address": "0x" + "11" * 20, "topics": ["0x" + topic0.hex(), "0x" + f"{block:064x}"],
+                "data": "0x" + f"{block * 10**24:064x}"}
+
+    try:
+        store.ingest(log(block) for block in blocks[:6])
+        store.ingest(log(block) for block in blocks[6:])
+        assert len(list(store.parts("AmountDonatedToBucket"))) > 2
+        full = store.read("AmountDonatedToBucket")
+        assert full["blockNumber"].tolist() == blocks
+        subset = store.read("AmountDonatedToBucket", columns=["bucketId", "totalAmountDonated"])
+        assert list(subset) == ["bucketId", "totalAmountDonated"]
+        assert words_to_int(subset["bucketId"]).tolist() == blocks
+        assert words_to_int(subset["totalAmountDonated"]).tolist() == [block * 10**24 for block in blocks]
+        later = store.read("AmountDonatedToBucket", weeks=[2, 3], columns=["bucketId"])
+        assert words_to_int(later["bucketId"]).tolist() == [block for block in blocks if block * 40 >= 200]
+    finally:
+        shutil.rmtree(store.root)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Decode protocol event logs into a columnar store")
+    parser.add_argument("--src", default=SOURCE_DIR, help="solidity sources to read the event abis from")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("events")
+    subparsers.add_parser("check", help="self-check of ingest and read on synthetic logs")
+    ingest = subparsers.add_parser("ingest")
+    ingest.add_argument("store")
+    ingest.add_argument("dumps", nargs="+", help="eth_getLogs dumps (.json / .jsonl)")
+    ingest.add_argument("--blocks", nargs="*", default=[], help="eth_getBlockByNumber dumps, for the timestamps")
+    ingest.add_argument("--to-block", type=int, default=None, help="last block the dumps fully cover")
+    ingest.add_argument("--genesis", type=int, default=GENESIS_TIMESTAMP, help="week 0 of a new store")
+    subparsers.add_parser("info").add_argument("store")
+    show = subparsers.add_parser("show")
+    show.add_argument("store")
+    show.add_argument("table")
+    show.add_argument("--week", type=int, nargs="*", default=None)
+    show.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.command == "events":
+        events, skipped = parse_events(args.src)
+        for abi in sorted(events.values(), key=lambda abi: abi.table):
+            print(f"0x{abi.topic0.hex()} {abi.table} {abi.signature}")
+        for declaration, reason in skipped.items():
+            print(f"skipped {declaration}: {reason}")
+    elif args.command == "check":
+        check_read(args.src)
+        print("checks passed")
+    elif args.command == "ingest":
+        store = EventStore(args.store, args.src, args.genesis)
+        timestamps = {}
+        for path in args.blocks:
+            timestamps.update(read_blocks(path))
+        logs = (log for path in args.dumps for log in read_logs(path))
+        counts = store.ingest(logs, timestamps, args.to_block)
+        print(" ".join(f"{k}: {v}" for k, v in counts.items()) + f" lastBlock: {store.last_block}")
+    elif args.command == "info":
+        store = EventStore(args.store)
+        print(f"lastBlock: {store.last_block} dropped: {store.manifest['dropped']}")
+        for table in store.tables():
+            weeks = store.weeks(table)
+            rows = sum(len(part["blockNumber"]) for part in store.parts(table, columns=["blockNumber"]))
+            print(f"{table}: {rows} rows, weeks {weeks[0]}..{weeks[-1]}, {store.manifest['signatures'][table]}")
+    elif args.command == "show":
+        store = EventStore(args.store)
+        table = store.read(args.table, args.week)
+        types = store.manifest["columns"].get(args.table, {})
+        names = [c for c in table if not c.endswith(".offsets")]
+        print(",".join(names))
+        for row in range(min(args.limit, len(table.get("blockNumber", [])))):
+            cells = []
+            for name in names:
+                column = table[name]
+                if name + ".offsets" in table:
+                    value = ragged(column, table[name + ".offsets"], row)
+                    cells.append("0x" + value.tobytes().hex() if value.dtype == np.uint8 else str(value.tolist()))
+                elif types.get(name, "").startswith(("uint", "int")) and column.dtype == np.uint8:
+                    cells.append(str(words_to_int(column[row])))
+                elif column.dtype == np.uint8:
+                    cells.append("0x" + np.asarray(column[row]).tobytes().hex())
+                else:
+                    cells.append(str(np.asarray(column[row]).tolist()))
+            print(",".join(cells))
@@ -0,0 +1,276 @@
+"""
+Gas regression report over the git history of .gas-snapshot (written by `make gas.snapshot`).
+
+Every line of the snapshot is one test in one of three forms:
+    Contract:test_name() (gas: 226246)                                   unit test
+    Contract:testFuzz_name(uint256) (runs: 1000, μ: 232830, ~: 233032)   fuzz test (mean, median)
+    Contract:invariant_name() (runs: 10, calls: 150, reverts: 73)        invariant test (no gas figure)
+
+The history is read with one `git log` for the commits touching the file and one `git cat-file --batch`
+for the blobs that aren't parsed yet. Parsed snapshots are cached by blob hash in an append-only
+json lines file, so a rerun only parses the snapshots committed since the last run
+(and a blob shared by several commits is only parsed once).
+
+The series of a test is its gas (unit tests) or its fuzz median, one point per commit, oldest first.
+A point is flagged as a regression when it is more than `--threshold` above the previous point. Fuzz medians
+move between runs with the random inputs, so they are compared to a noise band instead: the median of the last
+`--window` points plus `--z` scaled median absolute deviations, and only a point above the band (and above the
+threshold) is flagged. A band of fewer than `MIN_BAND_POINTS` points has no usable spread (the MAD of one
+point is 0), so a fuzz test is only checked once that many points precede it.
+Unit test gas is deterministic and has no band.
+
+Usage (from the repo root):
+    python3 repo-utils/gas-snapshot/gas_history.py --threshold 0.02
+    python3 repo-utils/gas-snapshot/gas_history.py --worktree --csv gas-history.csv
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+SNAPSHOT = ".gas-snapshot"
+CACHE_FILE_NAME = "gas-snapshot-blobs.jsonl"  # kept in the .git directory unless another path is given
+EMPTY_BLOB = "0" * 40
+MIN_BAND_POINTS = 3
+
+# test kinds
+GAS = 0
+FUZZ = 1
+INVARIANT = 2
+
+_LINE = re.compile(
+    r"^(?P<name>\S.*?) \((?:gas: (?P<gas>\d+)"
+    r"|runs: (?P<runs>\d+), (?:μ: (?P<mean>\d+), ~: (?P<median>\d+)|calls: (?P<calls>\d+), reverts: (?P<reverts>\d+)))\)\s*$",
+    re.MULTILINE,
+)
+
+# gas is the unit test gas or the fuzz median, mean the fuzz mean, the other fields are None when they don't apply
+Entry = namedtuple("Entry", ["kind", "gas", "mean", "runs", "calls", "reverts"])
+Commit = namedtuple("Commit", ["sha", "timestamp", "blob"])
+Regression = namedtuple("Regression", ["test", "commit", "before", "after", "change", "band"])
+
+
+def parse_snapshot(text: str) -> dict:
+    """
+    {test: Entry} of a snapshot, lines that aren't test results are ignored
+    """
+    tests = {}
+    for m in _LINE.finditer(text):
+        name, gas, runs, mean, median, calls, reverts = m.group("name", "gas", "runs", "mean", "median", "calls", "reverts")
+        if gas is not None:
+            tests[name] = Entry(GAS, int(gas), None, None, None, None)
+        elif median is not None:
+            tests[name] = Entry(FUZZ, int(median), int(mean), int(runs), None, None)
+        else:
+            tests[name] = Entry(INVARIANT, None, None, int(runs), int(calls), int(reverts))
+    return tests
+
+
+# -------------------------------------------------------------------------- #
+#                                    git                                      #
+# -------------------------------------------------------------------------- #
+
+
+def _git(repo: str, *args, input: bytes = None) -> bytes:
+    return subprocess.run(["git", "-C", repo, *args], input=input, check=True, capture_output=True).stdout
+
+
+def snapshot_commits(repo: str, path: str = SNAPSHOT, revision: str = "HEAD") -> list:
+    """
+    Commits that changed `path`, oldest first, with the blob of the file after the commit
+    (commits that delete the file are left out)
+    """
+    out = _git(repo, "log", "--format=@%H %ct", "--raw", "--no-abbrev", "--no-renames", revision, "--", path).decode()
+    commits = []
+    sha = timestamp = None
+    for line in out.splitlines():
+        if line.startswith("@"):
+            sha, timestamp = line[1:].split()
+        elif line.startswith(":"):
+            blob = line.split()[3]
+            if blob != EMPTY_BLOB:
+                commits.append(Commit(sha, int(timestamp), blob))
+    commits.reverse()
+    return commits
+
+
+def read_blobs(repo: str, blobs: list) -> dict:
+    """
+    {blob: text} through one `git cat-file --batch`
+    """
+    if not blobs:
+        return {}
+    out = _git(repo, "cat-file", "--batch", input="".join(f"{b}\n" for b in blobs).encode())
+    texts = {}
+    pos = 0
+    for blob in blobs:
+        end = out.index(b"\n", pos)
+        header = out[pos:end].split()
+        if header[1] == b"missing":
+            pos = end + 1
+            continue
+        size = int(header[2])
+        texts[blob] = out[end + 1 : end + 1 + size].decode()
+        pos = end + 1 + size + 1
+    return texts
+
+
+class SnapshotCache:
+    """
+    Parsed snapshots by blob hash, persisted as one json line per blob
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self.snapshots = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # a run interrupted while appending, the blob is parsed again
+                        continue
+                    self.snapshots[record["blob"]] = {name: Entry(*e) for name, e in record["tests"].items()}
+
+    def get(self, repo: str, blobs: list) -> dict:
+        missing = sorted({b for b in blobs if b not in self.snapshots})
+        parsed = {blob: parse_snapshot(text) for blob, text in read_blobs(repo, missing).items()}
+        self.snapshots.update(parsed)
+        if self.path and parsed:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a") as f:
+                for blob, tests in parsed.items():
+                    f.write(json.dumps({"blob": blob, "tests": {n: list(e) for n, e in tests.items()}}) + "\n")
+        return {b: self.snapshots[b] for b in blobs if b in self.snapshots}
+
+
+# -------------------------------------------------------------------------- #
+#                                   series                                    #
+# -------------------------------------------------------------------------- #
+
+
+class History:
+    """
+    Columnar series: `gas[i, j]` is test j at commit i (NaN when the test isn't in that snapshot),
+    `mean` the fuzz means, `kind[j]` the kind of test j and `present[i, j]` whether the test is in the snapshot
+    """
+
+    def __init__(self, commits: list, snapshots: list):
+        self.commits = commits
+        self.tests = sorted({name for tests in snapshots for name in tests})
+        column = {name: j for j, name in enumerate(self.tests)}
+        self.kind = np.full(len(self.tests), GAS, dtype=np.int8)
+        self.gas = np.full((len(commits), len(self.tests)), np.nan)
+        self.mean = np.full((len(commits), len(self.tests)), np.nan)
+        self.present = np.zeros((len(commits), len(self.tests)), dtype=bool)
+        for i, tests in enumerate(snapshots):
+            for name, entry in tests.items():
+                j = column[name]
+                self.present[i, j] = True
+                self.kind[j] = entry.kind
+                if entry.gas is not None:
+                    self.gas[i, j] = entry.gas
+                if entry.mean is not None:
+                    self.mean[i, j] = entry.mean
+
+    def series(self, test: str) -> np.ndarray:
+        return self.gas[:, self.tests.index(test)]
+
+    def regressions(self, threshold: float = 0.01, window: int = 10, z: float = 3.0) -> list:
+        """
+        Points more than `threshold` above the previous point of their test (and above the noise band for fuzz tests)
+        """
+        found = []
+        for j, test in enumerate(self.tests):
+            if self.kind[j] == INVARIANT:
+                continue
+            rows = np.flatnonzero(~np.isnan(self.gas[:, j]))
+            values = self.gas[rows, j]
+            if values.shape[0] < 2:
+                continue
+            change = values[1:] / np.maximum(values[:-1], 1) - 1
+            for k in np.flatnonzero(change > threshold) + 1:
+                band = None
+                if self.kind[j] == FUZZ:
+                    history = values[max(0, k - window) : k]
+                    if history.shape[0] < MIN_BAND_POINTS:
+                        continue
+                    center = np.median(history)
+                    band = center + z * 1.4826 * np.median(np.abs(history - center))
+                    if values[k] <= band:
+                        continue
+                found.append(Regression(test, self.commits[rows[k]], int(values[k - 1]), int(values[k]), float(change[k - 1]), band))
+        found.sort(key=lambda r: (r.commit.timestamp, -r.change))
+        return found
+
+    def write_csv(self, path: str):
+        """
+        One row per (commit, test) point
+        """
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(["commit", "timestamp", "test", "kind", "gas", "mean"])
+            kinds = ["gas", "fuzz", "invariant"]
+            for i, commit in enumerate(self.commits):
+                for j in np.flatnonzero(self.present[i]):
+                    gas = "" if np.isnan(self.gas[i, j]) else int(self.gas[i, j])
+                    mean = "" if np.isnan(self.mean[i, j]) else int(self.mean[i, j])
+                    writer.writerow([commit.sha, commit.timestamp, self.tests[j], kinds[self.kind[j]], gas, mean])
+
+
+def load_history(repo: str = ".", path: str = SNAPSHOT, revision: str = "HEAD", cache: str = "",
+                 worktree: bool = False) -> History:
+    """
+    History of `path` up to `revision`, with the uncommitted file appended as a last "worktree" point if asked.
+    `cache` is the blob cache file, "" for the default one in the .git directory and None for no cache
+    """
+    commits = snapshot_commits(repo, path, revision)
+    if cache == "":
+        gitDir = _git(repo, "rev-parse", "--absolute-git-dir").decode().strip()
+        cache = os.path.join(gitDir, CACHE_FILE_NAME)
+    blobCache = SnapshotCache(cache)
+    parsed = blobCache.get(repo, [c.blob for c in commits])
+    commits = [c for c in commits if c.blob in parsed]
+    snapshots = [parsed[c.blob] for c in commits]
+    if worktree and os.path.exists(os.path.join(repo, path)):
+        with open(os.path.join(repo, path), encoding="utf-8") as f:
+            text = f.read()
+        blob = _git(repo, "hash-object", "--stdin", input=text.encode()).decode().strip()
+        if not commits or commits[-1].blob != blob:
+            commits.append(Commit("worktree", int(os.path.getmtime(os.path.join(repo, path))), blob))
+            snapshots.append(parse_snapshot(text))
+    return History(commits, snapshots)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Flag gas regressions over the history of .gas-snapshot")
+    parser.add_argument("--repo", default=".")
+    parser.add_argument("--file", default=SNAPSHOT)
+    parser.add_argument("--revision", default="HEAD")
+    parser.add_argument("--cache", default="", help=f"blob cache file (default .git/{CACHE_FILE_NAME})")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.01, help="relative increase to flag")
+    parser.add_argument("--window", type=int, default=10, help=f"points in the fuzz noise band (>= {MIN_BAND_POINTS})")
+    parser.add_argument("--z", type=float, default=3.0, help="width of the fuzz noise band in MADs")
+    parser.add_argument("--worktree", action="store_true", help="also compare the uncommitted snapshot")
+    parser.add_argument("--csv", default=None, help="write every point of every series to a csv")
+    args = parser.parse_args()
+    if args.window < MIN_BAND_POINTS:
+        parser.error(f"--window must be at least {MIN_BAND_POINTS}")
+
+    history = load_history(args.repo, args.file, args.revision, None if args.no_cache else args.cache, args.worktree)
+    if args.csv:
+        history.write_csv(args.csv)
+    regressions = history.regressions(args.threshold, args.window, args.z)
+    print(f"snapshots: {len(history.commits)} tests: {len(history.tests)} regressions: {len(regressions)}")
+    for r in regressions:
+        band = "" if r.band is None else f" (noise band {r.band:.0f})"
+        print(f"{r.commit.sha[:10]} {r.test}: {r.before} -> {r.after} (+{100 * r.change:.2f}%){band}")
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,319 @@
+"""
+Multi-bucket version of Bucket.py.
+
+Bucket.py keeps its own `slashNonceToSlashTimestamp` per bucket and re-walks every slash from
+`lastUpdatedNonce` to `globalNonce` on each `calculateBucketSubmissionStartTimestamp` call,
+which is quadratic once many buckets share a long slash history.
+
+Here the slash history lives once in `SlashIndex` (timestamps in nonce order, plus a sorted copy for range queries)
+and every bucket caches where its walk stopped:
+    - the walk over slashes [lastUpdatedNonce, globalNonce) is resumed from the cached nonce instead of restarted
+    - once a slash falls outside the bucket's window the walk stops for good (as in the contract),
+      so later slashes never touch that bucket again
+    - the cache is only reset when a report moves the bucket's `lastUpdatedNonce`
+Buckets are only created when first pushed to, and are only ever updated when queried,
+so a slash costs O(1) no matter how many buckets exist.
+
+The rules follow src/MinerPoolAndGCA/GCA.sol (`_calculateBucketSubmissionEndTimestamp`, `_isBucketFinalized`, `_WCEIL`)
+which is what Bucket.py was prototyping:
+    - a bucket's submission window is [genesis + id * week, + 1 week), it finalizes one week later
+    - a slash at t inside [windowStart, finalizationTimestamp] moves the end of submissions to WCEIL(t)
+    - pushing a report after a slash clears the reports and moves the finalization to WCEIL(t) + 1 week
+"""
+import bisect
+
+week_in_seconds = 604800
+
+
+class BucketSubmissionNotOpen(Exception):
+    pass
+
+
+class BucketSubmissionEnded(Exception):
+    pass
+
+
+def between(a: int, b: int, c: int) -> bool:
+    """
+    `GCA._between`, inclusive on both ends
+    """
+    return a >= b and a <= c
+
+
+class SlashIndex:
+    """
+    Every slash event, shared by all buckets
+    """
+
+    def __init__(self, genesisTimestamp: int = 0, bucketDuration: int = week_in_seconds):
+        self.genesisTimestamp = genesisTimestamp
+        self.bucketDuration = bucketDuration
+        # slashNonceToSlashTimestamp, the nonce is the index
+        self.timestamps = []
+        # the same timestamps, sorted, for range queries
+        self._sorted = []
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def push(self, timestamp: int) -> int:
+        nonce = len(self.timestamps)
+        self.timestamps.append(timestamp)
+        if not self._sorted or timestamp >= self._sorted[-1]:
+            self._sorted.append(timestamp)
+        else:
+            bisect.insort(self._sorted, timestamp)
+        return nonce
+
+    def WCEIL(self, nonce: int) -> int:
+        """
+        `GCA._WCEIL`: the end of the submission period of the bucket the slash happened in, plus one more week
+        """
+        bucketNonceWasSlashedAt = (self.timestamps[nonce] - self.genesisTimestamp) // self.bucketDuration
+        return (bucketNonceWasSlashedAt + 2) * self.bucketDuration + self.genesisTimestamp
+
+    def countBetween(self, start: int, end: int) -> int:
+        """
+        Number of slashes with start <= timestamp <= end, O(log n)
+        """
+        return bisect.bisect_right(self._sorted, end) - bisect.bisect_left(self._sorted, start)
+
+
+class IndexedBucket:
+    __slots__ = (
+        "id",
+        "originNonce",
+        "lastUpdatedNonce",
+        "finalizationTimestamp",
+        "reports",
+        "_scanNonce",
+        "_scanStart",
+        "_scanDone",
+    )
+
+    def __init__(self, id: int, nonce: int, finalizationTimestamp: int, submissionStartTimestamp: int):
+        self.id = id
+        self.originNonce = nonce
+        self.lastUpdatedNonce = nonce
+        self.finalizationTimestamp = finalizationTimestamp
+        self.reports = []
+        self._resetScan(submissionStartTimestamp)
+
+    def _resetScan(self, submissionStartTimestamp: int):
+        self._scanNonce = self.lastUpdatedNonce
+        self._scanStart = submissionStartTimestamp
+        self._scanDone = False
+
+
+class BucketIndex:
+    def __init__(self, genesisTimestamp: int = 0, bucketDuration: int = week_in_seconds):
+        self.genesisTimestamp = genesisTimestamp
+        self.bucketDuration = bucketDuration
+        self.currentTimestamp = genesisTimestamp
+        self.slashes = SlashIndex(genesisTimestamp, bucketDuration)
+        self.buckets = {}
+
+    # ---------------------------------------------------------------------- #
+    #                                  time                                   #
+    # ---------------------------------------------------------------------- #
+
+    @property
+    def globalNonce(self) -> int:
+        return len(self.slashes)
+
+    def warpForward(self, timeToWarp: int):
+        self.currentTimestamp += timeToWarp
+
+    def executeSlashEvent(self, timestamp: int = None) -> int:
+        """
+        Records a slash at `timestamp` (defaults to now) and returns its nonce. No bucket is touched
+        """
+        return self.slashes.push(self.currentTimestamp if timestamp is None else timestamp)
+
+    # ---------------------------------------------------------------------- #
+    #                               windows                                   #
+    # ---------------------------------------------------------------------- #
+
+    def submissionStartTimestampNotReinstated(self, bucketId: int) -> int:
+        return bucketId * self.bucketDuration + self.genesisTimestamp
+
+    def submissionEndTimestampNotReinstated(self, bucketId: int) -> int:
+        return self.submissionStartTimestampNotReinstated(bucketId) + self.bucketDuration
+
+    def finalizationTimestampNotReinstated(self, bucketId: int) -> int:
+        return self.submissionEndTimestampNotReinstated(bucketId) + self.bucketDuration
+
+    def addBucket(self, bucketId: int) -> IndexedBucket:
+        """
+        Initializes a bucket at the current slash nonce (what the contract does on the first report)
+        """
+        bucket = self.buckets.get(bucketId)
+        if bucket is None:
+            bucket = IndexedBucket(
+                bucketId,
+                self.globalNonce,
+                self.finalizationTimestampNotReinstated(bucketId),
+                self.submissionStartTimestampNotReinstated(bucketId),
+            )
+            self.buckets[bucketId] = bucket
+        return bucket
+
+    def calculateBucketSubmissionEndTimestamp(self, bucketId: int) -> int:
+        """
+        `GCA._calculateBucketSubmissionEndTimestamp`, resuming the walk from where the last call stopped
+        """
+        bucket = self.buckets.get(bucketId)
+        if bucket is None:
+            return self.submissionEndTimestampNotReinstated(bucketId)
+        globalNonce = self.globalNonce
+        if bucket.originNonce == globalNonce:
+            return self.submissionEndTimestampNotReinstated(bucketId)
+        if bucket.lastUpdatedNonce == globalNonce:
+            return bucket.finalizationTimestamp
+
+        if not bucket._scanDone:
+            timestamps = self.slashes.timestamps
+            start = bucket._scanStart
+            finalizationTimestamp = bucket.finalizationTimestamp
+            i = bucket._scanNonce
+            while i < globalNonce:
+                if between(timestamps[i], start, finalizationTimestamp):
+                    start = self.slashes.WCEIL(i)
+                else:
+                    bucket._scanDone = True
+                    break
+                i += 1
+            bucket._scanNonce = i
+            bucket._scanStart = start
+        return bucket._scanStart
+
+    # ---------------------------------------------------------------------- #
+    #                                 reports                                 #
+    # ---------------------------------------------------------------------- #
+
+    def pushReport(self, bucketId: int, reportData) -> bool:
+        """
+        The timing rules of `GCA._submitWeeklyReport`
+        """
+        if self.currentTimestamp < self.submissionStartTimestampNotReinstated(bucketId):
+            raise BucketSubmissionNotOpen()
+        bucket = self.addBucket(bucketId)
+        bucketSubmissionEndTimestamp = self.calculateBucketSubmissionEndTimestamp(bucketId)
+        if self.currentTimestamp >= bucketSubmissionEndTimestamp:
+            raise BucketSubmissionEnded()
+
+        globalNonce = self.globalNonce
+        if bucket.lastUpdatedNonce != globalNonce:
+            bucket.lastUpdatedNonce = globalNonce
+            if bucketSubmissionEndTimestamp + self.bucketDuration > bucket.finalizationTimestamp:
+                bucket.finalizationTimestamp = bucketSubmissionEndTimestamp + self.bucketDuration
+            bucket.reports.clear()
+            bucket._resetScan(self.submissionStartTimestampNotReinstated(bucketId))
+        bucket.reports.append(reportData)
+        return True
+
+    def isFinalized(self, bucketId: int) -> bool:
+        """
+        `GCA._isBucketFinalized`. Uninitialized buckets are never finalized
+        """
+        bucket = self.buckets.get(bucketId)
+        if bucket is None:
+            return False
+        finalized = self.currentTimestamp >= bucket.finalizationTimestamp
+        if bucket.lastUpdatedNonce == self.globalNonce:
+            return finalized
+        return self.slashes.timestamps[bucket.lastUpdatedNonce] >= bucket.finalizationTimestamp and finalized
+
+    def slashesInWindow(self, bucketId: int) -> int:
+        """
+        Number of slashes between the bucket's submission start and its finalization timestamp, O(log n)
+        """
+        bucket = self.buckets.get(bucketId)
+        finalizationTimestamp = (
+            bucket.finalizationTimestamp if bucket is not None else self.finalizationTimestampNotReinstated(bucketId)
+        )
+        return self.slashes.countBetween(self.submissionStartTimestampNotReinstated(bucketId), finalizationTimestamp)
+
+
+# Same scenarios as Bucket.py, run against bucket 0 of the index
+def test_bucketMultipleSlashes():
+    index = BucketIndex()
+    index.addBucket(0)
+    index.warpForward(week_in_seconds * 2 - 10)
+    index.executeSlashEvent()
+    assert index.calculateBucketSubmissionEndTimestamp(0) == week_in_seconds * 3
+    assert index.isFinalized(0) == False
+
+    index.warpForward(1)
+    index.executeSlashEvent()
+    assert index.calculateBucketSubmissionEndTimestamp(0) == week_in_seconds * 3
+    assert index.isFinalized(0) == False
+
+    index.warpForward(50)
+    index.executeSlashEvent()
+    index.pushReport(0, 32)
+    index.warpForward(week_in_seconds * 4)
+    assert index.isFinalized(0) == True
+
+
+def test_bucketNormalShouldFinalizeNormally():
+    index = BucketIndex()
+    index.pushReport(0, 1)
+    index.warpForward(week_in_seconds)
+    assert index.isFinalized(0) == False
+    index.warpForward(week_in_seconds)
+    assert index.isFinalized(0) == True
+    index.executeSlashEvent()
+    # Slash event happens after finalization so it should still be finalized
+    assert index.isFinalized(0) == True
+
+
+def test_pushReportDataShouldUpdateNonceAndClearOldDataIfNotInSync():
+    index = BucketIndex()
+    index.pushReport(0, 10)
+    index.pushReport(0, 20)
+    bucket = index.buckets[0]
+    assert len(bucket.reports) == 2
+
+    index.warpForward(week_in_seconds - 1)
+    index.executeSlashEvent()
+    index.pushReport(0, 10)
+    assert len(bucket.reports) == 1
+    assert bucket.lastUpdatedNonce == index.globalNonce
+    assert index.isFinalized(0) == False
+
+    index.warpForward(100)
+    index.executeSlashEvent()
+    index.warpForward(100)
+    index.executeSlashEvent()
+    assert index.isFinalized(0) == False
+    assert bucket.lastUpdatedNonce != index.globalNonce
+    assert len(bucket.reports) == 1
+
+    index.pushReport(0, 4000)
+    assert index.isFinalized(0) == False
+    assert bucket.lastUpdatedNonce == index.globalNonce
+    assert bucket.reports == [4000]
+    assert index.calculateBucketSubmissionEndTimestamp(0) == week_in_seconds * 4
+
+
+def test_slashesAreSharedAcrossBuckets():
+    index = BucketIndex()
+    for bucketId in range(1000):
+        index.addBucket(bucketId)
+    index.warpForward(week_in_seconds * 500 + 10)
+    index.executeSlashEvent()
+    # only the buckets whose window contains the slash are delayed
+    assert index.calculateBucketSubmissionEndTimestamp(499) == week_in_seconds * 502
+    assert index.calculateBucketSubmissionEndTimestamp(500) == week_in_seconds * 502
+    assert index.calculateBucketSubmissionEndTimestamp(10) == index.submissionStartTimestampNotReinstated(10)
+    assert index.slashesInWindow(499) == 1
+    assert index.slashesInWindow(10) == 0
+
+
+if __name__ == "__main__":
+    test_bucketMultipleSlashes()
+    test_bucketNormalShouldFinalizeNormally()
+    test_pushReportDataShouldUpdateNonceAndClearOldDataIfNotInSync()
+    test_slashesAreSharedAcrossBuckets()
+    print("ok")
@@ -0,0 +1,321 @@
+"""
+Event-driven simulator for src/CarbonCreditDescendingPriceAuction.sol.
+
+`CarbonCreditAuction` holds the same state variables as the contract and applies `buyGCC` / `receiveGCC`
+with the same integer math, reverts and ordering:
+    - `getPricePerUnit` decays `pricePerSaleUnit` with a 7 day half-life since the last sale
+      (exactly, through the ABDKMath64x64 mirror in py-utils/abdkmath64x64)
+    - `totalSupply` vests every pending amount linearly over one week from the last receive
+    - a sale moves the price up by the share of the units left for sale it bought,
+      capped at 2x `pseudoPrice24HoursAgo`, which is only refreshed once a day has passed since the last refresh
+
+Nothing in the contract changes between events, so the simulator never steps through time:
+every query is evaluated in closed form at the event timestamp.
+`replay` consumes columnar event arrays (millions of events) in time order and writes one row per event,
+and `price_at` / `supply_at` evaluate the curve between events for a whole array of timestamps at once.
+
+Pass `exact=False` to evaluate the half-life with a float `2 ** (-t / T)` instead of the 64.64 pipeline.
+Everything else stays integer math, and the price is within a few units of the exact one.
+
+Usage:
+    python3 auction_sim.py --years 5 --buys-per-day 200 --seed 1 --out events.npz
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "py-utils"))
+from abdkmath64x64 import ABDKRevert, halflife  # noqa: E402
+
+# Constants from CarbonCreditDescendingPriceAuction.sol
+PRECISION = 10**8
+ONE_DAY = 86400
+ONE_WEEK = 7 * 86400
+SALE_UNIT = 10**6
+UINT256_MAX = 2**256 - 1
+
+# event kinds
+RECEIVE = 0
+BUY = 1
+# buy `fraction * unitsForSale` units (at least 1), the amount is a fraction in PRECISION
+BUY_FRACTION = 2
+
+# event statuses
+OK = 0
+CANNOT_BUY_ZERO_UNITS = 1
+USER_PRICE_NOT_HIGH_ENOUGH = 2
+NOT_ENOUGH_GCC_FOR_SALE = 3
+# checked math / ABDKMath64x64 require() failures
+ARITHMETIC_REVERT = 4
+
+
+class AuctionRevert(Exception):
+    status = None
+
+
+class CannotBuyZeroUnits(AuctionRevert):
+    status = CANNOT_BUY_ZERO_UNITS
+
+
+class UserPriceNotHighEnough(AuctionRevert):
+    status = USER_PRICE_NOT_HIGH_ENOUGH
+
+
+class NotEnoughGCCForSale(AuctionRevert):
+    status = NOT_ENOUGH_GCC_FOR_SALE
+
+
+class ArithmeticRevert(AuctionRevert):
+    status = ARITHMETIC_REVERT
+
+
+def _checked(x: int) -> int:
+    if x > UINT256_MAX:
+        raise ArithmeticRevert()
+    return x
+
+
+def _half_life_float(initialValue: int, elapsedSeconds: int) -> int:
+    if elapsedSeconds == 0:
+        return initialValue
+    return int(initialValue * 2.0 ** (-elapsedSeconds / halflife.CARBON_CREDIT_AUCTION_HALVING_PERIOD))
+
+
+class CarbonCreditAuction:
+    def __init__(self, startingPrice: int, exact: bool = True):
+        self.pricePerSaleUnit = startingPrice
+        self.pseudoPrice24HoursAgo = startingPrice
+        self.pesudoTotalAmountFullyAvailableForSale = 0
+        self.totalAmountReceived = 0
+        self.totalUnitsSold = 0
+        self.lastSaleTimestamp = 0
+        self.lastReceivedTimestamp = 0
+        self.lastPriceChangeTimestamp = 0
+        self.firstReceivedTimestamp = 0
+        self.exact = exact
+        self._halfLife = halflife.calculate_auction_half_life_value if exact else _half_life_float
+
+    # ---------------------------------------------------------------------- #
+    #                                   views                                 #
+    # ---------------------------------------------------------------------- #
+
+    def getPricePerUnit(self, timestamp: int) -> int:
+        if self.firstReceivedTimestamp == 0:
+            return self.pricePerSaleUnit
+        lastSaleTimestamp = self.lastSaleTimestamp or self.firstReceivedTimestamp
+        try:
+            return self._halfLife(self.pricePerSaleUnit, timestamp - lastSaleTimestamp)
+        except ABDKRevert:
+            raise ArithmeticRevert()
+
+    def totalSupply(self, timestamp: int) -> int:
+        amountThatNeedsToVest = self.totalAmountReceived - self.pesudoTotalAmountFullyAvailableForSale
+        timeDiff = min(ONE_WEEK, timestamp - self.lastReceivedTimestamp)
+        return self.pesudoTotalAmountFullyAvailableForSale + amountThatNeedsToVest * timeDiff // ONE_WEEK
+
+    def totalSaleUnits(self, timestamp: int) -> int:
+        return self.totalSupply(timestamp) // SALE_UNIT
+
+    def unitsForSale(self, timestamp: int) -> int:
+        return self.totalSaleUnits(timestamp) - self.totalUnitsSold
+
+    # ---------------------------------------------------------------------- #
+    #                                  actions                                #
+    # ---------------------------------------------------------------------- #
+
+    def buyGCC(self, timestamp: int, unitsToBuy: int, maxPricePerUnit: int):
+        """
+        Returns (price, glowToTransfer) or raises an `AuctionRevert` without touching the state
+        """
+        if unitsToBuy == 0:
+            raise CannotBuyZeroUnits()
+        lastPriceChangeTimestamp = self.lastPriceChangeTimestamp
+        pseudoPrice24HoursAgo = self.pseudoPrice24HoursAgo
+        price = self.getPricePerUnit(timestamp)
+        if price > maxPricePerUnit:
+            raise UserPriceNotHighEnough()
+        glowToTransfer = _checked(unitsToBuy * price)
+
+        saleUnitsLeftForSale = self.totalSaleUnits(timestamp) - self.totalUnitsSold
+        if saleUnitsLeftForSale < unitsToBuy:
+            raise NotEnoughGCCForSale()
+
+        newPrice = _checked(price + _checked(price * (unitsToBuy * PRECISION // saleUnitsLeftForSale)) // PRECISION)
+        # The new price can never grow more than 100% in 24 hours
+        if pseudoPrice24HoursAgo == 0:
+            # the price decayed to 0 before the last refresh, panic 0x12
+            raise ArithmeticRevert()
+        if _checked(newPrice * PRECISION) // pseudoPrice24HoursAgo > 2 * PRECISION:
+            newPrice = _checked(pseudoPrice24HoursAgo * 2)
+        if timestamp - lastPriceChangeTimestamp > ONE_DAY:
+            self.pseudoPrice24HoursAgo = price
+            lastPriceChangeTimestamp = timestamp
+
+        self.pricePerSaleUnit = newPrice
+        self.totalUnitsSold += unitsToBuy
+        self.lastSaleTimestamp = timestamp
+        self.lastPriceChangeTimestamp = lastPriceChangeTimestamp
+        return price, glowToTransfer
+
+    def receiveGCC(self, timestamp: int, amount: int):
+        self.pesudoTotalAmountFullyAvailableForSale = self.totalSupply(timestamp)
+        self.lastReceivedTimestamp = timestamp
+        if self.firstReceivedTimestamp == 0:
+            self.firstReceivedTimestamp = timestamp
+        self.totalAmountReceived += amount
+
+    # ---------------------------------------------------------------------- #
+    #                           curves between events                         #
+    # ---------------------------------------------------------------------- #
+
+    def price_at(self, timestamps) -> np.ndarray:
+        """
+        `getPricePerUnit` at every timestamp (all >= the last event), as an object array of python ints
+        """
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        if self.firstReceivedTimestamp == 0:
+            return np.full(timestamps.shape, self.pricePerSaleUnit, dtype=object)
+        lastSaleTimestamp = self.lastSaleTimestamp or self.firstReceivedTimestamp
+        elapsed = timestamps - lastSaleTimestamp
+        if self.exact:
+            initial = np.full(elapsed.shape, self.pricePerSaleUnit, dtype=object)
+            return halflife.calculate_auction_half_life_value_batch(initial, elapsed.astype(np.uint64))
+        return np.array([_half_life_float(self.pricePerSaleUnit, int(e)) for e in elapsed], dtype=object)
+
+    def supply_at(self, timestamps) -> np.ndarray:
+        """
+        `totalSupply` at every timestamp (all >= the last event), as an object array of python ints
+        """
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        timeDiff = np.minimum(ONE_WEEK, timestamps - self.lastReceivedTimestamp).astype(object)
+        amountThatNeedsToVest = self.totalAmountReceived - self.pesudoTotalAmountFullyAvailableForSale
+        return self.pesudoTotalAmountFullyAvailableForSale + amountThatNeedsToVest * timeDiff // ONE_WEEK
+
+
+def replay(auction: CarbonCreditAuction, timestamps, kinds, amounts, maxPrices=None):
+    """
+    Applies every event to `auction` in time order (ties keep their input order).
+
+    `kinds` are RECEIVE (amount of GCC), BUY (amount of units) or BUY_FRACTION
+    (amount is the fraction of `unitsForSale` to buy, scaled by PRECISION).
+    `maxPrices` is the `maxPricePerUnit` of every buy (defaults to no limit).
+
+    Returns a dict of per-event arrays, in replay order:
+        timestamp, kind, status (OK or the revert), units, price (price paid, float),
+        pricePerSaleUnit (after the event, float), totalSupply (after the event, float)
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    kinds = np.asarray(kinds, dtype=np.int8)
+    order = np.argsort(timestamps, kind="stable")
+    n = order.shape[0]
+    status = np.zeros(n, dtype=np.int8)
+    units = np.zeros(n, dtype=np.float64)
+    price = np.full(n, np.nan, dtype=np.float64)
+    pricePerSaleUnit = np.zeros(n, dtype=np.float64)
+    supply = np.zeros(n, dtype=np.float64)
+
+    ts_list = timestamps[order].tolist()
+    kind_list = kinds[order].tolist()
+    amount_list = [int(amounts[i]) for i in order.tolist()]
+    max_list = [None if maxPrices is None else int(maxPrices[i]) for i in order.tolist()]
+
+    for row in range(n):
+        timestamp = ts_list[row]
+        kind = kind_list[row]
+        amount = amount_list[row]
+        if kind == RECEIVE:
+            auction.receiveGCC(timestamp, amount)
+        else:
+            if kind == BUY_FRACTION:
+                amount = max(1, auction.unitsForSale(timestamp) * amount // PRECISION)
+            maxPrice = max_list[row]
+            try:
+                paid, _ = auction.buyGCC(timestamp, amount, UINT256_MAX if maxPrice is None else maxPrice)
+                price[row] = paid
+                units[row] = amount
+            except AuctionRevert as e:
+                status[row] = e.status
+        pricePerSaleUnit[row] = auction.pricePerSaleUnit
+        supply[row] = auction.totalSupply(timestamp)
+
+    return {
+        "timestamp": timestamps[order],
+        "kind": kinds[order],
+        "status": status,
+        "units": units,
+        "price": price,
+        "pricePerSaleUnit": pricePerSaleUnit,
+        "totalSupply": supply,
+    }
+
+
+def check_long_gap(exact: bool = True):
+    """
+    ~200 days without a sale decay the price to 0, the buy after that stores it as `pseudoPrice24HoursAgo`
+    and every later buy reverts on the division by it
+    """
+    auction = CarbonCreditAuction(10**6, exact=exact)
+    result = replay(auction, [1, 200 * ONE_DAY, 202 * ONE_DAY, 204 * ONE_DAY], [RECEIVE, BUY, BUY, BUY], [10**30, 1, 1, 1])
+    assert result["status"].tolist() == [OK, OK, ARITHMETIC_REVERT, ARITHMETIC_REVERT], result["status"]
+    assert auction.pseudoPrice24HoursAgo == 0 and auction.totalUnitsSold == 1
+
+
+def synthetic_events(rng: np.random.Generator, seconds: int, receives_per_week: float = 1.0,
+                     mean_receive: int = 1_000 * 10**18, buys_per_day: float = 100.0,
+                     mean_buy_fraction: float = 0.02, reference_price: int = 10**6, price_sigma: float = 0.5,
+                     start: int = 1):
+    """
+    Poisson arrivals of receives (exponential amounts) and buys (fractions of the units left for sale).
+    Every buyer's `maxPricePerUnit` is lognormal around `reference_price`, so the price settles where demand runs out.
+    Returns (timestamps, kinds, amounts, maxPrices) sorted by time, with a receive at `start` so the auction is live
+    """
+    n_receive = rng.poisson(receives_per_week * seconds / ONE_WEEK)
+    n_buy = rng.poisson(buys_per_day * seconds / ONE_DAY)
+    receive_ts = np.concatenate([[start], start + rng.integers(0, seconds, n_receive)])
+    buy_ts = start + rng.integers(1, seconds, n_buy)
+    receive_amounts = np.maximum(1, rng.exponential(mean_receive, receive_ts.shape[0]))
+    buy_fractions = np.clip(rng.exponential(mean_buy_fraction, n_buy), 1e-8, 1.0) * PRECISION
+    buy_limits = reference_price * rng.lognormal(0.0, price_sigma, n_buy)
+
+    timestamps = np.concatenate([receive_ts, buy_ts])
+    kinds = np.concatenate([np.full(receive_ts.shape[0], RECEIVE), np.full(n_buy, BUY_FRACTION)]).astype(np.int8)
+    # receive amounts are in wei and don't fit in int64
+    amounts = np.array([int(a) for a in receive_amounts.tolist()] + [int(f) for f in buy_fractions.tolist()], dtype=object)
+    maxPrices = np.array([0] * receive_ts.shape[0] + [int(p) for p in buy_limits.tolist()], dtype=object)
+    order = np.argsort(timestamps, kind="stable")
+    return timestamps[order], kinds[order], amounts[order], maxPrices[order]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay synthetic events against the GCC descending price auction")
+    parser.add_argument("--years", type=float, default=1.0)
+    parser.add_argument("--receives-per-week", type=float, default=1.0)
+    parser.add_argument("--buys-per-day", type=float, default=100.0)
+    parser.add_argument("--mean-buy-fraction", type=float, default=0.02)
+    parser.add_argument("--starting-price", type=int, default=10**6)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--float", action="store_true", help="float half-life instead of the exact 64.64 pipeline")
+    parser.add_argument("--out", type=str, default=None, help="write the per-event arrays to an .npz file")
+    parser.add_argument("--check", action="store_true", help="run the built-in replay checks and exit")
+    args = parser.parse_args()
+
+    if args.check:
+        check_long_gap(exact=not args.float)
+        print("checks passed")
+        raise SystemExit(0)
+
+    rng = np.random.default_rng(args.seed)
+    events = synthetic_events(rng, int(args.years * 365 * ONE_DAY), args.receives_per_week, buys_per_day=args.buys_per_day,
+                              mean_buy_fraction=args.mean_buy_fraction, reference_price=args.starting_price)
+    auction = CarbonCreditAuction(args.starting_price, exact=not args.float)
+    result = replay(auction, *events)
+    ok = result["status"] == OK
+    print(f"events: {result['status'].shape[0]} sales: {int((ok & (result['kind'] != RECEIVE)).sum())}")
+    print(f"statuses (OK, zero units, price too high, not enough gcc, arithmetic): {np.bincount(result['status'], minlength=5).tolist()}")
+    print(f"units sold: {auction.totalUnitsSold} final price per unit: {auction.pricePerSaleUnit}")
+    if np.isfinite(result["price"]).any():
+        print(f"max price paid: {np.nanmax(result['price'])}")
+    if args.out:
+        np.savez(args.out, **result)
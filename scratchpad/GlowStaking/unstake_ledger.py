@@ -0,0 +1,415 @@
+"""
+Index of every account's unstaked GLOW positions (src/GLOW.sol), rebuilt from the GLOW event log.
+
+`GLOW.unstake` pushes an `UnstakedPosition{amount, cooldownEnd}` at `head + 1` of the account's
+`Pointers{tail, head}`, `claimUnstakedTokens` consumes positions from the tail (oldest first) and
+`stake` re-stakes from the head (newest first) before transferring anything.
+`unstakedPositionsOf` walks tail..head, so asking "what can this account claim at t" of the contract (or of a
+call by call replay) is linear in the queue, and doing it for every staker is linear in all positions.
+
+`UnstakeLedger` replays `Stake`, `Unstake` and `ClaimUnstakedGLW` into
+    - one `UnstakeQueue` per account: its live positions as python lists used as a deque (a start cursor instead of
+      popping the front, compacted once half of the lists are consumed) plus the running sum of the amounts,
+      so the sum of any run of live positions is the difference of two running sums.
+      A claim only moves the cursor / the base of the running sum, a stake only rewrites or drops the last entries.
+    - one global array of every position ever pushed, in push order, with a Fenwick tree over the amounts left in them.
+Cooldowns are `block.timestamp + 5 years`, so positions are pushed in cooldown order (per account and globally)
+and "claimable at t" (`cooldownEnd < t`, like `claimUnstakedTokens`) is a prefix of both:
+`claimable(account, t)` and `global_claimable(t)` are a bisect plus one lookup / one Fenwick prefix sum, O(log n).
+Answers are for the replayed state, i.e. assuming no further stake / claim until t.
+
+The contract pointers are mirrored exactly, including one corner of `stake`: re-staking exactly the whole queue
+when its tail is not 0 moves the head to `tail - 1`, after which `unstake` underflows (`head - tail + 1`) and reverts
+for good. Such accounts are reported by `bricked_accounts`.
+
+Replaying an event the contract could not have emitted (e.g. a claim of more than is claimable) raises the revert
+the contract would have hit, which is how out of order or missing events show up.
+
+Usage:
+    python3 unstake_ledger.py events.jsonl --at 1710000000 1900000000
+where every line of events.jsonl is one event, in log order, e.g.
+    {"timestamp": 1700000000, "event": "Stake", "user": "0xa...", "amount": 1000000000000000000}
+    {"timestamp": 1700100000, "event": "Unstake", "user": "0xa...", "amount": 400000000000000000}
+    {"timestamp": 1860000000, "event": "ClaimUnstakedGLW", "user": "0xa...", "amount": 100000000000000000}
+"""
+import argparse
+import bisect
+import json
+
+import numpy as np
+
+STAKE_COOLDOWN_PERIOD = 365 * 86400 * 5
+MAX_UNSTAKES_BEFORE_EMERGENCY_COOLDOWN = 100
+EMERGENCY_COOLDOWN_PERIOD = 86400
+
+
+class GlowRevert(Exception):
+    pass
+
+
+class CannotStakeZeroTokens(GlowRevert):
+    pass
+
+
+class CannotUnstakeZeroTokens(GlowRevert):
+    pass
+
+
+class CannotClaimZeroTokens(GlowRevert):
+    pass
+
+
+class UnstakeAmountExceedsStakedBalance(GlowRevert):
+    pass
+
+
+class UnstakingOnEmergencyCooldown(GlowRevert):
+    pass
+
+
+class InsufficientClaimableBalance(GlowRevert):
+    pass
+
+
+class Underflow(GlowRevert):
+    """
+    panic 0x11, `unstake` of a bricked account
+    """
+
+
+# ---- #  fenwick  # ---- #
+
+
+class _Fenwick:
+    """
+    Prefix sums over a growing array of python ints: append, point add and prefix sum in O(log n)
+    """
+
+    __slots__ = ("tree",)
+
+    def __init__(self):
+        self.tree = [0]
+
+    def __len__(self):
+        return len(self.tree) - 1
+
+    def prefix(self, k: int) -> int:
+        """
+        sum of the first k values
+        """
+        tree = self.tree
+        total = 0
+        while k > 0:
+            total += tree[k]
+            k &= k - 1
+        return total
+
+    def append(self, value: int):
+        n = len(self.tree)
+        # node n covers (n - lowbit(n), n]
+        self.tree.append(value + self.prefix(n - 1) - self.prefix(n - (n & -n)))
+
+    def add(self, index: int, delta: int):
+        tree = self.tree
+        k = index + 1
+        while k < len(tree):
+            tree[k] += delta
+            k += k & -k
+
+
+# ---- #  one account  # ---- #
+
+
+class UnstakeQueue:
+    """
+    The unstaked positions of one account. Live position `k` (0 = oldest) is list entry `start + k`
+    and sits at mapping index `tail + k` of the contract
+    """
+
+    __slots__ = (
+        "tail",
+        "head",
+        "numStaked",
+        "emergencyLastUnstakeTimestamp",
+        "start",
+        "amounts",
+        "cooldownEnds",
+        "running",
+        "base",
+        "globalIndex",
+    )
+
+    def __init__(self):
+        self.tail = 0
+        self.head = 0
+        self.numStaked = 0
+        self.emergencyLastUnstakeTimestamp = 0
+        self.start = 0
+        self.amounts = []
+        self.cooldownEnds = []
+        # running[j] - base is the sum of the live amounts up to list entry j
+        self.running = []
+        self.base = 0
+        # index of each position in the ledger's global arrays
+        self.globalIndex = []
+
+    def __len__(self):
+        return len(self.amounts) - self.start
+
+    @property
+    def bricked(self) -> bool:
+        return self.head < self.tail
+
+    def total(self) -> int:
+        """
+        GLOW in unstaked positions, claimable or not
+        """
+        return self.running[-1] - self.base if len(self) else 0
+
+    def claimable(self, timestamp: int) -> int:
+        """
+        The most `claimUnstakedTokens` can claim at `timestamp`
+        """
+        k = bisect.bisect_left(self.cooldownEnds, timestamp, self.start)
+        return self.running[k - 1] - self.base if k > self.start else 0
+
+    def next_cooldown_end(self, timestamp: int):
+        """
+        First cooldown end of a position not claimable at `timestamp`, None if there is none
+        """
+        k = bisect.bisect_left(self.cooldownEnds, timestamp, self.start)
+        return self.cooldownEnds[k] if k < len(self.cooldownEnds) else None
+
+    def positions(self) -> list:
+        """
+        `unstakedPositionsOf`, as (amount, cooldownEnd)
+        """
+        return list(zip(self.amounts[self.start:], self.cooldownEnds[self.start:]))
+
+    def _push(self, amount: int, cooldownEnd: int, globalIndex: int):
+        self.amounts.append(amount)
+        self.cooldownEnds.append(cooldownEnd)
+        self.running.append((self.running[-1] if len(self) > 1 else self.base) + amount)
+        self.globalIndex.append(globalIndex)
+
+    def _pop_newest(self):
+        for values in (self.amounts, self.cooldownEnds, self.running, self.globalIndex):
+            values.pop()
+
+    def _pop_oldest(self):
+        self.base = self.running[self.start]
+        self.start += 1
+        if self.start >= 64 and 2 * self.start >= len(self.amounts):
+            for name in ("amounts", "cooldownEnds", "running", "globalIndex"):
+                setattr(self, name, getattr(self, name)[self.start:])
+            self.start = 0
+
+
+# ---- #  ledger  # ---- #
+
+
+class UnstakeLedger:
+    def __init__(self, cooldownPeriod: int = STAKE_COOLDOWN_PERIOD):
+        self.cooldownPeriod = cooldownPeriod
+        self.accounts = {}
+        self.timestamp = 0
+        # every position ever pushed, in push (= cooldown) order
+        self.cooldownEnds = []
+        self.owners = []
+        self.remaining = _Fenwick()
+
+    def queue(self, account: str) -> UnstakeQueue:
+        queue = self.accounts.get(account)
+        if queue is None:
+            queue = self.accounts[account] = UnstakeQueue()
+        return queue
+
+    def _advance(self, timestamp: int):
+        if timestamp < self.timestamp:
+            raise ValueError(f"events out of order: {timestamp} < {self.timestamp}")
+        self.timestamp = timestamp
+
+    def stake(self, timestamp: int, account: str, stakeAmount: int) -> int:
+        """
+        `stake(stakeAmount)`, returns the amount transferred from the account (the rest is re-staked
+        from its newest unstaked positions)
+        """
+        if stakeAmount == 0:
+            raise CannotStakeZeroTokens(account)
+        self._advance(timestamp)
+        queue = self.queue(account)
+        restaked = 0
+        while len(queue) and restaked < stakeAmount:
+            amount = queue.amounts[-1]
+            take = min(amount, stakeAmount - restaked)
+            restaked += take
+            self.remaining.add(queue.globalIndex[-1], -take)
+            if take < amount:
+                # overshoot, the head keeps what is left
+                queue.amounts[-1] = amount - take
+                queue.running[-1] -= take
+                queue.head = queue.tail + len(queue) - 1
+                break
+            index = queue.tail + len(queue) - 1
+            queue._pop_newest()
+            if restaked == stakeAmount:
+                # `newHead = i - 1`, or a fresh queue at i == 0
+                queue.head = index - 1 if index != 0 else 0
+                break
+        else:
+            # every position re-staked (or none to begin with): the head falls back on the tail
+            if not queue.bricked:
+                queue.head = queue.tail
+        if not len(queue):
+            queue.base = 0
+        queue.numStaked += stakeAmount
+        return stakeAmount - restaked
+
+    def unstake(self, timestamp: int, account: str, amount: int):
+        """
+        `unstake(amount)`
+        """
+        if amount == 0:
+            raise CannotUnstakeZeroTokens(account)
+        queue = self.queue(account)
+        if amount > queue.numStaked:
+            raise UnstakeAmountExceedsStakedBalance(account)
+        if queue.bricked:
+            raise Underflow(account)
+        self._advance(timestamp)
+        lengthBefore = len(queue)
+        if lengthBefore + 2 > MAX_UNSTAKES_BEFORE_EMERGENCY_COOLDOWN:
+            last = queue.emergencyLastUnstakeTimestamp
+            if last != 0 and timestamp - last < EMERGENCY_COOLDOWN_PERIOD:
+                raise UnstakingOnEmergencyCooldown(account)
+            queue.emergencyLastUnstakeTimestamp = timestamp
+        queue.numStaked -= amount
+        if lengthBefore:
+            queue.head += 1
+        cooldownEnd = timestamp + self.cooldownPeriod
+        queue._push(amount, cooldownEnd, len(self.cooldownEnds))
+        self.cooldownEnds.append(cooldownEnd)
+        self.owners.append(account)
+        self.remaining.append(amount)
+
+    def claim(self, timestamp: int, account: str, amount: int):
+        """
+        `claimUnstakedTokens(amount)`
+        """
+        if amount == 0:
+            raise CannotClaimZeroTokens(account)
+        queue = self.queue(account)
+        if queue.claimable(timestamp) < amount:
+            raise InsufficientClaimableBalance(account)
+        self._advance(timestamp)
+        claimed = 0
+        while claimed < amount:
+            k = queue.start
+            take = min(queue.amounts[k], amount - claimed)
+            claimed += take
+            self.remaining.add(queue.globalIndex[k], -take)
+            if take < queue.amounts[k]:
+                queue.amounts[k] -= take
+                queue.base += take
+                break
+            queue._pop_oldest()
+            if len(queue):
+                queue.tail += 1
+        if not len(queue):
+            queue.base = 0
+
+    def apply(self, event: dict):
+        """
+        Applies one event log record (see the module docstring for the fields)
+        """
+        name = event["event"]
+        timestamp = int(event["timestamp"])
+        if name == "Stake":
+            self.stake(timestamp, event["user"], int(event["amount"]))
+        elif name == "Unstake":
+            self.unstake(timestamp, event["user"], int(event["amount"]))
+        elif name == "ClaimUnstakedGLW":
+            self.claim(timestamp, event["user"], int(event["amount"]))
+        else:
+            raise ValueError(f"unknown event {name}")
+
+    @classmethod
+    def from_events(cls, events, cooldownPeriod: int = STAKE_COOLDOWN_PERIOD) -> "UnstakeLedger":
+        ledger = cls(cooldownPeriod)
+        for event in events:
+            ledger.apply(event)
+        return ledger
+
+    # ---------------------------------------------------------------------- #
+    #                                 queries                                 #
+    # ---------------------------------------------------------------------- #
+
+    def claimable(self, account: str, timestamp: int) -> int:
+        queue = self.accounts.get(account)
+        return queue.claimable(timestamp) if queue is not None else 0
+
+    def unstaked_positions_of(self, account: str) -> list:
+        queue = self.accounts.get(account)
+        return queue.positions() if queue is not None else []
+
+    def pointers(self, account: str) -> tuple:
+        """
+        `_unstakedPositionPointers[account]`, as (tail, head)
+        """
+        queue = self.accounts.get(account)
+        return (queue.tail, queue.head) if queue is not None else (0, 0)
+
+    def global_claimable(self, timestamp: int) -> int:
+        """
+        Sum over all accounts of `claimable(account, timestamp)`
+        """
+        return self.remaining.prefix(bisect.bisect_left(self.cooldownEnds, timestamp))
+
+    def global_unstaked(self) -> int:
+        return self.remaining.prefix(len(self.remaining))
+
+    def bricked_accounts(self) -> list:
+        return [account for account, queue in self.accounts.items() if queue.bricked]
+
+    def claimable_table(self, timestamps) -> tuple:
+        """
+        (accounts, claimable) with claimable[i, j] the claimable amount of accounts[i] at timestamps[j],
+        for every account with unstaked positions
+        """
+        now = np.asarray(timestamps, dtype=np.int64).ravel()
+        accounts = [account for account, queue in self.accounts.items() if len(queue)]
+        table = np.zeros((len(accounts), now.shape[0]), dtype=object)
+        for row, account in enumerate(accounts):
+            queue = self.accounts[account]
+            ends = np.asarray(queue.cooldownEnds[queue.start:], dtype=np.int64)
+            counts = np.searchsorted(ends, now, side="left")
+            running = np.asarray(queue.running[queue.start:], dtype=object)
+            table[row] = [running[c - 1] - queue.base if c else 0 for c in counts.tolist()]
+        return accounts, table
+
+
+def read_events(path: str):
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay GLOW staking events and print claimable unstaked GLOW")
+    parser.add_argument("events", help="json lines event log")
+    parser.add_argument("--at", type=int, nargs="+", required=True, help="timestamps to evaluate")
+    parser.add_argument("--cooldown", type=int, default=STAKE_COOLDOWN_PERIOD)
+    args = parser.parse_args()
+
+    ledger = UnstakeLedger.from_events(read_events(args.events), args.cooldown)
+    print(f"accounts: {len(ledger.accounts)} positions: {len(ledger.cooldownEnds)} unstaked: {ledger.global_unstaked()}")
+    for account in ledger.bricked_accounts():
+        print(f"bricked (unstake reverts): {account}")
+    accounts, table = ledger.claimable_table(args.at)
+    print("account,timestamp,claimable")
+    for column, timestamp in enumerate(args.at):
+        print(f"*,{timestamp},{ledger.global_claimable(timestamp)}")
+    for row, account in enumerate(accounts):
+        for column, timestamp in enumerate(args.at):
+            print(f"{account},{timestamp},{table[row, column]}")
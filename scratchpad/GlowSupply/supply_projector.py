@@ -0,0 +1,314 @@
+"""
+Closed form GLOW supply schedules (src/GLOW.sol, src/GlowUnlocker.sol), vectorized over timestamps.
+
+Every recipient's balance over time is piecewise linear with a floor:
+    - the constructor mints (`_handleConstructorMint`) are a step at deployment
+    - the GCA and miner pool, the veto council and the grants treasury accrue `*_INFLATION_PER_SECOND` per second
+      from genesis; what they have minted is a step at each `claimGLWFrom*` call
+    - a `GlowUnlocker` beneficiary unlocks `amountUnlockable * dt / RELEASE_DURATION` between genesis + RELEASE_OFFSET
+      and the end of the release; every `claim` floors what it pays, so a history of claims changes the curve
+A `Schedule` stores such a curve as its segments (start, value, slope, denominator), evaluated as
+`value + (t - start) * slope // denominator` on the segment that covers t (`np.searchsorted`), 0 before the first.
+Evaluating one schedule at n timestamps is one pass over n with exact python ints (`exact=False` gives floats).
+
+`SupplyProjector` holds the schedules of all recipients. The integer slope schedules (inflation, mints, claim steps)
+add up exactly, so `total` merges them once into a single cached schedule and only evaluates the unlocker
+beneficiaries (which floor individually) one by one.
+`total` is `totalSupply` by default: what a `GlowUnlocker` beneficiary gets is a transfer out of the vesting mint,
+not a mint, so the `unlock:*` schedules are left out of it. `total(..., circulating=True)` is the circulating supply:
+totalSupply without what the unlocker still holds, i.e. the vesting mint netted against what has been unlocked.
+
+`inflation_data` mirrors `gcaInflationData` / `vetoCouncilInflationData` / `grantsTreasuryInflationData`.
+Note that their `totalAlreadyClaimed` is `timestampToClaimFrom - GENESIS_TIMESTAMP()`, seconds and not GLW.
+
+Usage:
+    python3 supply_projector.py --start 1700352000 --end 2646432000 --step 31536000 --unlock 0xa=60000000e18 0xb=30000000e18
+    python3 supply_projector.py --guarded --at 1710000000 1800000000 --columns
+    python3 supply_projector.py --unlock 0xa=96000000e18 --at 1700352000 1800000000 1900000000 --circulating
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "py-utils"))
+from amounts import parse_amount  # noqa: E402
+
+GENESIS_TIMESTAMP = 1700352000
+ONE_WEEK = 7 * 86400
+ONE_YEAR = 365 * 86400
+ONE_ETHER = 10**18
+
+GCA_AND_MINER_POOL_INFLATION_PER_SECOND = 185_000 * ONE_ETHER // ONE_WEEK
+VETO_COUNCIL_INFLATION_PER_SECOND = 5_000 * ONE_ETHER // ONE_WEEK
+GRANTS_TREASURY_INFLATION_PER_SECOND = 40_000 * ONE_ETHER // ONE_WEEK
+
+INFLATION_PER_SECOND = {
+    "gcaAndMinerPool": GCA_AND_MINER_POOL_INFLATION_PER_SECOND,
+    "vetoCouncil": VETO_COUNCIL_INFLATION_PER_SECOND,
+    "grantsTreasury": GRANTS_TREASURY_INFLATION_PER_SECOND,
+}
+
+# GlowUnlocker
+RELEASE_OFFSET = ONE_YEAR
+RELEASE_DURATION = ONE_YEAR * 5
+
+# _handleConstructorMint of Glow and of the guarded launch Glow
+CONSTRUCTOR_MINTS = {"earlyLiquidity": 12_000_000 * ONE_ETHER, "vesting": 96_000_000 * ONE_ETHER}
+GUARDED_CONSTRUCTOR_MINTS = {"earlyLiquidity": 12_000_000 * ONE_ETHER, "grantsTreasury": 6_000_000 * ONE_ETHER}
+
+
+class GlowUnlockerRevert(Exception):
+    pass
+
+
+class ReleasePeriodNotStarted(GlowUnlockerRevert):
+    pass
+
+
+class NothingToClaim(GlowUnlockerRevert):
+    pass
+
+
+class Schedule:
+    """
+    Segment k covers [starts[k], starts[k + 1]) (the last one never ends)
+    """
+
+    __slots__ = ("starts", "values", "slopes", "denominators", "_floats")
+
+    def __init__(self, segments):
+        segments = sorted(segments, key=lambda segment: segment[0])
+        self.starts = np.array([int(s[0]) for s in segments], dtype=np.int64)
+        self.values = np.empty(len(segments), dtype=object)
+        self.slopes = np.empty(len(segments), dtype=object)
+        self.denominators = np.empty(len(segments), dtype=object)
+        self.values[:] = [int(s[1]) for s in segments]
+        self.slopes[:] = [int(s[2]) for s in segments]
+        self.denominators[:] = [int(s[3]) for s in segments]
+        if len(segments) and np.any(self.denominators <= 0):
+            raise ValueError("denominators have to be positive")
+        self._floats = None
+
+    @property
+    def integer_slopes(self) -> bool:
+        return bool(np.all(self.denominators == 1))
+
+    def __call__(self, timestamps, exact: bool = True):
+        t = np.asarray(timestamps, dtype=np.int64)
+        if not len(self.starts):
+            return np.zeros(t.shape, dtype=object if exact else np.float64)
+        k = np.searchsorted(self.starts, t, side="right") - 1
+        before = k < 0
+        k = np.maximum(k, 0)
+        dt = t - self.starts[k]
+        if exact:
+            result = self.values[k] + dt.astype(object) * self.slopes[k] // self.denominators[k]
+            result[before] = 0
+            return result
+        if self._floats is None:
+            self._floats = (self.values.astype(np.float64), (self.slopes / self.denominators).astype(np.float64))
+        values, rates = self._floats
+        result = values[k] + dt * rates[k]
+        if not self.integer_slopes:
+            result = np.floor(result)
+        return np.where(before, 0.0, result)
+
+    def rate(self, timestamps):
+        """
+        Slope (per second, as a float) of the segment covering each timestamp
+        """
+        t = np.asarray(timestamps, dtype=np.int64)
+        k = np.searchsorted(self.starts, t, side="right") - 1
+        rates = (self.slopes / self.denominators).astype(np.float64) if len(self.starts) else np.zeros(1)
+        return np.where(k < 0, 0.0, rates[np.maximum(k, 0)])
+
+    @classmethod
+    def sum(cls, schedules) -> "Schedule":
+        """
+        Exact sum of integer slope schedules, one segment per distinct start
+        """
+        schedules = list(schedules)
+        if any(not schedule.integer_slopes for schedule in schedules):
+            raise ValueError("only integer slope schedules add up exactly")
+        starts = np.unique(np.concatenate([s.starts for s in schedules])) if schedules else np.zeros(0, np.int64)
+        values = np.zeros(len(starts), dtype=object)
+        slopes = np.zeros(len(starts), dtype=object)
+        for schedule in schedules:
+            if not len(schedule.starts):
+                continue
+            values += schedule(starts)
+            k = np.searchsorted(schedule.starts, starts, side="right") - 1
+            slopes += np.where(k < 0, 0, schedule.slopes[np.maximum(k, 0)])
+        return cls(list(zip(starts.tolist(), values.tolist(), slopes.tolist(), [1] * len(starts))))
+
+
+# -------------------------------------------------------------------------- #
+#                                  schedules                                  #
+# -------------------------------------------------------------------------- #
+
+
+def mint_schedule(amount: int, timestamp: int = GENESIS_TIMESTAMP) -> Schedule:
+    return Schedule([(timestamp, amount, 0, 1)])
+
+
+def inflation_schedule(ratePerSecond: int, genesisTimestamp: int = GENESIS_TIMESTAMP, claims=None) -> Schedule:
+    """
+    GLW accrued by an inflation recipient, or with `claims` (timestamps of its `claimGLWFrom*` calls)
+    the GLW actually minted to it
+    """
+    if claims is None:
+        return Schedule([(genesisTimestamp, 0, ratePerSecond, 1)])
+    segments = []
+    last = genesisTimestamp
+    for timestamp in sorted(claims):
+        if timestamp < last:
+            raise ValueError(f"claim at {timestamp} before genesis")
+        # a claim of zero seconds returns 0 without touching storage
+        if timestamp > last:
+            segments.append((timestamp, (timestamp - genesisTimestamp) * ratePerSecond, 0, 1))
+            last = timestamp
+    return Schedule(segments)
+
+
+def inflation_data(ratePerSecond: int, timestamp: int, lastClaimedTimestamp: int = 0,
+                   genesisTimestamp: int = GENESIS_TIMESTAMP) -> tuple:
+    """
+    `(timestampInStorage, totalAlreadyClaimed, totalToClaim)` of the `*InflationData` views at `timestamp`
+    """
+    timestampToClaimFrom = genesisTimestamp if lastClaimedTimestamp == 0 else lastClaimedTimestamp
+    if timestamp < timestampToClaimFrom:
+        raise ValueError("panic: arithmetic underflow")
+    totalToClaim = (timestamp - timestampToClaimFrom) * ratePerSecond
+    return lastClaimedTimestamp, timestampToClaimFrom - genesisTimestamp, totalToClaim
+
+
+def unlock_schedule(amountUnlockable: int, genesisTimestamp: int = GENESIS_TIMESTAMP, claims=(),
+                    claimed_only: bool = False) -> Schedule:
+    """
+    GLW a `GlowUnlocker` beneficiary has received plus `nextReward` at each time, given the timestamps of its past
+    `claim` calls. With `claimed_only` only what the claims transferred (a step per claim).
+    Raises the revert of a claim the contract would not have accepted
+    """
+    releaseStart = genesisTimestamp + RELEASE_OFFSET
+    releaseEnd = releaseStart + RELEASE_DURATION
+    segments = [] if claimed_only else [(releaseStart, 0, amountUnlockable, RELEASE_DURATION)]
+    received = 0
+    last = releaseStart
+    for timestamp in sorted(claims):
+        if timestamp < releaseStart:
+            raise ReleasePeriodNotStarted(timestamp)
+        if last > releaseEnd:
+            raise NothingToClaim(timestamp)
+        if not claimed_only and last < releaseEnd < timestamp:
+            segments.append((releaseEnd, received + (releaseEnd - last) * amountUnlockable // RELEASE_DURATION, 0, 1))
+        reward = (min(timestamp, releaseEnd) - last) * amountUnlockable // RELEASE_DURATION
+        if reward == 0:
+            raise NothingToClaim(timestamp)
+        received += reward
+        last = timestamp
+        if claimed_only or timestamp >= releaseEnd:
+            segments.append((timestamp, received, 0, 1))
+        else:
+            segments.append((timestamp, received, amountUnlockable, RELEASE_DURATION))
+    if not claimed_only and last < releaseEnd:
+        segments.append((releaseEnd, received + (releaseEnd - last) * amountUnlockable // RELEASE_DURATION, 0, 1))
+    return Schedule(segments)
+
+
+# -------------------------------------------------------------------------- #
+#                                  projector                                  #
+# -------------------------------------------------------------------------- #
+
+
+class SupplyProjector:
+    def __init__(self, unlockerFunding: Schedule = None):
+        # GLW the GlowUnlocker holds before anything is unlocked (the vesting mint)
+        self.unlockerFunding = unlockerFunding or Schedule([])
+        self.schedules = {}
+        self._merged = None
+
+    def add(self, name: str, schedule: Schedule):
+        self.schedules[name] = schedule
+        self._merged = None
+
+    def series(self, timestamps, exact: bool = True) -> dict:
+        """
+        name -> the schedule evaluated at timestamps
+        """
+        return {name: schedule(timestamps, exact) for name, schedule in self.schedules.items()}
+
+    def _merge(self, schedules: list) -> tuple:
+        linear = [s for s in schedules if s.integer_slopes]
+        floored = [s for s in schedules if not s.integer_slopes]
+        return Schedule.sum(linear), floored
+
+    def total(self, timestamps, exact: bool = True, circulating: bool = False):
+        """
+        totalSupply at timestamps (the mints and the inflation, the `unlock:*` transfers left out), or with
+        `circulating` the totalSupply minus what the GlowUnlocker still holds (`unlockerFunding` - unlocked)
+        """
+        if self._merged is None:
+            supply = [s for name, s in self.schedules.items() if not name.startswith("unlock:")]
+            unlocks = [s for name, s in self.schedules.items() if name.startswith("unlock:")]
+            locked = Schedule([(start, -value, -slope, 1) for start, value, slope in zip(
+                self.unlockerFunding.starts.tolist(), self.unlockerFunding.values, self.unlockerFunding.slopes)])
+            self._merged = (self._merge(supply), self._merge(supply + [locked] + unlocks))
+        merged, floored = self._merged[1 if circulating else 0]
+        total = merged(timestamps, exact)
+        for schedule in floored:
+            total = total + schedule(timestamps, exact)
+        return total
+
+    @classmethod
+    def glow(cls, genesisTimestamp: int = GENESIS_TIMESTAMP, unlocks: dict = None, guarded: bool = False,
+             claims: dict = None, deployTimestamp: int = None) -> "SupplyProjector":
+        """
+        Constructor mints, the three inflation recipients and the `GlowUnlocker` beneficiaries (address -> amount).
+        `claims` maps a recipient (inflation name or beneficiary address) to its claim timestamps; inflation
+        recipients with claims are projected as minted rather than accrued.
+        The unlocker is funded by the vesting mint, the guarded launch has none and is assumed to fund it with
+        the beneficiaries' amounts
+        """
+        claims = claims or {}
+        unlocks = unlocks or {}
+        mints = GUARDED_CONSTRUCTOR_MINTS if guarded else CONSTRUCTOR_MINTS
+        deployTimestamp = deployTimestamp or genesisTimestamp
+        projector = cls(mint_schedule(mints.get("vesting", sum(unlocks.values())), deployTimestamp))
+        for name, amount in mints.items():
+            projector.add(f"mint:{name}", mint_schedule(amount, deployTimestamp))
+        for name, rate in INFLATION_PER_SECOND.items():
+            projector.add(name, inflation_schedule(rate, genesisTimestamp, claims.get(name)))
+        for address, amount in unlocks.items():
+            projector.add(f"unlock:{address}", unlock_schedule(amount, genesisTimestamp, claims.get(address, ())))
+        return projector
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="GLOW supply per recipient and in total over time")
+    parser.add_argument("--genesis", type=int, default=GENESIS_TIMESTAMP)
+    parser.add_argument("--start", type=int, default=GENESIS_TIMESTAMP)
+    parser.add_argument("--end", type=int, default=GENESIS_TIMESTAMP + 10 * ONE_YEAR)
+    parser.add_argument("--step", type=int, default=ONE_YEAR // 12)
+    parser.add_argument("--at", type=int, nargs="*", default=None, help="timestamps to evaluate instead of a range")
+    parser.add_argument("--unlock", nargs="*", default=[], metavar="ADDRESS=AMOUNT", help="GlowUnlocker beneficiaries")
+    parser.add_argument("--guarded", action="store_true", help="guarded launch constructor mints")
+    parser.add_argument("--columns", action="store_true", help="print every recipient, not only the total")
+    parser.add_argument("--circulating", action="store_true", help="total without what the unlocker still holds")
+    args = parser.parse_args()
+
+    unlocks = {}
+    for item in args.unlock:
+        address, _, amount = item.partition("=")
+        try:
+            unlocks[address] = parse_amount(amount)
+        except argparse.ArgumentTypeError as e:
+            parser.error(f"--unlock {item}: {e}")
+    projector = SupplyProjector.glow(args.genesis, unlocks, args.guarded)
+    timestamps = np.array(args.at if args.at else range(args.start, args.end + 1, args.step), dtype=np.int64)
+    total = projector.total(timestamps, circulating=args.circulating)
+    columns = projector.series(timestamps) if args.columns else {}
+    print(",".join(["timestamp", "circulating" if args.circulating else "totalSupply"] + list(columns)))
+    for i, timestamp in enumerate(timestamps.tolist()):
+        print(",".join([str(timestamp), str(total[i])] + [str(values[i]) for values in columns.values()]))
@@ -0,0 +1,205 @@
+"""
+Batched Monte Carlo engine for the nomination sims.
+
+`sims.py` builds one `UniswapPair` per draw and walks every sample through `math.sqrt` in a python loop,
+then buffers every row before writing `simulations.csv`.
+This file runs the same math (`find_optimalAmount_to_commit` -> `get_usdc_received_from_swap` -> liquidity split -> nominations)
+as numpy array operations over chunks of draws.
+
+Chunks are spread over a process pool. Every chunk gets its own child of a single `SeedSequence`
+so a run is reproducible for a given seed no matter how many workers are used.
+Chunks are written to the output as soon as they come back (in order) and at most 2 chunks per worker are
+in flight, so memory stays flat no matter how many samples are requested.
+Formatting floats dominates the csv path, so pass an `.npy` output path for large sweeps:
+the rows are then streamed into a memory-mapped (n, 8) float64 array with the columns in `COLUMNS`.
+
+Usage:
+    python3 batch_sims.py --samples 50000000 --chunk-size 1000000 --workers 8 --seed 42 --out simulations.npy
+"""
+import argparse
+import multiprocessing as mp
+import os
+from collections import deque
+
+import numpy as np
+
+gcc_decimals = 18
+usdc_decimals = 6
+nomination_decimals = 12  # sqrt(1e24) = 1e12
+
+# Same base case as sims.py
+amountGCCInLp = 500 * (10 ** gcc_decimals)
+amountUSDCInLp = 100000000 * (10 ** usdc_decimals)
+gccCommittment = 100 * (10 ** gcc_decimals)
+
+# Same bounds as sims.py (inclusive, like random.randint)
+min_draw = 10
+max_draw = 1000000000
+
+COLUMNS = [
+    "reserveGCC",
+    "reserveUSDC",
+    "amountGCCToCommit",
+    "amount_gcc_using_in_swap",
+    "usdc_received_from_swap",
+    "amount_gcc_using_in_liquidity",
+    "amount_usdc_in_liquidity",
+    "nominations_earned",
+]
+
+
+def find_optimal_amount_to_commit(amountToCommit, reservesOfToken):
+    """
+    Vectorized `find_optimalAmount_to_commit` from sims.py, the arguments in whole GCC (int64).
+    sims.py works on python ints, so every integer intermediate is exact there and only rounded once when it meets
+    a float: the integer parts are computed in int64 and scaled by the (exactly representable) power of ten last
+    """
+    scale = 10.0 ** gcc_decimals
+    a = np.sqrt(reservesOfToken * scale) + 1
+    b = np.sqrt((3988000 * amountToCommit + 3988009 * reservesOfToken) * scale)
+    c = (1997 * reservesOfToken) * scale
+    d = 1994
+    return ((a * b) - c) / d
+
+
+def get_usdc_received_from_swap(amount_in, reserveIn, reserveOut):
+    """
+    Vectorized `UniswapPair.get_usdc_received_from_swap` (asset_out='x') from sims.py,
+    `amount_in` raw (float) and the reserves in whole GCC / USDC (int64)
+    """
+    amountInWithFee = amount_in * 997
+    numerator = amountInWithFee * (reserveOut * 10.0 ** usdc_decimals)
+    denominator = reserveIn * 10.0 ** (gcc_decimals + 3) + amountInWithFee
+    return numerator / denominator
+
+
+def run_sim_batch(reserveGCC, reserveUSDC, amountGCCToCommit):
+    """
+    Vectorized `run_sim_impl` from sims.py
+
+    The inputs are int64 arrays of whole tokens (what `run_sim` draws before scaling by the decimals),
+    so every row matches `run_sim_impl` on the same draws.
+    Returns a (n, 8) float64 array in decimal adjusted units with the columns in `COLUMNS`
+    """
+    reserveGCC, reserveUSDC, amountGCCToCommit = (
+        np.asarray(v, dtype=np.int64) for v in (reserveGCC, reserveUSDC, amountGCCToCommit)
+    )
+    amount_gcc_using_in_swap = find_optimal_amount_to_commit(amountGCCToCommit, reserveGCC)
+    usdc_received_from_swap = get_usdc_received_from_swap(amount_gcc_using_in_swap, reserveGCC, reserveUSDC)
+    amount_gcc_using_in_liquidity = amountGCCToCommit * 10.0 ** gcc_decimals - amount_gcc_using_in_swap
+    amount_usdc_in_liquidity = usdc_received_from_swap
+    nominations_earned = np.sqrt(amount_gcc_using_in_liquidity * amount_usdc_in_liquidity)
+
+    out = np.empty((reserveGCC.shape[0], len(COLUMNS)), dtype=np.float64)
+    # whole tokens * 10**decimals / 10**decimals is exact with python ints
+    out[:, 0] = reserveGCC
+    out[:, 1] = reserveUSDC
+    out[:, 2] = amountGCCToCommit
+    out[:, 3] = amount_gcc_using_in_swap / (10 ** gcc_decimals)
+    out[:, 4] = usdc_received_from_swap / (10 ** usdc_decimals)
+    out[:, 5] = amount_gcc_using_in_liquidity / (10 ** gcc_decimals)
+    out[:, 6] = amount_usdc_in_liquidity / (10 ** usdc_decimals)
+    out[:, 7] = nominations_earned / (10 ** nomination_decimals)
+    return out
+
+
+def draw_params(rng: np.random.Generator, n: int):
+    """
+    Draws `n` (reserveGCC, reserveUSDC, amountGCCToCommit) triples the same way `run_sim` does, in whole tokens
+    """
+    reserveGCC = rng.integers(min_draw, max_draw, size=n, endpoint=True, dtype=np.int64)
+    reserveUSDC = rng.integers(min_draw, max_draw, size=n, endpoint=True, dtype=np.int64)
+    amountGCCToCommit = rng.integers(min_draw, max_draw, size=n, endpoint=True, dtype=np.int64)
+    return reserveGCC, reserveUSDC, amountGCCToCommit
+
+
+def run_base_case():
+    return run_sim_batch(
+        [amountGCCInLp // 10**gcc_decimals],
+        [amountUSDCInLp // 10**usdc_decimals],
+        [gccCommittment // 10**gcc_decimals],
+    )
+
+
+def _run_chunk(args):
+    """
+    Worker entrypoint. Each chunk gets its own `SeedSequence` child so results don't depend on scheduling
+    """
+    seed_seq, n = args
+    rng = np.random.default_rng(seed_seq)
+    return run_sim_batch(*draw_params(rng, n))
+
+
+def _chunk_sizes(samples: int, chunk_size: int):
+    full, rest = divmod(samples, chunk_size)
+    sizes = [chunk_size] * full
+    if rest:
+        sizes.append(rest)
+    return sizes
+
+
+def iter_sim_chunks(samples: int, chunk_size: int = 1_000_000, workers: int = None, seed: int = None):
+    """
+    Yields (n, 8) result arrays, in order, until `samples` rows have been produced.
+    The base case is not included.
+    """
+    sizes = _chunk_sizes(samples, chunk_size)
+    children = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = zip(children, sizes)
+    if workers == 1:
+        for task in tasks:
+            yield _run_chunk(task)
+        return
+    workers = workers or os.cpu_count() or 1
+    with mp.Pool(processes=workers) as pool:
+        # imap would submit every task up front and buffer all the results the consumer hasn't taken yet,
+        # so keep a window of 2 chunks per worker in flight and submit the next one as the oldest comes back
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.apply_async(_run_chunk, (task,)))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+def run_sims(samples: int, out_path: str = "simulations.csv", chunk_size: int = 1_000_000, workers: int = None,
+             seed: int = None, include_base_case: bool = True):
+    """
+    Streams `samples` simulations (plus the base case) to `out_path` in the same layout as sims.py.
+    If `out_path` ends with `.npy` the rows are written to a memory-mapped npy file instead of a csv
+    """
+    if out_path.endswith(".npy"):
+        rows = samples + (1 if include_base_case else 0)
+        out = np.lib.format.open_memmap(out_path, mode="w+", dtype=np.float64, shape=(rows, len(COLUMNS)))
+        row = 0
+        if include_base_case:
+            out[0] = run_base_case()[0]
+            row = 1
+        for chunk in iter_sim_chunks(samples, chunk_size, workers, seed):
+            out[row:row + chunk.shape[0]] = chunk
+            row += chunk.shape[0]
+            out.flush()
+        del out
+        print("done")
+        return
+
+    with open(out_path, "w", newline="") as file:
+        file.write(",".join(COLUMNS) + "\n")
+        if include_base_case:
+            np.savetxt(file, run_base_case(), delimiter=",", fmt="%.17g")
+        for chunk in iter_sim_chunks(samples, chunk_size, workers, seed):
+            np.savetxt(file, chunk, delimiter=",", fmt="%.17g")
+    print("done")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batched nomination Monte Carlo sims")
+    parser.add_argument("--samples", type=int, default=100)
+    parser.add_argument("--chunk-size", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=None, help="defaults to os.cpu_count()")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--out", type=str, default="simulations.csv")
+    parser.add_argument("--no-base-case", action="store_true")
+    args = parser.parse_args()
+    run_sims(args.samples, args.out, args.chunk_size, args.workers, args.seed, not args.no_base_case)
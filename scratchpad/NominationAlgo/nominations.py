@@ -0,0 +1,264 @@
+"""
+Columnar model of the nomination balances in src/Governance.sol.
+
+`NominationLedger` keeps every account's `Nominations{amount, lastUpdate}` in two arrays (one row per account)
+and applies `grantNominations` / `_spendNominations` with the contract's math:
+    - the balance read at `t` is `HalfLife.calculateHalfLifeValue(amount, t - lastUpdate)` (1 year half-life),
+      evaluated exactly through the ABDKMath64x64 mirror in py-utils/abdkmath64x64
+    - a grant adds to the decayed balance, a spend takes from it, both store the new amount with `lastUpdate = t`
+    - a spend above the balance reverts with `InsufficientNominations` and changes nothing
+
+`nominations_at` evaluates `nominationsOf` for every account at once and `project` does it for a list of
+future timestamps, returning an (timestamps, accounts) grid.
+Amounts are held as uint64 while they fit (nominations have 12 decimals, so up to ~1.8e7 nominations)
+which takes the fast exact uint64 path of the half-life, larger amounts switch the column to python ints.
+
+`proposal_cost_curve` precomputes `_getNominationCostForProposalCreation` (1.1^numActiveProposals in 64.64,
+4 decimals, scaled to 12 decimals) for every number of active proposals the library can raise 1.1 to.
+
+Usage:
+    python3 nominations.py --accounts 1000000 --seed 1 --at 0 2592000 31536000
+    python3 nominations.py --cost-curve 50
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "py-utils"))
+from abdkmath64x64 import ABDKRevert, halflife, scalar  # noqa: E402
+
+# Constants from Governance.sol
+ONE_64x64 = 1 << 64
+ONE_POINT_ONE_128 = (1 << 64) + 0x1999999999999A00
+UINT192_MAX = (1 << 192) - 1
+UINT64_MAX = (1 << 64) - 1
+
+
+class InsufficientNominations(Exception):
+    pass
+
+
+class SafeCastOverflowedUintDowncast(Exception):
+    pass
+
+
+def get_nomination_cost_for_proposal_creation(numActiveProposals: int) -> int:
+    """
+    `_getNominationCostForProposalCreation`
+    """
+    res = scalar.mulu(scalar.mul(ONE_64x64, scalar.pow(ONE_POINT_ONE_128, numActiveProposals)), 10**4)
+    return res * 10**8
+
+
+def proposal_cost_curve(limit: int = None) -> list:
+    """
+    Costs for 0, 1, 2, ... active proposals, up to `limit` entries or until the library reverts
+    (1.1^n no longer fits the 64.64 range)
+    """
+    curve = []
+    while limit is None or len(curve) < limit:
+        try:
+            curve.append(get_nomination_cost_for_proposal_creation(len(curve)))
+        except ABDKRevert:
+            break
+    return curve
+
+
+_COST_CURVE = None
+
+
+def cost_for_new_proposal(numActiveProposals):
+    """
+    `_getNominationCostForProposalCreation` for an int or an array of ints, looked up in the precomputed curve.
+    Raises ABDKRevert for counts the contract can't price either
+    """
+    global _COST_CURVE
+    if _COST_CURVE is None:
+        _COST_CURVE = np.array(proposal_cost_curve(), dtype=object)
+    counts = np.asarray(numActiveProposals)
+    if counts.size and (counts.min() < 0 or counts.max() >= _COST_CURVE.shape[0]):
+        raise ABDKRevert()
+    costs = _COST_CURVE[counts]
+    return costs if counts.ndim else int(costs)
+
+
+def _as_amounts(values) -> np.ndarray:
+    """
+    uint64 array if every value fits, otherwise an object array of python ints
+    """
+    values = np.asarray(values)
+    if values.dtype.kind in "iu" and (values.size == 0 or values.min() >= 0):
+        return values.astype(np.uint64)
+    values = values.astype(object)
+    if values.size and (values.min() < 0):
+        raise ValueError("amounts must be non-negative")
+    if values.size == 0 or values.max() <= UINT64_MAX:
+        return values.astype(np.uint64)
+    return values
+
+
+def _at_least(balances: np.ndarray, amount: int) -> np.ndarray:
+    if balances.dtype == object:
+        return (balances >= amount).astype(bool)
+    if amount > UINT64_MAX:
+        return np.zeros(balances.shape, dtype=bool)
+    return balances >= np.uint64(amount)
+
+
+class NominationLedger:
+    def __init__(self, amounts=(), lastUpdates=()):
+        self.amount = _as_amounts(amounts)
+        self.lastUpdate = np.asarray(lastUpdates, dtype=np.uint64).ravel().copy()
+        if self.amount.shape != self.lastUpdate.shape:
+            raise ValueError("amounts and lastUpdates have different lengths")
+        if self.amount.dtype == object and self.amount.size and self.amount.max() > UINT192_MAX:
+            raise SafeCastOverflowedUintDowncast()
+
+    def __len__(self):
+        return self.amount.shape[0]
+
+    def add_accounts(self, count: int) -> np.ndarray:
+        """
+        Appends `count` accounts with no nominations, returns their rows
+        """
+        start = len(self)
+        self.amount = np.concatenate([self.amount, np.zeros(count, dtype=self.amount.dtype)])
+        self.lastUpdate = np.concatenate([self.lastUpdate, np.zeros(count, dtype=np.uint64)])
+        return np.arange(start, start + count)
+
+    def _elapsed(self, timestamp: int, rows) -> np.ndarray:
+        lastUpdate = self.lastUpdate if rows is None else self.lastUpdate[rows]
+        if lastUpdate.size and int(lastUpdate.max()) > timestamp:
+            # `block.timestamp - n.lastUpdate` underflows
+            raise ValueError(f"timestamp {timestamp} is before the last update of an account")
+        return np.uint64(timestamp) - lastUpdate
+
+    def nominations_at(self, timestamp: int, rows=None) -> np.ndarray:
+        """
+        `nominationsOf` for every account (or the accounts in `rows`) at `timestamp`
+        """
+        amount = self.amount if rows is None else self.amount[rows]
+        elapsed = self._elapsed(timestamp, rows)
+        if amount.dtype == object:
+            return halflife.calculate_half_life_value_batch(amount, elapsed)
+        return halflife.calculate_half_life_value_uint64(amount, elapsed)
+
+    def project(self, timestamps, rows=None) -> np.ndarray:
+        """
+        Balances at every timestamp as a (timestamps, accounts) grid, the ledger isn't changed
+        """
+        timestamps = [int(t) for t in np.asarray(timestamps).ravel()]
+        n = len(self) if rows is None else np.asarray(rows).shape[0]
+        out = np.empty((len(timestamps), n), dtype=self.amount.dtype)
+        for i, t in enumerate(timestamps):
+            out[i] = self.nominations_at(t, rows)
+        return out
+
+    def _store(self, rows: np.ndarray, balances: np.ndarray, timestamp: int):
+        """
+        Writes balances (object arrays of python ints) with `lastUpdate = timestamp`, nothing is written
+        if one doesn't fit the uint192 `amount`
+        """
+        if balances.dtype == object:
+            if balances.size and balances.max() > UINT192_MAX:
+                raise SafeCastOverflowedUintDowncast()
+            if self.amount.dtype != object and balances.size and balances.max() > UINT64_MAX:
+                self.amount = self.amount.astype(object)
+        self.amount[rows] = balances
+        self.lastUpdate[rows] = timestamp
+
+    def grant(self, rows, amounts, timestamp: int):
+        """
+        `grantNominations(to, amount)` for every (row, amount) pair at `timestamp`.
+        A row can appear several times, its grants add up like consecutive calls in one block
+        """
+        rows = np.asarray(rows, dtype=np.int64).ravel()
+        unique, inverse = np.unique(rows, return_inverse=True)
+        balances = self.nominations_at(timestamp, unique).astype(object)
+        np.add.at(balances, inverse, np.asarray(amounts, dtype=object).ravel())
+        self._store(unique, balances, timestamp)
+
+    def spend(self, rows, amounts, timestamp: int) -> np.ndarray:
+        """
+        `_spendNominations(account, amount)` for every (row, amount) pair at `timestamp`, in order.
+        Returns a bool mask of the spends that succeeded, the others revert with `InsufficientNominations`
+        and don't change the account (use `spend_or_revert` to raise instead)
+        """
+        rows = np.asarray(rows, dtype=np.int64).ravel()
+        amounts = np.asarray(amounts, dtype=object).ravel()
+        unique, inverse = np.unique(rows, return_inverse=True)
+        balances = self.nominations_at(timestamp, unique).astype(object)
+        if unique.shape[0] == rows.shape[0]:
+            ok = (balances[inverse] >= amounts).astype(bool)
+            changed = inverse[ok]
+            balances[changed] -= amounts[ok]
+        else:
+            # the same account spends several times, later spends see the earlier ones
+            ok = np.zeros(rows.shape[0], dtype=bool)
+            changedMask = np.zeros(unique.shape[0], dtype=bool)
+            for i, (j, amount) in enumerate(zip(inverse.tolist(), amounts.tolist())):
+                if balances[j] >= amount:
+                    balances[j] -= amount
+                    ok[i] = True
+                    changedMask[j] = True
+            changed = np.flatnonzero(changedMask)
+        changed = np.sort(changed)
+        self._store(unique[changed], balances[changed], timestamp)
+        return ok
+
+    def spend_or_revert(self, row: int, amount: int, timestamp: int):
+        if not self.spend([row], [amount], timestamp)[0]:
+            raise InsufficientNominations()
+
+    def can_create_proposal(self, timestamp: int, numActiveProposals: int, rows=None) -> np.ndarray:
+        """
+        Mask of the accounts whose balance at `timestamp` covers `costForNewProposal`
+        """
+        return _at_least(self.nominations_at(timestamp, rows), cost_for_new_proposal(numActiveProposals))
+
+    def save(self, path: str):
+        np.savez(path, amount=self.amount, lastUpdate=self.lastUpdate)
+
+    @classmethod
+    def load(cls, path: str) -> "NominationLedger":
+        with np.load(path, allow_pickle=True) as data:
+            return cls(data["amount"], data["lastUpdate"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Project decayed Governance nominations for many accounts")
+    parser.add_argument("--accounts", type=int, default=1_000_000, help="synthetic accounts (ignored with --ledger)")
+    parser.add_argument("--ledger", type=str, default=None, help=".npz with `amount` and `lastUpdate` columns")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--at", type=int, nargs="*", default=[0, 30 * 86400, halflife.SECONDS_IN_YEAR],
+                        help="seconds after the latest update to project to")
+    parser.add_argument("--active-proposals", type=int, default=0)
+    parser.add_argument("--cost-curve", type=int, default=None, metavar="N", help="print the cost for 0..N-1 active proposals")
+    args = parser.parse_args()
+
+    if args.cost_curve is not None:
+        print("numActiveProposals,cost")
+        for n, cost in enumerate(proposal_cost_curve(args.cost_curve)):
+            print(f"{n},{cost}")
+        sys.exit(0)
+
+    if args.ledger:
+        ledger = NominationLedger.load(args.ledger)
+    else:
+        rng = np.random.default_rng(args.seed)
+        # up to 10k nominations (12 decimals) last updated over the past 2 years
+        ledger = NominationLedger(rng.integers(0, 10**16, args.accounts, dtype=np.uint64),
+                                  rng.integers(0, 2 * halflife.SECONDS_IN_YEAR, args.accounts, dtype=np.uint64))
+    now = int(ledger.lastUpdate.max()) if len(ledger) else 0
+    cost = cost_for_new_proposal(args.active_proposals)
+    print(f"accounts: {len(ledger)} cost for a new proposal ({args.active_proposals} active): {cost}")
+    for offset in args.at:
+        start = time.perf_counter()
+        balances = ledger.nominations_at(now + offset)
+        elapsed = time.perf_counter() - start
+        total = balances.astype(object).sum()
+        able = int(_at_least(balances, cost).sum())
+        print(f"+{offset}s: total {total} can propose {able} ({elapsed:.3f}s)")
@@ -0,0 +1,613 @@
+"""
+Discrete-event simulator of the money path across the protocol contracts.
+
+The python models of the single contracts are chained the way the contracts call each other:
+    - donations (`donateToUSDCMinerRewardsPool`, the EarlyLiquidity donations) go through `_addToCurrentBucket`
+      into `BucketRewards` (py-utils/miner-pool/bucket_rewards.py)
+    - GCA reports and slashes move the submission windows and finalization of `BucketIndex`
+      (scratchpad/BucketFinalizationAndStateChanges/BucketIndex.py), the packed global state of a bucket is the
+      sum of the latest report of every GCA, as in `handleGlobalBucketStateStore`
+    - `claimRewardFromBucket` is replayed by `ClaimEngine` (py-utils/miner-pool/claim_engine.py), the first
+      successful claim of a bucket (or `handleMintToCarbonCreditAuction`) runs `_handleMintToCarbonCreditAuction`
+      -> `GCC.mintToCarbonCreditAuction` -> `CarbonCreditDescendingPriceAuction.receiveGCC`
+    - `buyGCC` on `CarbonCreditAuction` (scratchpad/CarbonCreditAuction/auction_sim.py)
+
+`Simulation` owns the clock and a heapq of (timestamp, priority, sequence) events. Nothing happens between events,
+so a run over years costs only the events themselves. Behaviour lives in agents (`Agent` subclasses,
+anything with a `start(sim)` method), which schedule callbacks on the simulation and call its entry points
+(`donate`, `submit_report`, `slash`, `claim`, `handle_mint`, `buy_gcc`). Each agent draws from its own
+generator spawned from the scenario seed, so adding an agent doesn't change what the others do.
+Every `snapshot_every` seconds a row of protocol totals is recorded (`Simulation.snapshots` returns them as columns).
+
+`run_scenarios` runs many seeded scenarios in a process pool and returns one summary row per scenario.
+The auction half-life is exact by default, `--float-auction` swaps it for the float one (a few units off per price)
+when throughput matters more.
+
+GLOW inflation (`claimFromInflation`), merkle proofs and GCA salaries aren't modelled.
+
+Usage:
+    python3 protocol_sim.py --years 4 --scenarios 200 --workers 8 --out scenarios.csv
+    python3 protocol_sim.py --years 4 --seed 3 --snapshots snapshots.csv
+"""
+import argparse
+import csv
+import heapq
+import math
+import multiprocessing as mp
+import os
+import sys
+import time
+
+import numpy as np
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+for _dir in (("..", "..", "py-utils", "miner-pool"), ("..", "CarbonCreditAuction"), ("..", "BucketFinalizationAndStateChanges")):
+    sys.path.append(os.path.join(_HERE, *_dir))
+from auction_sim import PRECISION, SALE_UNIT, AuctionRevert, CarbonCreditAuction  # noqa: E402
+from bucket_rewards import BucketRewards  # noqa: E402
+from BucketIndex import BucketIndex, BucketSubmissionEnded, BucketSubmissionNotOpen  # noqa: E402
+from claim_engine import OK, ClaimEngine, pack_global_state  # noqa: E402
+
+GENESIS_TIMESTAMP = 1700352000
+ONE_DAY = 86400
+ONE_WEEK = 7 * ONE_DAY
+USDC = 10**6
+GCC = 10**18
+
+# priorities of events at the same timestamp, lower runs first
+PRIORITY_PROTOCOL = 0
+PRIORITY_AGENT = 1
+PRIORITY_SNAPSHOT = 2
+
+SNAPSHOT_COLUMNS = [
+    "timestamp", "bucket", "donated", "usdcClaimed", "glwClaimed", "gccFinalized", "gccToAuction",
+    "auctionUnitsSold", "auctionGlwPaid", "auctionPricePerUnit", "auctionUnitsForSale",
+    "slashes", "finalizedBuckets", "claims", "revertedClaims", "buys", "revertedBuys",
+]
+
+
+class Simulation:
+    def __init__(self, genesisTimestamp: int = GENESIS_TIMESTAMP, auctionStartingPrice: int = 10**6,
+                 exactAuction: bool = True, snapshotEvery: int = ONE_WEEK, seed: int = None):
+        self.genesisTimestamp = genesisTimestamp
+        self.now = genesisTimestamp
+        self._queue = []
+        self._sequence = 0
+        self._seeds = np.random.SeedSequence(seed)
+        self.agents = []
+        self.events = 0
+
+        self.rewards = BucketRewards(genesisTimestamp)
+        self.buckets = BucketIndex(genesisTimestamp)
+        self.claims = ClaimEngine(self._load_bucket)
+        self.auction = CarbonCreditAuction(auctionStartingPrice, exact=exactAuction)
+
+        # totals
+        self.usdcClaimed = 0
+        self.glwClaimed = 0
+        # totalNewGCC of the finalized buckets
+        self.gccFinalized = 0
+        self.gccToAuction = 0
+        self.auctionGlwPaid = 0
+        self.claimCount = 0
+        self.revertedClaims = 0
+        self.buys = 0
+        self.revertedBuys = 0
+        self.reportReverts = 0
+        self.finalizedBuckets = set()
+
+        self.snapshotEvery = snapshotEvery
+        self._snapshots = []
+        if snapshotEvery:
+            self.every(genesisTimestamp + snapshotEvery, snapshotEvery, self.snapshot, priority=PRIORITY_SNAPSHOT)
+
+    # ---------------------------------------------------------------------- #
+    #                                scheduler                                #
+    # ---------------------------------------------------------------------- #
+
+    def schedule(self, timestamp: int, action, *args, priority: int = PRIORITY_AGENT):
+        """
+        Runs `action(*args)` at `timestamp` (never before now). Events at the same timestamp run by priority, then
+        in the order they were scheduled
+        """
+        timestamp = max(int(timestamp), self.now)
+        heapq.heappush(self._queue, (timestamp, priority, self._sequence, action, args))
+        self._sequence += 1
+
+    def every(self, start: int, period: int, action, *args, priority: int = PRIORITY_AGENT):
+        """
+        Runs `action(*args)` at `start` and every `period` seconds after it, until the action returns False
+        """
+        def repeat():
+            if action(*args) is not False:
+                self.schedule(self.now + period, repeat, priority=priority)
+
+        self.schedule(start, repeat, priority=priority)
+
+    def add_agent(self, agent):
+        agent.rng = np.random.default_rng(self._seeds.spawn(1)[0])
+        self.agents.append(agent)
+        agent.start(self)
+        return agent
+
+    def run(self, until: int):
+        """
+        Processes every event up to and including `until`
+        """
+        queue = self._queue
+        while queue and queue[0][0] <= until:
+            timestamp, _, _, action, args = heapq.heappop(queue)
+            self.now = timestamp
+            self.buckets.currentTimestamp = timestamp
+            action(*args)
+            self.events += 1
+        self.now = max(self.now, until)
+        self.buckets.currentTimestamp = self.now
+
+    # ---------------------------------------------------------------------- #
+    #                                 buckets                                 #
+    # ---------------------------------------------------------------------- #
+
+    def current_bucket(self) -> int:
+        return (self.now - self.genesisTimestamp) // ONE_WEEK
+
+    def bucket_start(self, bucketId: int) -> int:
+        return self.genesisTimestamp + bucketId * ONE_WEEK
+
+    def latest_reports(self, bucketId: int) -> dict:
+        """
+        agent -> (totalNewGCC, leaves) of the reports counted in a bucket, the last one of every GCA
+        """
+        bucket = self.buckets.buckets.get(bucketId)
+        if bucket is None:
+            return {}
+        return {agent: (totalNewGCC, leaves) for agent, totalNewGCC, leaves in bucket.reports}
+
+    def global_state(self, bucketId: int) -> tuple:
+        """
+        (totalNewGCC, totalGlwWeight, totalUSDCWeight) summed over the reports of a bucket
+        """
+        totalNewGCC = glw = usdc = 0
+        for newGCC, (_, glwWeights, usdcWeights) in self.latest_reports(bucketId).values():
+            totalNewGCC += newGCC
+            glw += int(glwWeights.sum())
+            usdc += int(usdcWeights.sum())
+        return totalNewGCC, glw, usdc
+
+    def leaves(self, bucketId: int) -> tuple:
+        """
+        (user ids, glwWeights, usdcWeights) of every leaf of the reports counted in a bucket
+        """
+        reports = list(self.latest_reports(bucketId).values())
+        if not reports:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty.astype(np.uint64), empty.astype(np.uint64)
+        return tuple(np.concatenate([leaves[k] for _, leaves in reports]) for k in range(3))
+
+    def _load_bucket(self, bucketId: int) -> tuple:
+        return pack_global_state(*self.global_state(bucketId)), self.rewards.reward(bucketId)
+
+    def is_finalized(self, bucketId: int) -> bool:
+        finalized = self.buckets.isFinalized(bucketId)
+        if finalized and bucketId not in self.finalizedBuckets:
+            self.finalizedBuckets.add(bucketId)
+            self.gccFinalized += self.global_state(bucketId)[0]
+        return finalized
+
+    # ---------------------------------------------------------------------- #
+    #                               entry points                              #
+    # ---------------------------------------------------------------------- #
+
+    def donate(self, amount: int):
+        """
+        `donateToUSDCMinerRewardsPool(amount)` (or the EarlyLiquidity donation) now
+        """
+        self.rewards.add_donation(self.now, amount)
+
+    def submit_report(self, agent, bucketId: int, totalNewGCC: int, users, glwWeights, usdcWeights) -> bool:
+        """
+        `submitWeeklyReport` from GCA `agent`. Returns False if the bucket doesn't take reports now
+        """
+        leaves = (self.claims.user_ids(users), np.asarray(glwWeights, dtype=np.uint64), np.asarray(usdcWeights, dtype=np.uint64))
+        try:
+            self.buckets.pushReport(bucketId, (agent, int(totalNewGCC), leaves))
+        except (BucketSubmissionNotOpen, BucketSubmissionEnded):
+            self.reportReverts += 1
+            return False
+        return True
+
+    def slash(self):
+        """
+        A slash of the GCAs now (`GCA._slashGCAs` bumping the slash nonce)
+        """
+        self.buckets.executeSlashEvent(self.now)
+
+    def _mint_to_auction(self, amount: int):
+        """
+        `GCC.mintToCarbonCreditAuction` -> `receiveGCC`
+        """
+        if amount > 0:
+            self.auction.receiveGCC(self.now, amount)
+            self.gccToAuction += amount
+
+    def claim(self, bucketId: int, users, glwWeights, usdcWeights):
+        """
+        `claimRewardFromBucket` for every leaf in order, returns the `ClaimEngine` result or None if the bucket
+        isn't finalized (`BucketNotFinalized`)
+        """
+        if not self.is_finalized(bucketId):
+            self.revertedClaims += len(users)
+            return None
+        minted = bucketId in self.claims.minted_to_auction
+        result = self.claims.claim(bucketId, users, glwWeights, usdcWeights)
+        if not minted and bucketId in self.claims.minted_to_auction:
+            self._mint_to_auction(self.claims.minted_to_auction[bucketId])
+        ok = result.status == OK
+        self.claimCount += int(ok.sum())
+        self.revertedClaims += int((~ok).sum())
+        self.usdcClaimed += int(result.usdc.sum())
+        self.glwClaimed += int(result.glw.sum())
+        return result
+
+    def handle_mint(self, bucketId: int) -> bool:
+        """
+        `handleMintToCarbonCreditAuction(bucketId)`, returns False if it reverts or the bucket was already minted
+        """
+        if not self.is_finalized(bucketId) or bucketId in self.claims.minted_to_auction:
+            return False
+        amount = self.claims.bucket(bucketId).totalNewGCC
+        self.claims.minted_to_auction[bucketId] = amount
+        self._mint_to_auction(amount)
+        return True
+
+    def buy_gcc(self, unitsToBuy: int, maxPricePerUnit: int):
+        """
+        `buyGCC(unitsToBuy, maxPricePerUnit)`, returns (price, glowPaid) or None if it reverts
+        """
+        try:
+            price, glowToTransfer = self.auction.buyGCC(self.now, unitsToBuy, maxPricePerUnit)
+        except AuctionRevert:
+            self.revertedBuys += 1
+            return None
+        self.buys += 1
+        self.auctionGlwPaid += glowToTransfer
+        return price, glowToTransfer
+
+    # ---------------------------------------------------------------------- #
+    #                                snapshots                                #
+    # ---------------------------------------------------------------------- #
+
+    def snapshot(self):
+        auction = self.auction
+        self._snapshots.append((
+            self.now, self.current_bucket(), self.rewards.total_donated, self.usdcClaimed, self.glwClaimed,
+            self.gccFinalized, self.gccToAuction, auction.totalUnitsSold, self.auctionGlwPaid,
+            auction.getPricePerUnit(self.now), auction.unitsForSale(self.now), self.buckets.globalNonce,
+            len(self.finalizedBuckets), self.claimCount, self.revertedClaims, self.buys, self.revertedBuys,
+        ))
+
+    def snapshots(self) -> dict:
+        """
+        The snapshots as columns (object arrays, the amounts don't fit in 64 bits)
+        """
+        rows = self._snapshots
+        return {name: np.array([row[i] for row in rows], dtype=object) for i, name in enumerate(SNAPSHOT_COLUMNS)}
+
+    def summary(self) -> dict:
+        self.snapshot()
+        row = dict(zip(SNAPSHOT_COLUMNS, self._snapshots.pop()))
+        row["events"] = self.events
+        row["reportReverts"] = self.reportReverts
+        return row
+
+
+# -------------------------------------------------------------------------- #
+#                                   agents                                    #
+# -------------------------------------------------------------------------- #
+
+
+class Agent:
+    """
+    Base of the behaviours. `rng` is set by `Simulation.add_agent` before `start` is called
+    """
+
+    rng = None
+
+    def start(self, sim: Simulation):
+        raise NotImplementedError
+
+
+class Donor(Agent):
+    """
+    Donates a lognormal amount of USDC every week (the EarlyLiquidity and protocol fee flow)
+    """
+
+    def __init__(self, weeklyUSDC: float = 100_000, sigma: float = 0.5, growth: float = 0.0):
+        self.weeklyUSDC = weeklyUSDC
+        self.sigma = sigma
+        self.growth = growth
+
+    def start(self, sim):
+        self.weeks = 0
+        sim.every(sim.genesisTimestamp + ONE_DAY, ONE_WEEK, self.donate, sim)
+
+    def donate(self, sim):
+        median = self.weeklyUSDC * (1 + self.growth) ** self.weeks
+        self.weeks += 1
+        sim.donate(int(self.rng.lognormal(math.log(median), self.sigma) * USDC))
+
+
+class GCAReporter(Agent):
+    """
+    A GCA reporting its farms every week for the bucket whose submission window is open,
+    `reportDelay` seconds into the window. Farm weights and the new GCC are lognormal around their means.
+    With `resubmitProbability` the GCA sends a second (corrected) report later in the same window.
+    Reports a slash threw out are sent again while their bucket's reinstated window is open
+    """
+
+    def __init__(self, name: str, farms: int = 100, weeklyGCC: float = 1_000, meanWeight: float = 10_000,
+                 sigma: float = 0.8, reportDelay: int = 3 * ONE_DAY, resubmitProbability: float = 0.0):
+        self.name = name
+        self.farms = [f"{name}-farm{i}" for i in range(farms)]
+        self.weeklyGCC = weeklyGCC
+        self.meanWeight = meanWeight
+        self.sigma = sigma
+        self.reportDelay = reportDelay
+        self.resubmitProbability = resubmitProbability
+
+    def start(self, sim):
+        self.ids = sim.claims.user_ids(self.farms)
+        # bucketId -> the last report sent, until the bucket finalizes
+        self.sent = {}
+        sim.every(sim.genesisTimestamp + self.reportDelay, ONE_WEEK, self.report, sim)
+
+    def resend(self, sim):
+        for bucketId, report in list(self.sent.items()):
+            bucket = sim.buckets.buckets[bucketId]
+            if sim.is_finalized(bucketId):
+                del self.sent[bucketId]
+            elif bucket.lastUpdatedNonce != sim.buckets.globalNonce \
+                    and sim.now < sim.buckets.calculateBucketSubmissionEndTimestamp(bucketId):
+                sim.submit_report(self.name, bucketId, *report)
+
+    def report(self, sim):
+        self.resend(sim)
+        bucketId = sim.current_bucket()
+        rng = self.rng
+        glw = np.maximum(1, rng.lognormal(math.log(self.meanWeight), self.sigma, len(self.farms))).astype(np.uint64)
+        usdc = np.maximum(1, rng.lognormal(math.log(self.meanWeight), self.sigma, len(self.farms))).astype(np.uint64)
+        newGCC = int(rng.lognormal(math.log(self.weeklyGCC), 0.3) * GCC)
+        if sim.submit_report(self.name, bucketId, newGCC, self.ids, glw, usdc):
+            self.sent[bucketId] = (newGCC, self.ids, glw, usdc)
+        if rng.random() < self.resubmitProbability:
+            later = sim.now + int(rng.integers(1, max(2, ONE_WEEK - self.reportDelay)))
+            sim.schedule(later, sim.submit_report, self.name, bucketId, newGCC, self.ids, glw, usdc)
+
+
+class Farms(Agent):
+    """
+    Farms claiming the leaves of every bucket: a share `claimProbability` of them claims, each after an exponential
+    delay (mean `meanDelay`) from the time the bucket first finalizes. The delays are rounded down to `batch` seconds
+    and the claims of a round go out as one batch (still one transaction per leaf, in order). Buckets that aren't finalized yet (a slash moved them) are tried again a week later
+    """
+
+    def __init__(self, claimProbability: float = 0.9, meanDelay: float = 14 * ONE_DAY, batch: int = ONE_DAY):
+        self.claimProbability = claimProbability
+        self.meanDelay = meanDelay
+        self.batch = batch
+
+    def start(self, sim):
+        # buckets become claimable two weeks after their submission window opens
+        self.pending = []
+        sim.every(sim.bucket_start(2), ONE_WEEK, self.check, sim)
+
+    def check(self, sim):
+        bucketId = sim.current_bucket() - 2
+        self.pending.append(bucketId)
+        still = []
+        for bucketId in self.pending:
+            if sim.is_finalized(bucketId):
+                self.schedule_claims(sim, bucketId)
+            elif bucketId in sim.buckets.buckets:
+                still.append(bucketId)
+        self.pending = still
+
+    def schedule_claims(self, sim, bucketId):
+        users, glw, usdc = sim.leaves(bucketId)
+        if users.shape[0] == 0:
+            return
+        rng = self.rng
+        claiming = np.flatnonzero(rng.random(users.shape[0]) < self.claimProbability)
+        delays = (rng.exponential(self.meanDelay, claiming.shape[0]) // self.batch * self.batch).astype(np.int64)
+        order = np.argsort(delays, kind="stable")
+        claiming, delays = claiming[order], delays[order]
+        starts = np.flatnonzero(np.r_[True, delays[1:] != delays[:-1]])
+        for start, stop in zip(starts.tolist(), np.r_[starts[1:], claiming.shape[0]].tolist()):
+            rows = claiming[start:stop]
+            sim.schedule(sim.now + int(delays[start]), sim.claim, bucketId, users[rows], glw[rows], usdc[rows])
+
+
+class MintKeeper(Agent):
+    """
+    Calls `handleMintToCarbonCreditAuction` for finalized buckets nobody claimed from `afterWeeks` after they finalized
+    """
+
+    def __init__(self, afterWeeks: int = 1):
+        self.afterWeeks = afterWeeks
+
+    def start(self, sim):
+        sim.every(sim.bucket_start(2 + self.afterWeeks) + ONE_DAY // 2, ONE_WEEK, self.mint, sim)
+
+    def mint(self, sim):
+        bucketId = sim.current_bucket() - 2 - self.afterWeeks
+        if bucketId in sim.buckets.buckets:
+            sim.handle_mint(bucketId)
+
+
+class AuctionBuyers(Agent):
+    """
+    Poisson buyers of the carbon credit auction, buying an exponential fraction of the units for sale
+    with a lognormal `maxPricePerUnit` around `referencePrice` (as auction_sim.synthetic_events),
+    no buyer at all if `buysPerDay` is 0. Reverted buys are counted by `Simulation.buy_gcc`
+    """
+
+    def __init__(self, buysPerDay: float = 20.0, meanFraction: float = 0.02, referencePrice: int = 10**6,
+                 priceSigma: float = 0.5):
+        if buysPerDay < 0:
+            raise ValueError("buysPerDay must be >= 0")
+        self.meanGap = ONE_DAY / buysPerDay if buysPerDay > 0 else None
+        self.meanFraction = meanFraction
+        self.referencePrice = referencePrice
+        self.priceSigma = priceSigma
+
+    def start(self, sim):
+        if self.meanGap is None:
+            return
+        sim.schedule(sim.now + 1 + int(self.rng.exponential(self.meanGap)), self.buy, sim)
+
+    def buy(self, sim):
+        rng = self.rng
+        unitsForSale = sim.auction.unitsForSale(sim.now)
+        fraction = min(1.0, max(1e-8, rng.exponential(self.meanFraction)))
+        units = max(1, unitsForSale * int(fraction * PRECISION) // PRECISION)
+        sim.buy_gcc(units, int(self.referencePrice * rng.lognormal(0.0, self.priceSigma)))
+        sim.schedule(sim.now + 1 + int(rng.exponential(self.meanGap)), self.buy, sim)
+
+
+class Slasher(Agent):
+    """
+    Slashes the GCAs with probability `weeklyProbability` every week, at a uniform time in the week
+    """
+
+    def __init__(self, weeklyProbability: float = 0.01):
+        self.weeklyProbability = weeklyProbability
+
+    def start(self, sim):
+        sim.every(sim.genesisTimestamp, ONE_WEEK, self.maybe_slash, sim)
+
+    def maybe_slash(self, sim):
+        if self.rng.random() < self.weeklyProbability:
+            sim.schedule(sim.now + int(self.rng.integers(0, ONE_WEEK)), sim.slash, priority=PRIORITY_PROTOCOL)
+
+
+# -------------------------------------------------------------------------- #
+#                                 scenarios                                   #
+# -------------------------------------------------------------------------- #
+
+DEFAULT_SCENARIO = {
+    "weeks": 208,
+    "gcas": 5,
+    "farms_per_gca": 100,
+    "weekly_gcc": 1_000.0,
+    "weekly_donation": 100_000.0,
+    "donation_growth": 0.0,
+    "claim_probability": 0.9,
+    "claim_delay_days": 14.0,
+    "buys_per_day": 20.0,
+    "mean_buy_fraction": 0.02,
+    "reference_price": 10**6,
+    "slash_probability": 0.01,
+    "resubmit_probability": 0.05,
+    "exact_auction": True,
+}
+
+
+def build_simulation(scenario: dict, seed: int = None) -> Simulation:
+    """
+    A simulation with the default agents, parameters not in `scenario` come from DEFAULT_SCENARIO
+    """
+    p = {**DEFAULT_SCENARIO, **scenario}
+    sim = Simulation(auctionStartingPrice=int(p["reference_price"]), exactAuction=p["exact_auction"], seed=seed)
+    sim.add_agent(Donor(p["weekly_donation"], growth=p["donation_growth"]))
+    for i in range(p["gcas"]):
+        sim.add_agent(GCAReporter(f"gca{i}", p["farms_per_gca"], p["weekly_gcc"] / p["gcas"],
+                                  resubmitProbability=p["resubmit_probability"]))
+    sim.add_agent(Farms(p["claim_probability"], p["claim_delay_days"] * ONE_DAY))
+    sim.add_agent(MintKeeper())
+    sim.add_agent(AuctionBuyers(p["buys_per_day"], p["mean_buy_fraction"], int(p["reference_price"])))
+    sim.add_agent(Slasher(p["slash_probability"]))
+    return sim
+
+
+def run_scenario(args) -> dict:
+    """
+    Worker entrypoint: (scenario, seed) -> summary row
+    """
+    scenario, seed = args
+    start = time.perf_counter()
+    sim = build_simulation(scenario, seed)
+    sim.run(sim.genesisTimestamp + {**DEFAULT_SCENARIO, **scenario}["weeks"] * ONE_WEEK)
+    row = {"seed": seed, **scenario, **sim.summary()}
+    row["seconds"] = round(time.perf_counter() - start, 3)
+    return row
+
+
+def run_scenarios(scenarios, workers: int = None):
+    """
+    Yields the summary of every (scenario, seed) pair, in order
+    """
+    if workers == 1:
+        yield from map(run_scenario, scenarios)
+        return
+    with mp.Pool(processes=workers) as pool:
+        yield from pool.imap(run_scenario, scenarios)
+
+
+def write_rows(path: str, rows):
+    with open(path, "w", newline="") as f:
+        writer = None
+        for row in rows:
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=list(row), lineterminator="\n")
+                writer.writeheader()
+            writer.writerow(row)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Discrete-event simulation of donations, reports, claims and the GCC auction")
+    parser.add_argument("--years", type=float, default=4.0)
+    parser.add_argument("--scenarios", type=int, default=1, help="seeds to run (seed, seed + 1, ...)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--gcas", type=int, default=DEFAULT_SCENARIO["gcas"])
+    parser.add_argument("--farms-per-gca", type=int, default=DEFAULT_SCENARIO["farms_per_gca"])
+    parser.add_argument("--weekly-donation", type=float, default=DEFAULT_SCENARIO["weekly_donation"], help="USDC")
+    parser.add_argument("--weekly-gcc", type=float, default=DEFAULT_SCENARIO["weekly_gcc"])
+    parser.add_argument("--buys-per-day", type=float, default=DEFAULT_SCENARIO["buys_per_day"], help="0 for no buyer")
+    parser.add_argument("--slash-probability", type=float, default=DEFAULT_SCENARIO["slash_probability"], help="per week")
+    parser.add_argument("--float-auction", action="store_true", help="float half-life in the auction")
+    parser.add_argument("--out", type=str, default=None, help="summary csv, one row per scenario")
+    parser.add_argument("--snapshots", type=str, default=None, help="weekly snapshot csv of a single scenario")
+    args = parser.parse_args()
+    if args.buys_per_day < 0:
+        parser.error("--buys-per-day must be >= 0")
+
+    scenario = {
+        "weeks": int(args.years * 52),
+        "gcas": args.gcas,
+        "farms_per_gca": args.farms_per_gca,
+        "weekly_donation": args.weekly_donation,
+        "weekly_gcc": args.weekly_gcc,
+        "buys_per_day": args.buys_per_day,
+        "slash_probability": args.slash_probability,
+        "exact_auction": not args.float_auction,
+    }
+    if args.snapshots:
+        sim = build_simulation(scenario, args.seed)
+        sim.run(sim.genesisTimestamp + scenario["weeks"] * ONE_WEEK)
+        columns = sim.snapshots()
+        write_rows(args.snapshots, (dict(zip(columns, row)) for row in zip(*columns.values())))
+        print(sim.summary())
+        sys.exit(0)
+
+    start = time.perf_counter()
+    rows = []
+    for row in run_scenarios([(scenario, args.seed + i) for i in range(args.scenarios)], args.workers):
+        rows.append(row)
+        print(f"seed {row['seed']}: donated {row['donated'] / USDC:.0f} claimed {row['usdcClaimed'] / USDC:.0f} USDC, "
+              f"auction {row['gccToAuction'] / GCC:.0f} GCC in, {row['auctionUnitsSold'] * SALE_UNIT / GCC:.2f} GCC sold, "
+              f"{row['events']} events in {row['seconds']}s")
+    elapsed = time.perf_counter() - start
+    print(f"{len(rows)} scenarios in {elapsed:.1f}s ({3600 * len(rows) / max(elapsed, 1e-9):.0f} per hour)")
+    if args.out:
+        write_rows(args.out, rows)
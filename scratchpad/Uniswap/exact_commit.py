@@ -0,0 +1,214 @@
+"""
+Exact-integer evaluator for the optimal-commit formula.
+
+`find_optimalAmount_to_commit` (NominationAlgo/sims.py) and `vorick` (main.py) use float `math.sqrt`,
+which loses precision for reserves like `33616776044342304721799538359722 * 1e18`.
+This file mirrors `ImpactCatalyst.findOptimalAmountToSwap` bit-for-bit:
+    - `sqrt` is the solady floor sqrt, which is exactly `math.isqrt` for every uint256
+    - every intermediate is checked against the uint256 range (solidity 0.8 checked math)
+    - division is solidity floor division
+    - `c > a * b` reverts with `PrecisionLossLeadToUnderflow`
+
+`evaluate_batch` runs the exact and the float version over whole arrays of inputs (lists or numpy object arrays)
+and returns the divergence between the two for every input.
+`evaluate_batch_parallel` splits the inputs into chunks over a process pool for millions of fuzz points.
+
+Usage:
+    python3 exact_commit.py --samples 1000000 --workers 8 --seed 42
+"""
+import argparse
+import math
+import multiprocessing as mp
+import random
+
+import numpy as np
+
+UINT256_MAX = 2**256 - 1
+
+# ImpactCatalyst magnifications
+GCC_MAGNIFICATION = 10**18
+USDC_MAGNIFICATION = 10**24
+
+
+class SolidityRevert(Exception):
+    pass
+
+
+class PrecisionLossLeadToUnderflow(SolidityRevert):
+    pass
+
+
+class Overflow(SolidityRevert):
+    pass
+
+
+def _checked(x: int) -> int:
+    if x > UINT256_MAX:
+        raise Overflow()
+    return x
+
+
+def find_optimal_amount_to_swap(amountTocommit: int, totalReservesOfToken: int) -> int:
+    """
+    `ImpactCatalyst.findOptimalAmountToSwap`
+    """
+    a = _checked(math.isqrt(totalReservesOfToken) + 1)  # adjust for div round down errors
+    b = math.isqrt(_checked(_checked(3988000 * amountTocommit) + _checked(3988009 * totalReservesOfToken)))
+    c = _checked(1997 * totalReservesOfToken)
+    d = 1994
+    ab = _checked(a * b)
+    if c > ab:
+        raise PrecisionLossLeadToUnderflow()
+    return (ab - c) // d
+
+
+def find_optimal_amount_to_commit_float(amountToCommit, reservesOfToken):
+    """
+    Same as `find_optimalAmount_to_commit` in NominationAlgo/sims.py.
+    `vorick` in main.py is the same formula without the `+ 1` on `a`.
+    """
+    a = math.sqrt(reservesOfToken) + 1
+    b = math.sqrt(3988000 * amountToCommit + 3988009 * reservesOfToken)
+    c = 1997 * reservesOfToken
+    d = 1994
+    return ((a * b) - c) / d
+
+
+def optimal_swap_for_commit(amount: int, reserve: int, magnification: int) -> int:
+    """
+    The amount that ImpactCatalyst actually swaps in `commitGCC` / `commitUSDC`
+    (the formula is run on magnified inputs and the result is scaled back down)
+    """
+    return find_optimal_amount_to_swap(_checked(amount * magnification), _checked(reserve * magnification)) // magnification
+
+
+def evaluate_batch(amounts, reserves, magnification: int = 1):
+    """
+    Evaluates the exact and the float formula for every (amount, reserve) pair.
+
+    `amounts` and `reserves` can be any sequence of python ints (lists, numpy object arrays, ...).
+    When `magnification` is not 1 both versions are run on magnified inputs and scaled back down,
+    the way ImpactCatalyst does it.
+
+    Returns a dict of numpy arrays:
+        exact       - object array of python ints (None where the contract would revert)
+        float       - float64 array from the float formula
+        reverted    - bool array, True where the contract would revert
+        abs_diff    - float - exact (nan where reverted)
+        rel_diff    - abs_diff / exact (nan where reverted or exact == 0)
+    """
+    n = len(amounts)
+    if len(reserves) != n:
+        raise ValueError("amounts and reserves must be the same length")
+    exact = np.empty(n, dtype=object)
+    floats = np.empty(n, dtype=np.float64)
+    reverted = np.zeros(n, dtype=bool)
+    abs_diff = np.full(n, np.nan, dtype=np.float64)
+
+    for i, (amount, reserve) in enumerate(zip(amounts, reserves)):
+        amount = int(amount)
+        reserve = int(reserve)
+        magnified_amount = amount * magnification
+        magnified_reserve = reserve * magnification
+        try:
+            res = optimal_swap_for_commit(amount, reserve, magnification)
+        except SolidityRevert:
+            res = None
+            reverted[i] = True
+        try:
+            f = find_optimal_amount_to_commit_float(magnified_amount, magnified_reserve) / magnification
+        except (OverflowError, ValueError):
+            f = math.nan
+        exact[i] = res
+        floats[i] = f
+        if res is not None:
+            # float(int) rounds once, so the diff is measured in the float domain
+            abs_diff[i] = f - float(res)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        exact_as_float = np.array([math.nan if e is None else float(e) for e in exact], dtype=np.float64)
+        rel_diff = np.where(exact_as_float != 0, abs_diff / exact_as_float, np.nan)
+
+    return {
+        "exact": exact,
+        "float": floats,
+        "reverted": reverted,
+        "abs_diff": abs_diff,
+        "rel_diff": rel_diff,
+    }
+
+
+def _evaluate_chunk(args):
+    amounts, reserves, magnification = args
+    return evaluate_batch(amounts, reserves, magnification)
+
+
+def evaluate_batch_parallel(amounts, reserves, magnification: int = 1, chunk_size: int = 100_000, workers: int = None):
+    """
+    Same as `evaluate_batch` but chunked over a process pool. The results are concatenated in input order.
+    """
+    n = len(amounts)
+    if len(reserves) != n:
+        raise ValueError("amounts and reserves must be the same length")
+    tasks = [
+        (list(amounts[i:i + chunk_size]), list(reserves[i:i + chunk_size]), magnification)
+        for i in range(0, n, chunk_size)
+    ]
+    if workers == 1:
+        results = [_evaluate_chunk(t) for t in tasks]
+    else:
+        with mp.Pool(processes=workers) as pool:
+            results = pool.map(_evaluate_chunk, tasks)
+    if not results:
+        return evaluate_batch([], [], magnification)
+    return {key: np.concatenate([r[key] for r in results]) for key in results[0]}
+
+
+def summarize(result) -> dict:
+    """
+    Aggregate view of an `evaluate_batch` result
+    """
+    ok = ~result["reverted"]
+    abs_diff = np.abs(result["abs_diff"][ok])
+    rel_diff = np.abs(result["rel_diff"][ok])
+    rel_diff = rel_diff[~np.isnan(rel_diff)]
+    return {
+        "samples": int(result["reverted"].shape[0]),
+        "reverted": int(result["reverted"].sum()),
+        "bit_exact": int((abs_diff == 0).sum()),
+        "max_abs_diff": float(abs_diff.max()) if abs_diff.size else 0.0,
+        "max_rel_diff": float(rel_diff.max()) if rel_diff.size else 0.0,
+        "mean_rel_diff": float(rel_diff.mean()) if rel_diff.size else 0.0,
+    }
+
+
+def random_inputs(samples: int, seed: int = None, max_bits: int = 112):
+    """
+    Fuzz inputs that span many orders of magnitude.
+    UniswapV2 reserves are uint112 so `max_bits` defaults to 112.
+    """
+    rng = random.Random(seed)
+    amounts = [rng.getrandbits(rng.randint(1, max_bits)) + 1 for _ in range(samples)]
+    reserves = [rng.getrandbits(rng.randint(1, max_bits)) + 1 for _ in range(samples)]
+    return amounts, reserves
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exact vs float optimal-commit divergence check")
+    parser.add_argument("--samples", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--magnification", type=int, default=1, help="1e18 for GCC commits, 1e24 for USDC commits")
+    args = parser.parse_args()
+
+    # The example from main.py
+    amount = 10000001 * 10**18
+    reserves = 33616776044342304721799538359722 * 10**18
+    example = evaluate_batch([amount], [reserves])
+    print(f"main.py example: exact = {example['exact'][0]} float = {float(example['float'][0])} diff = {float(example['abs_diff'][0])}")
+
+    amounts, reserves = random_inputs(args.samples, args.seed)
+    result = evaluate_batch_parallel(amounts, reserves, args.magnification, args.chunk_size, args.workers)
+    for k, v in summarize(result).items():
+        print(f"{k}: {v}")
@@ -0,0 +1,300 @@
+"""
+Off-chain mirror of the ImpactCatalyst impact power estimates.
+
+`estimateGCCCommitImpactPower(amount)` / `estimateUSDCCommitImpactPower(amount)` read the GCC-USDC pair reserves,
+split `amount` with `findOptimalAmountToSwap` (run on magnified inputs, see exact_commit.py), quote the swap and the
+liquidity add with `UniswapV2Library` and return the `sqrt` of the two liquidity amounts.
+`commitGCC` / `commitUSDC` (and `BatchCommit`, which calls them) start from the same split.
+
+`ImpactPowerEstimator` holds one reserves snapshot and everything that only depends on it:
+the magnified reserve, `sqrt(reserve) + 1` and `3988009 * reserve` of `findOptimalAmountToSwap`.
+`estimate_gcc` / `estimate_usdc` evaluate a whole array of candidate amounts in one pass
+(object arrays of python ints, exact), results are also kept per amount until the reserves change,
+so re-asking for the same amounts (a front end on every keystroke) costs a dict lookup.
+`update_reserves` (or `refresh` with a reserves loader) only drops the cache when the reserves actually changed.
+
+Every lane has a status: OK, or the revert the call would hit (checked math overflow, `PrecisionLossLeadToUnderflow`,
+the `UniswapV2Library` requires). Reverted lanes have an impact power of None.
+
+`solady_sqrt` is a line by line port of `ImpactCatalyst.sqrt`. It returns floor(sqrt(x)) for every uint256, so the
+estimator uses `math.isqrt`; `check_sqrt` fuzzes the two against each other.
+
+Usage:
+    python3 impact_power.py --reserve-gcc 1000000000000000000000 --reserve-usdc 10000000000 --gcc 1e18 5e18 --usdc 1e6
+    python3 impact_power.py --check-sqrt 1000000
+"""
+import argparse
+import math
+import os
+import random
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+from exact_commit import GCC_MAGNIFICATION, UINT256_MAX, USDC_MAGNIFICATION
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "py-utils"))
+from amounts import parse_amount  # noqa: E402
+
+FEE_NUMERATOR = 997
+FEE_DENOMINATOR = 1000
+
+# statuses, in the order the estimate can hit them
+OK = 0
+OVERFLOW = 1  # checked math
+PRECISION_LOSS_LEAD_TO_UNDERFLOW = 2
+INSUFFICIENT_INPUT_AMOUNT = 3  # getAmountOut of a zero swap
+INSUFFICIENT_LIQUIDITY = 4
+UNDERFLOW = 5  # `amount - optimalSwapAmount` or the reserve left after the swap
+INSUFFICIENT_AMOUNT = 6  # quote of a zero amount
+
+STATUS_NAMES = {
+    OK: "OK",
+    OVERFLOW: "panic: arithmetic overflow",
+    PRECISION_LOSS_LEAD_TO_UNDERFLOW: "PrecisionLossLeadToUnderflow",
+    INSUFFICIENT_INPUT_AMOUNT: "UniswapV2Library: INSUFFICIENT_INPUT_AMOUNT",
+    INSUFFICIENT_LIQUIDITY: "UniswapV2Library: INSUFFICIENT_LIQUIDITY",
+    UNDERFLOW: "panic: arithmetic underflow",
+    INSUFFICIENT_AMOUNT: "UniswapV2Library: INSUFFICIENT_AMOUNT",
+}
+
+Estimate = namedtuple("Estimate", ["status", "impactPower", "optimalSwapAmount"])
+
+
+def solady_sqrt(x: int) -> int:
+    """
+    `ImpactCatalyst.sqrt` (solady), step for step
+    """
+    y = x
+    z = 181
+    if y >= 0x10000000000000000000000000000000000:
+        y >>= 128
+        z <<= 64
+    if y >= 0x1000000000000000000:
+        y >>= 64
+        z <<= 32
+    if y >= 0x10000000000:
+        y >>= 32
+        z <<= 16
+    if y >= 0x1000000:
+        y >>= 16
+        z <<= 8
+    z = (z * (y + 65536)) >> 18
+    for _ in range(7):
+        # evm `div` by zero is 0
+        z = (z + (x // z if z else 0)) >> 1
+    return z - (1 if (x // z if z else 0) < z else 0)
+
+
+def check_sqrt(samples: int, seed: int = None) -> int:
+    """
+    Compares `solady_sqrt` with `math.isqrt` on the edge cases and `samples` random uint256 of every bit length,
+    returns the number of mismatches
+    """
+    rng = random.Random(seed)
+    values = list(range(0, 70000)) + [UINT256_MAX, UINT256_MAX - 1]
+    for bits in range(1, 129):
+        r = (1 << bits) - 1
+        values += [r * r - 1, r * r, r * r + 1, (r + 1) * (r + 1) - 1]
+    values += [rng.getrandbits(rng.randint(1, 256)) for _ in range(samples)]
+    return sum(solady_sqrt(v) != math.isqrt(v) for v in values if v <= UINT256_MAX)
+
+
+# -------------------------------------------------------------------------- #
+#                                 one side                                    #
+# -------------------------------------------------------------------------- #
+
+
+class _Side:
+    """
+    The reserve dependent constants of a commit of one token: `reserveIn` is the reserve of the committed token
+    """
+
+    def __init__(self, reserveIn: int, reserveOut: int, magnification: int):
+        self.reserveIn = reserveIn
+        self.reserveOut = reserveOut
+        self.magnification = magnification
+        self.reserveMagnified = reserveIn * magnification
+        self.valid = self.reserveMagnified <= UINT256_MAX and 3988009 * self.reserveMagnified <= UINT256_MAX
+        if self.valid:
+            self.a = math.isqrt(self.reserveMagnified) + 1
+            self.b0 = 3988009 * self.reserveMagnified
+            self.c = 1997 * self.reserveMagnified
+        self.cache = {}
+
+    def estimate(self, amounts: list) -> tuple:
+        """
+        (status, impactPower, optimalSwapAmount) lists for a list of python ints
+        """
+        n = len(amounts)
+        status = [OK] * n
+        power = [None] * n
+        swaps = [None] * n
+        if not self.valid:
+            return [OVERFLOW] * n, power, swaps
+        reserveIn, reserveOut, magnification = self.reserveIn, self.reserveOut, self.magnification
+        a, b0, c = self.a, self.b0, self.c
+        for i, amount in enumerate(amounts):
+            amountMagnified = amount * magnification
+            b = 3988000 * amountMagnified
+            if amountMagnified > UINT256_MAX or b > UINT256_MAX or b + b0 > UINT256_MAX:
+                status[i] = OVERFLOW
+                continue
+            ab = a * math.isqrt(b + b0)
+            if ab > UINT256_MAX:
+                status[i] = OVERFLOW
+                continue
+            if c > ab:
+                status[i] = PRECISION_LOSS_LEAD_TO_UNDERFLOW
+                continue
+            swap = (ab - c) // 1994 // magnification
+            swaps[i] = swap
+            # getAmountOut(swap, reserveIn, reserveOut)
+            if swap == 0:
+                status[i] = INSUFFICIENT_INPUT_AMOUNT
+                continue
+            if reserveIn == 0 or reserveOut == 0:
+                status[i] = INSUFFICIENT_LIQUIDITY
+                continue
+            amountInWithFee = swap * FEE_NUMERATOR
+            numerator = amountInWithFee * reserveOut
+            denominator = reserveIn * FEE_DENOMINATOR + amountInWithFee
+            if numerator > UINT256_MAX or denominator > UINT256_MAX:
+                status[i] = OVERFLOW
+                continue
+            estimateOut = numerator // denominator
+            if swap > amount:
+                status[i] = UNDERFLOW
+                continue
+            toAdd = amount - swap
+            inAfter = reserveIn + swap
+            outAfter = reserveOut - estimateOut
+            if inAfter > UINT256_MAX:
+                status[i] = OVERFLOW
+                continue
+            # quote(toAdd, inAfter, outAfter)
+            if toAdd == 0:
+                status[i] = INSUFFICIENT_AMOUNT
+                continue
+            if outAfter == 0:
+                status[i] = INSUFFICIENT_LIQUIDITY
+                continue
+            if toAdd * outAfter > UINT256_MAX:
+                status[i] = OVERFLOW
+                continue
+            optimalOut = toAdd * outAfter // inAfter
+            if optimalOut <= estimateOut:
+                product = toAdd * optimalOut
+            else:
+                # quote(estimateOut, outAfter, inAfter)
+                if estimateOut == 0:
+                    status[i] = INSUFFICIENT_AMOUNT
+                    continue
+                if estimateOut * inAfter > UINT256_MAX:
+                    status[i] = OVERFLOW
+                    continue
+                product = estimateOut * (estimateOut * inAfter // outAfter)
+            if product > UINT256_MAX:
+                status[i] = OVERFLOW
+                continue
+            power[i] = math.isqrt(product)
+        return status, power, swaps
+
+
+# -------------------------------------------------------------------------- #
+#                                 estimator                                   #
+# -------------------------------------------------------------------------- #
+
+
+class ImpactPowerEstimator:
+    def __init__(self, reserveGCC: int = 0, reserveUSDC: int = 0, load_reserves=None, cache_size: int = 1 << 16):
+        """
+        `load_reserves()` returns the current (reserveGCC, reserveUSDC), e.g. from `getReserves` of the pair
+        ordered with `gcc_and_usdc_reserves`. It is only called by `refresh`
+        """
+        self.load_reserves = load_reserves
+        self.cache_size = cache_size
+        self.reserveGCC = None
+        self.reserveUSDC = None
+        self.snapshots = 0
+        self.update_reserves(reserveGCC, reserveUSDC)
+
+    def update_reserves(self, reserveGCC: int, reserveUSDC: int) -> bool:
+        """
+        Moves to a new reserves snapshot, returns False (and keeps every cached estimate) if nothing changed
+        """
+        reserveGCC, reserveUSDC = int(reserveGCC), int(reserveUSDC)
+        if (reserveGCC, reserveUSDC) == (self.reserveGCC, self.reserveUSDC):
+            return False
+        self.reserveGCC, self.reserveUSDC = reserveGCC, reserveUSDC
+        self._gcc = _Side(reserveGCC, reserveUSDC, GCC_MAGNIFICATION)
+        self._usdc = _Side(reserveUSDC, reserveGCC, USDC_MAGNIFICATION)
+        self.snapshots += 1
+        return True
+
+    def refresh(self) -> bool:
+        return self.update_reserves(*self.load_reserves())
+
+    def _estimate(self, side: _Side, amounts) -> Estimate:
+        scalar = np.ndim(amounts) == 0
+        values = [int(amounts)] if scalar else [int(a) for a in np.asarray(amounts, dtype=object).ravel()]
+        cache = side.cache
+        missing = list({v for v in values if v not in cache})
+        if missing:
+            if len(cache) + len(missing) > self.cache_size:
+                cache.clear()
+            for amount, result in zip(missing, zip(*side.estimate(missing))):
+                cache[amount] = result
+        results = [cache[v] for v in values]
+        if scalar:
+            return Estimate(*results[0])
+        shape = np.shape(amounts)
+        status = np.array([r[0] for r in results], dtype=np.int8).reshape(shape)
+        power = np.empty(len(values), dtype=object)
+        swaps = np.empty(len(values), dtype=object)
+        power[:] = [r[1] for r in results]
+        swaps[:] = [r[2] for r in results]
+        return Estimate(status, power.reshape(shape), swaps.reshape(shape))
+
+    def estimate_gcc(self, amounts) -> Estimate:
+        """
+        `estimateGCCCommitImpactPower` for a GCC amount or an array of them
+        """
+        return self._estimate(self._gcc, amounts)
+
+    def estimate_usdc(self, amounts) -> Estimate:
+        """
+        `estimateUSDCCommitImpactPower` for a USDC amount or an array of them
+        """
+        return self._estimate(self._usdc, amounts)
+
+
+def gcc_and_usdc_reserves(reserve0: int, reserve1: int, gcc: str, usdc: str) -> tuple:
+    """
+    (reserveGCC, reserveUSDC) from `getReserves` of the pair, ordered by the token addresses like the contract does
+    """
+    gccIsToken0 = int(gcc, 16) < int(usdc, 16)
+    return (reserve0, reserve1) if gccIsToken0 else (reserve1, reserve0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exact ImpactCatalyst impact power estimates for many amounts")
+    parser.add_argument("--reserve-gcc", type=int, default=None)
+    parser.add_argument("--reserve-usdc", type=int, default=None)
+    parser.add_argument("--gcc", type=parse_amount, nargs="*", default=[], help="GCC amounts (wei) to estimate")
+    parser.add_argument("--usdc", type=parse_amount, nargs="*", default=[], help="USDC amounts (6 decimals) to estimate")
+    parser.add_argument("--check-sqrt", type=int, default=None, metavar="N", help="fuzz the sqrt port with N values")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.check_sqrt is not None:
+        print(f"sqrt mismatches: {check_sqrt(args.check_sqrt, args.seed)}")
+    if args.reserve_gcc is not None and args.reserve_usdc is not None:
+        estimator = ImpactPowerEstimator(args.reserve_gcc, args.reserve_usdc)
+        for name, amounts, estimate in (("gcc", args.gcc, estimator.estimate_gcc), ("usdc", args.usdc, estimator.estimate_usdc)):
+            if not amounts:
+                continue
+            result = estimate(amounts)
+            for amount, status, power, swap in zip(amounts, result.status.tolist(), result.impactPower, result.optimalSwapAmount):
+                print(f"{name} {amount}: {power if status == OK else STATUS_NAMES[status]} (swap {swap})")
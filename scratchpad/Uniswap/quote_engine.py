@@ -0,0 +1,222 @@
+"""
+Batch constant-product quote engine mirroring src/libraries/UniswapV2Library.sol.
+
+`get_amount_out`, `get_amount_in` and `quote` take arrays (or scalars) of amounts and reserves
+and evaluate every lane at once in one of two modes:
+    - exact=True:  python ints in numpy object arrays, floor division and the library's requires,
+                   bit-exact with the contract (uint112 reserves can't overflow the intermediates)
+    - exact=False: the same formula, fee constants (997 / 1000) and floors in float64,
+                   equal to the exact result up to float rounding (a relative 1e-15, or 1 unit around the floor)
+Both modes share the requires, so a lane that would revert is invalid in both.
+With check=True an invalid lane raises `UniswapV2Revert` (with the offending flat indices),
+with check=False the lane is None (exact) or nan (float).
+
+Note that this repo's `getAmountIn` uses `reserveOut - amountOut * 997` as the denominator
+(upstream UniswapV2 uses `(reserveOut - amountOut) * 997`). It is mirrored as is.
+
+`swap_scan` applies a sequence of swaps to one pool and returns the output and the reserves after each swap.
+In float mode every run of swaps in the same direction is one vectorized cumulative scan:
+swapping `a` of X for Y multiplies the Y reserve by `1000 x / (1000 x + 997 a)`,
+so the reserves after a run are a cumulative sum on one side and a cumulative product on the other.
+That product is the starting point: the outputs are then floored and recomputed from the reserves the floored outputs
+leave (a few vectorized passes), so the reserves don't drift from the exact mode over long sequences.
+In exact mode the floors make every swap depend on the previous one, so the scan is a tight integer loop.
+
+Usage:
+    python3 scratchpad/Uniswap/quote_engine.py --check-swap-scan 100000 --seed 1
+"""
+import argparse
+
+import numpy as np
+
+FEE_NUMERATOR = 997
+FEE_DENOMINATOR = 1000
+
+
+class UniswapV2Revert(Exception):
+    def __init__(self, message: str, lanes=None):
+        super().__init__(message if lanes is None else f"{message} (lanes {lanes[:10].tolist()})")
+        self.lanes = lanes
+
+
+def _arrays(exact: bool, *values):
+    if exact:
+        return [np.asarray(v, dtype=object) if np.ndim(v) else int(v) for v in values]
+    return [np.asarray(v, dtype=np.float64) for v in values]
+
+
+def _require(ok, message: str, check: bool):
+    ok = np.asarray(ok, dtype=bool)
+    if check and not ok.all():
+        raise UniswapV2Revert(message, np.flatnonzero(~ok))
+    return ok
+
+
+def _invalidate(result, valid, exact: bool):
+    if valid.all():
+        return result
+    if not exact:
+        return np.where(valid, result, np.nan)
+    if np.ndim(result) == 0:
+        return None
+    result = np.array(result, dtype=object)
+    result[~valid] = None
+    return result
+
+
+def _floor_div(numerator, denominator, exact: bool):
+    if exact:
+        return numerator // denominator
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.floor(numerator / denominator)
+
+
+def _safe(denominator, valid, exact: bool):
+    """
+    Replaces the denominator of invalid lanes by 1 so they don't raise or warn
+    """
+    if valid.all():
+        return denominator
+    if exact and np.ndim(denominator) == 0:
+        return 1
+    return np.where(valid, denominator, 1)
+
+
+def quote(amountA, reserveA, reserveB, exact: bool = True, check: bool = True):
+    """
+    `UniswapV2Library.quote`
+    """
+    amountA, reserveA, reserveB = _arrays(exact, amountA, reserveA, reserveB)
+    valid = _require(amountA > 0, "UniswapV2Library: INSUFFICIENT_AMOUNT", check)
+    valid &= _require((reserveA > 0) & (reserveB > 0), "UniswapV2Library: INSUFFICIENT_LIQUIDITY", check)
+    return _invalidate(_floor_div(amountA * reserveB, _safe(reserveA, valid, exact), exact), valid, exact)
+
+
+def get_amount_out(amountIn, reserveIn, reserveOut, exact: bool = True, check: bool = True):
+    """
+    `UniswapV2Library.getAmountOut`
+    """
+    amountIn, reserveIn, reserveOut = _arrays(exact, amountIn, reserveIn, reserveOut)
+    valid = _require(amountIn > 0, "UniswapV2Library: INSUFFICIENT_INPUT_AMOUNT", check)
+    valid &= _require((reserveIn > 0) & (reserveOut > 0), "UniswapV2Library: INSUFFICIENT_LIQUIDITY", check)
+    amountInWithFee = amountIn * FEE_NUMERATOR
+    numerator = amountInWithFee * reserveOut
+    denominator = reserveIn * FEE_DENOMINATOR + amountInWithFee
+    return _invalidate(_floor_div(numerator, _safe(denominator, valid, exact), exact), valid, exact)
+
+
+def get_amount_in(amountOut, reserveIn, reserveOut, exact: bool = True, check: bool = True):
+    """
+    `UniswapV2Library.getAmountIn`, including its `reserveOut - amountOut * 997` denominator
+    """
+    amountOut, reserveIn, reserveOut = _arrays(exact, amountOut, reserveIn, reserveOut)
+    valid = _require(amountOut > 0, "UniswapV2Library: INSUFFICIENT_OUTPUT_AMOUNT", check)
+    valid &= _require((reserveIn > 0) & (reserveOut > 0), "UniswapV2Library: INSUFFICIENT_LIQUIDITY", check)
+    numerator = reserveIn * amountOut * FEE_DENOMINATOR
+    denominator = reserveOut - amountOut * FEE_NUMERATOR
+    # checked subtraction underflows and division by zero panics
+    valid &= _require(denominator > 0, "panic: arithmetic underflow or division by zero", check)
+    return _invalidate(_floor_div(numerator, _safe(denominator, valid, exact), exact) + 1, valid, exact)
+
+
+def swap_scan(reserveX, reserveY, amountsIn, xForY, exact: bool = True):
+    """
+    Applies swaps to one pool in order. `amountsIn` are the input amounts and `xForY` is True where X is sold for Y
+    (a scalar applies to every swap). Every swap must be valid (amountIn > 0).
+
+    Returns a dict of arrays, one entry per swap:
+        amountOut - what the swap paid out
+        reserveX  - the X reserve after the swap
+        reserveY  - the Y reserve after the swap
+    """
+    n = len(amountsIn)
+    xForY = np.broadcast_to(np.asarray(xForY, dtype=bool), (n,))
+    if exact:
+        return _swap_scan_exact(int(reserveX), int(reserveY), amountsIn, xForY)
+
+    amounts = np.asarray(amountsIn, dtype=np.float64)
+    if n and not (amounts > 0).all():
+        raise UniswapV2Revert("UniswapV2Library: INSUFFICIENT_INPUT_AMOUNT", np.flatnonzero(~(amounts > 0)))
+    amountOut = np.empty(n, dtype=np.float64)
+    outX = np.empty(n, dtype=np.float64)
+    outY = np.empty(n, dtype=np.float64)
+    x = float(reserveX)
+    y = float(reserveY)
+    # split into runs of swaps in the same direction
+    breaks = np.flatnonzero(np.diff(xForY.astype(np.int8))) + 1
+    for start, stop in zip(np.concatenate([[0], breaks]), np.concatenate([breaks, [n]])):
+        a = amounts[start:stop]
+        if xForY[start]:
+            inReserve, otherReserve = x, y
+        else:
+            inReserve, otherReserve = y, x
+        # the input side grows by the cumulative input, the output side shrinks by a cumulative product
+        inAfter = inReserve + np.cumsum(a)
+        inBefore = inAfter - a
+        denominator = FEE_DENOMINATOR * inBefore + FEE_NUMERATOR * a
+        otherAfter = otherReserve * np.exp(np.cumsum(np.log(FEE_DENOMINATOR * inBefore / denominator)))
+        otherBefore = np.concatenate([[otherReserve], otherAfter[:-1]])
+        out = np.floor(otherBefore - otherAfter)
+        # the contract floors every output, the dust left in the pool raises the later outputs:
+        # recompute the outputs from the reserves left by the floored ones until they don't change.
+        # An output only depends on the ones before it, so the k-th pass fixes at least the first k
+        for _ in range(len(a)):
+            otherBefore = otherReserve - np.concatenate([[0.0], np.cumsum(out[:-1])])
+            floored = np.floor(FEE_NUMERATOR * a * otherBefore / denominator)
+            if np.array_equal(floored, out):
+                break
+            out = floored
+        otherAfter = otherReserve - np.cumsum(out)
+        amountOut[start:stop] = out
+        if xForY[start]:
+            outX[start:stop], outY[start:stop] = inAfter, otherAfter
+        else:
+            outX[start:stop], outY[start:stop] = otherAfter, inAfter
+        x, y = outX[stop - 1], outY[stop - 1]
+    return {"amountOut": amountOut, "reserveX": outX, "reserveY": outY}
+
+
+def _swap_scan_exact(x: int, y: int, amountsIn, xForY):
+    n = len(amountsIn)
+    amountOut = np.empty(n, dtype=object)
+    outX = np.empty(n, dtype=object)
+    outY = np.empty(n, dtype=object)
+    for i, (amountIn, sellX) in enumerate(zip(amountsIn, xForY.tolist())):
+        amountIn = int(amountIn)
+        if amountIn <= 0:
+            raise UniswapV2Revert("UniswapV2Library: INSUFFICIENT_INPUT_AMOUNT", np.array([i]))
+        reserveIn, reserveOut = (x, y) if sellX else (y, x)
+        if reserveIn <= 0 or reserveOut <= 0:
+            raise UniswapV2Revert("UniswapV2Library: INSUFFICIENT_LIQUIDITY", np.array([i]))
+        amountInWithFee = amountIn * FEE_NUMERATOR
+        out = amountInWithFee * reserveOut // (reserveIn * FEE_DENOMINATOR + amountInWithFee)
+        if sellX:
+            x, y = x + amountIn, y - out
+        else:
+            x, y = x - out, y + amountIn
+        amountOut[i] = out
+        outX[i] = x
+        outY[i] = y
+    return {"amountOut": amountOut, "reserveX": outX, "reserveY": outY}
+
+
+def check_swap_scan(swaps: int, seed: int = None) -> int:
+    """
+    Runs `swaps` random swaps (runs of random length in random directions) through `swap_scan` in both modes,
+    returns the largest difference of the float reserves from the exact ones, in units
+    """
+    rng = np.random.default_rng(seed)
+    amountsIn = rng.integers(10**3, 10**9, swaps)
+    xForY = np.repeat(rng.random(swaps) < 0.5, rng.integers(1, 100, swaps))[:swaps]
+    exact = swap_scan(10**12, 5 * 10**12, amountsIn, xForY, exact=True)
+    approx = swap_scan(10**12, 5 * 10**12, amountsIn, xForY, exact=False)
+    return max(int(np.abs(approx[side] - exact[side].astype(np.float64)).max()) for side in ("reserveX", "reserveY"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Self-checks of the batch UniswapV2 quote engine")
+    parser.add_argument("--check-swap-scan", type=int, default=100000, metavar="N", help="compare the modes over N swaps")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    print(f"swap_scan reserve drift: {check_swap_scan(args.check_swap_scan, args.seed)}")
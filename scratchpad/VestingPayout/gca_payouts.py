@@ -0,0 +1,379 @@
+"""
+Payout model of src/MinerPoolAndGCA/GCASalaryHelper.sol, driven by the GCA event log.
+
+`GCAPayoutEngine` replays, in block order,
+    - elections (`callbackInElectionEvent`, logged as `NewGCAsAppointed`)
+    - compensation plan submissions (`handleCompensationPlanSubmission`, logged as `CompensationPlanSubmitted`)
+    - slashes (`_slash`, logged as `GCAsSlashed`)
+    - claims (`claimPayout`, which logs no event of its own, as `ClaimPayout` records with the user and payment nonce)
+into one record per payment nonce: its agents, its shift start and its `uint32[5]` comp plans, exactly as the
+contract stores them. Each nonce caches its per-agent aggregate (the summed shares and the resulting
+`rewardPerSecond` of `getPayoutData`), and withdrawals are kept per (agent, nonce) as a time-sorted cumulative list.
+
+A nonce's agents and plans can only change before its shift starts, and the shift of a nonce only ends
+when the next one starts, so the replayed records give the same `getPayoutData` answer at any past timestamp
+as the contract gave at that time (after the last event of that timestamp). Queries (`payout_data`, `agent_totals`, `project`) therefore read
+the cached aggregates at any timestamp, without replaying anything again; only `claim` needs to come in order.
+
+The vesting math is vesting_math.py (an exact mirror of VestingMathLib).
+
+Usage:
+    python3 gca_payouts.py events.jsonl --genesis 1700000000 --at 1710000000 1720000000
+where every line of events.jsonl is one event, e.g.
+    {"timestamp": 1700000000, "event": "NewGCAsAppointed", "newGcas": ["0xa...", "0xb..."]}
+    {"timestamp": 1700100000, "event": "CompensationPlanSubmitted", "agent": "0xa...", "plan": [50000, 50000, 0, 0, 0]}
+    {"timestamp": 1700200000, "event": "GCAsSlashed", "slashedGcas": ["0xb..."]}
+    {"timestamp": 1700300000, "event": "ClaimPayout", "user": "0xa...", "paymentNonce": 0}
+The first `NewGCAsAppointed` is the one the GCA constructor emits (payment nonce 0, starting at genesis).
+"""
+import argparse
+import bisect
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from vesting_math import (  # noqa: E402
+    REWARDS_PER_SECOND_FOR_ALL,
+    SHARES_REQUIRED_PER_COMP_PLAN,
+    calculate_batch,
+    calculate_withdrawable_amount_and_slashable_amount,
+)
+
+BUCKET_DURATION = 7 * 86400
+COMP_PLAN_LENGTH = 5
+
+
+class GCASalaryRevert(Exception):
+    pass
+
+
+class InvalidShares(GCASalaryRevert):
+    pass
+
+
+class CallerNotGCAAtIndex(GCASalaryRevert):
+    pass
+
+
+class InvalidGCAHash(GCASalaryRevert):
+    pass
+
+
+class InvalidUserIndex(GCASalaryRevert):
+    pass
+
+
+class SlashedAgentCannotClaimReward(GCASalaryRevert):
+    pass
+
+
+class ShiftNotStarted(GCASalaryRevert):
+    """
+    `shiftEndTimestamp - shiftStartTimestamp` underflows: the nonce's shift starts after the timestamp asked for
+    """
+
+
+def default_comp_plan(gcaIndex: int) -> list:
+    shares = [0] * COMP_PLAN_LENGTH
+    shares[gcaIndex] = SHARES_REQUIRED_PER_COMP_PLAN
+    return shares
+
+
+class PaymentNonce:
+    """
+    Storage of one payment nonce: `_paymentNonceToGCAs`, `_paymentNonceToShiftStartTimestamp` and
+    `_paymentNonceToCompensationPlan` (rows are GCA indices, rows past the agent count keep whatever was stored)
+    """
+
+    __slots__ = ("agents", "start", "plans", "_rewardsPerSecond", "_index")
+
+    def __init__(self, agents, start: int, plans=None):
+        self.agents = tuple(agents)
+        self.start = start
+        self.plans = [list(row) for row in plans] if plans is not None else [[0] * COMP_PLAN_LENGTH for _ in range(COMP_PLAN_LENGTH)]
+        self._rewardsPerSecond = None
+        self._index = None
+
+    def changed(self):
+        self._rewardsPerSecond = None
+        self._index = None
+
+    def index(self, agent: str):
+        """
+        The user index of an agent (its first position in the agents array) or None
+        """
+        if self._index is None:
+            self._index = {}
+            for i, a in enumerate(self.agents):
+                self._index.setdefault(a, i)
+        return self._index.get(agent)
+
+    def rewards_per_second(self) -> list:
+        """
+        `userShares * REWARDS_PER_SECOND_FOR_ALL / totalShares` of `getPayoutData` for every user index
+        """
+        if self._rewardsPerSecond is None:
+            n = len(self.agents)
+            totalShares = n * SHARES_REQUIRED_PER_COMP_PLAN
+            self._rewardsPerSecond = [
+                sum(self.plans[i][j] for i in range(n)) * REWARDS_PER_SECOND_FOR_ALL // totalShares for j in range(n)
+            ]
+        return self._rewardsPerSecond
+
+
+class GCAPayoutEngine:
+    def __init__(self, startingAgents, genesisTimestamp: int, bucketDuration: int = BUCKET_DURATION):
+        self.bucketDuration = bucketDuration
+        # the constructor of GCASalaryHelper and `setZeroPaymentStartTimestamp`
+        zero = PaymentNonce(startingAgents, genesisTimestamp)
+        for i in range(len(startingAgents)):
+            zero.plans[i] = default_comp_plan(i)
+        self.nonces = [zero]
+        # `gcaAgents` of GCA.sol, the agents comp plans are submitted against
+        self.gcaAgents = list(startingAgents)
+        # agent -> timestamp of the slash
+        self.slashedAt = {}
+        # (agent, nonce) -> ([claim timestamps], [amountWithdrawnAtPaymentNonce after each claim])
+        self._withdrawals = {}
+        self.timestamp = genesisTimestamp
+
+    @property
+    def paymentNonce(self) -> int:
+        return len(self.nonces) - 1
+
+    def _advance(self, timestamp: int):
+        if timestamp < self.timestamp:
+            raise ValueError(f"events must come in time order ({timestamp} < {self.timestamp})")
+        self.timestamp = timestamp
+
+    # ---------------------------------------------------------------------- #
+    #                                 events                                  #
+    # ---------------------------------------------------------------------- #
+
+    def election(self, timestamp: int, gcaAgents):
+        """
+        `callbackInElectionEvent(gcaAgents)` followed by `_setGCAs(gcaAgents)`
+        """
+        self._advance(timestamp)
+        current = self.nonces[-1]
+        if timestamp > current.start:
+            current = PaymentNonce(gcaAgents, timestamp)
+            self.nonces.append(current)
+        current.agents = tuple(gcaAgents)
+        current.start = timestamp
+        for i in range(len(gcaAgents)):
+            current.plans[i] = default_comp_plan(i)
+        current.changed()
+        self.gcaAgents = list(gcaAgents)
+
+    def submit_comp_plan(self, timestamp: int, agent: str, plan, indexOfGCA: int = None):
+        """
+        `submitCompensationPlan(plan, indexOfGCA)` from `agent`, the index defaults to the agent's position in `gcaAgents`
+        """
+        if indexOfGCA is None:
+            if agent not in self.gcaAgents:
+                raise CallerNotGCAAtIndex(agent)
+            indexOfGCA = self.gcaAgents.index(agent)
+        if indexOfGCA >= len(self.gcaAgents) or self.gcaAgents[indexOfGCA] != agent:
+            raise CallerNotGCAAtIndex(agent)
+        plan = [int(p) for p in plan]
+        if len(plan) != COMP_PLAN_LENGTH or any(not 0 <= p < 2**32 for p in plan):
+            raise ValueError("a comp plan is five uint32 values")
+        totalGCAs = len(self.gcaAgents)
+        if sum(plan[:totalGCAs]) != SHARES_REQUIRED_PER_COMP_PLAN:
+            raise InvalidShares(plan)
+        self._advance(timestamp)
+
+        current = self.nonces[-1]
+        if timestamp > current.start:
+            following = PaymentNonce(current.agents, timestamp + self.bucketDuration)
+            for i in range(totalGCAs):
+                following.plans[i] = list(plan) if i == indexOfGCA else list(current.plans[i])
+            self.nonces.append(following)
+            return
+        current.plans[indexOfGCA] = plan
+        current.changed()
+
+    def slash(self, timestamp: int, agents):
+        """
+        `_slash` for every agent of a `GCAsSlashed` event
+        """
+        self._advance(timestamp)
+        for agent in agents:
+            self.slashedAt.setdefault(agent, timestamp)
+
+    def is_slashed(self, agent: str, timestamp: int = None) -> bool:
+        slashedAt = self.slashedAt.get(agent)
+        return slashedAt is not None and (timestamp is None or slashedAt <= timestamp)
+
+    def claim(self, timestamp: int, agent: str, paymentNonce: int) -> int:
+        """
+        `claimPayout(agent, paymentNonce, ...)`, returns the amount transferred
+        """
+        if self.is_slashed(agent):
+            raise SlashedAgentCannotClaimReward(agent)
+        self._advance(timestamp)
+        withdrawable, _, alreadyWithdrawn = self.payout_data(agent, paymentNonce, timestamp)
+        times, totals = self._withdrawals.setdefault((agent, paymentNonce), ([], []))
+        times.append(timestamp)
+        totals.append(alreadyWithdrawn + withdrawable)
+        return withdrawable
+
+    def apply(self, event: dict):
+        """
+        Applies one event log record (see the module docstring for the fields)
+        """
+        name = event["event"]
+        timestamp = int(event["timestamp"])
+        if name == "NewGCAsAppointed":
+            self.election(timestamp, event["newGcas"])
+        elif name == "CompensationPlanSubmitted":
+            self.submit_comp_plan(timestamp, event["agent"], event["plan"], event.get("indexOfGCA"))
+        elif name == "GCAsSlashed":
+            self.slash(timestamp, event["slashedGcas"])
+        elif name == "ClaimPayout":
+            self.claim(timestamp, event["user"], int(event["paymentNonce"]))
+        else:
+            raise ValueError(f"unknown event {name}")
+
+    @classmethod
+    def from_events(cls, events, genesisTimestamp: int, bucketDuration: int = BUCKET_DURATION) -> "GCAPayoutEngine":
+        """
+        Replays an event log whose first `NewGCAsAppointed` is the one of the GCA constructor
+        """
+        events = iter(events)
+        for event in events:
+            if event["event"] == "NewGCAsAppointed":
+                engine = cls(event["newGcas"], genesisTimestamp, bucketDuration)
+                break
+            raise ValueError("the event log has to start with the constructor's NewGCAsAppointed")
+        else:
+            raise ValueError("the event log has no NewGCAsAppointed")
+        for event in events:
+            engine.apply(event)
+        return engine
+
+    # ---------------------------------------------------------------------- #
+    #                                 queries                                 #
+    # ---------------------------------------------------------------------- #
+
+    def shift(self, paymentNonce: int) -> tuple:
+        """
+        (shift start, shift end) of a nonce, the end is 0 while the next nonce doesn't exist
+        """
+        end = self.nonces[paymentNonce + 1].start if paymentNonce + 1 < len(self.nonces) else 0
+        return self.nonces[paymentNonce].start, end
+
+    def amount_withdrawn(self, agent: str, paymentNonce: int, timestamp: int = None) -> int:
+        """
+        `amountWithdrawnAtPaymentNonce[agent][paymentNonce]` at `timestamp` (after the claims made at that timestamp)
+        """
+        record = self._withdrawals.get((agent, paymentNonce))
+        if record is None:
+            return 0
+        times, totals = record
+        k = len(times) if timestamp is None else bisect.bisect_right(times, timestamp)
+        return totals[k - 1] if k else 0
+
+    def payout_data(self, agent: str, paymentNonce: int, timestamp: int) -> tuple:
+        """
+        `getPayoutData(agent, paymentNonce, ...)` at `timestamp`: (withdrawableAmount, slashableAmount, amountAlreadyWithdrawn)
+        """
+        if not 0 <= paymentNonce < len(self.nonces):
+            # no agents hash was ever stored for the nonce
+            raise InvalidGCAHash(paymentNonce)
+        nonce = self.nonces[paymentNonce]
+        start, end = self.shift(paymentNonce)
+        end = timestamp if end == 0 else min(end, timestamp)
+        if end < start:
+            # checked before the user index: the agents of a nonce whose shift hadn't started at `timestamp`
+            # may still have been replaced by an election after it, the call reverts either way
+            raise ShiftNotStarted(paymentNonce)
+        userIndex = nonce.index(agent)
+        if userIndex is None:
+            raise InvalidUserIndex(agent)
+        secondsStopped = timestamp - end if timestamp > end else 0
+        alreadyWithdrawn = self.amount_withdrawn(agent, paymentNonce, timestamp)
+        withdrawable, slashable = calculate_withdrawable_amount_and_slashable_amount(
+            nonce.rewards_per_second()[userIndex], end - start, secondsStopped, alreadyWithdrawn
+        )
+        return withdrawable, slashable, alreadyWithdrawn
+
+    def agent_nonces(self, agent: str) -> list:
+        return [n for n, nonce in enumerate(self.nonces) if nonce.index(agent) is not None]
+
+    def agent_totals(self, agent: str, timestamp: int) -> tuple:
+        """
+        (withdrawable, slashable) of an agent summed over every nonce whose shift had started at `timestamp`
+        """
+        withdrawable = slashable = 0
+        for n in self.agent_nonces(agent):
+            if self.nonces[n].start <= timestamp:
+                w, s, _ = self.payout_data(agent, n, timestamp)
+                withdrawable += w
+                slashable += s
+        return withdrawable, slashable
+
+    def pairs(self) -> tuple:
+        """
+        Every (agent, payment nonce) pair as parallel arrays: agents, nonces, rewardsPerSecond, shift starts and ends
+        """
+        agents, nonces, rates, starts, ends = [], [], [], [], []
+        for n, nonce in enumerate(self.nonces):
+            start, end = self.shift(n)
+            rewardsPerSecond = nonce.rewards_per_second()
+            for agent in dict.fromkeys(nonce.agents):
+                agents.append(agent)
+                nonces.append(n)
+                rates.append(rewardsPerSecond[nonce.index(agent)])
+                starts.append(start)
+                ends.append(end)
+        return (np.array(agents, dtype=object), np.array(nonces, dtype=np.int64), np.array(rates, dtype=object),
+                np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64))
+
+    def project(self, timestamps) -> dict:
+        """
+        Withdrawable and slashable amounts of every (agent, nonce) pair (rows) at every timestamp (columns) in one pass.
+        Pairs whose shift hasn't started at a timestamp (where `getPayoutData` reverts) are 0 there.
+        """
+        agents, nonces, rates, starts, ends = self.pairs()
+        now = np.asarray(timestamps, dtype=np.int64).ravel()
+        effectiveEnd = np.where(ends[:, None] == 0, now[None, :], np.minimum(now[None, :], ends[:, None]))
+        secondsActive = np.maximum(effectiveEnd - starts[:, None], 0)
+        secondsStopped = np.maximum(now[None, :] - effectiveEnd, 0)
+        withdrawn = np.zeros((agents.shape[0], now.shape[0]), dtype=object)
+        for row, (agent, n) in enumerate(zip(agents.tolist(), nonces.tolist())):
+            if (agent, n) in self._withdrawals:
+                withdrawn[row] = [self.amount_withdrawn(agent, n, int(t)) for t in now]
+        withdrawable, slashable = calculate_batch(rates[:, None], secondsActive, secondsStopped, withdrawn, check=False)
+        return {"agent": agents, "paymentNonce": nonces, "withdrawable": withdrawable, "slashable": slashable}
+
+
+def read_events(path: str):
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay GCA salary events and print every agent's payouts")
+    parser.add_argument("events", help="json lines event log")
+    parser.add_argument("--genesis", type=int, required=True, help="GENESIS_TIMESTAMP of the GCA contract")
+    parser.add_argument("--bucket-duration", type=int, default=BUCKET_DURATION)
+    parser.add_argument("--at", type=int, nargs="+", required=True, help="timestamps to evaluate")
+    args = parser.parse_args()
+
+    engine = GCAPayoutEngine.from_events(read_events(args.events), args.genesis, args.bucket_duration)
+    print(f"payment nonces: {len(engine.nonces)} slashed agents: {len(engine.slashedAt)}")
+    projection = engine.project(args.at)
+    print("agent,timestamp,withdrawable,slashable,slashed")
+    for agent in dict.fromkeys(projection["agent"].tolist()):
+        rows = projection["agent"] == agent
+        for column, timestamp in enumerate(args.at):
+            withdrawable = sum(int(v) for v in projection["withdrawable"][rows, column])
+            slashable = sum(int(v) for v in projection["slashable"][rows, column])
+            print(f"{agent},{timestamp},{withdrawable},{slashable},{int(engine.is_slashed(agent, timestamp))}")
@@ -0,0 +1,155 @@
+"""
+Array-backed version of `VestingWithManualArrays` (Vesting.py).
+
+`VestingWithManualArrays` keeps a list of full `Vesting` objects and walks it attribute by attribute
+on every `warpForward` / `claimAllObjects` / `sumOfAmountClaimed`.
+`VestingLedger` keeps the same fields as contiguous numpy arrays (one slot per vesting position) instead:
+    - every position's `timestamp` is stored relative to one shared clock, so `warpForward` is a single add
+    - `claimPayout(i)` touches one slot, `claimAllObjects` is one vectorized pass
+    - `sumOfAmountClaimed` is a vectorized sum
+The arrays grow by doubling, so pushing positions is amortized O(1).
+
+The payout rule is the same float rule as `Vesting.claimPayout`:
+    amount = min(totalAmount * min(1, timeDiff / total_vesting_time), totalAmount - amountClaimed)
+"""
+import numpy as np
+
+
+def weeks_in_seconds(weeks):
+    return weeks * (86400 * 7)
+
+
+# 100 Weeks, same as Vesting.py
+total_vesting_time = weeks_in_seconds(100)
+
+
+class VestingLedger:
+    __slots__ = (
+        "clock",
+        "size",
+        "_timestampOffset",
+        "_lastClaimedTimestamp",
+        "_amountClaimed",
+        "_totalAmount",
+        "_vestStartTimestamp",
+        "_rotationStart",
+    )
+
+    def __init__(self, capacity: int = 16):
+        # shared clock, a position's timestamp is `clock + _timestampOffset[i]`
+        self.clock = 0
+        self.size = 0
+        self._timestampOffset = np.zeros(capacity, dtype=np.int64)
+        self._lastClaimedTimestamp = np.zeros(capacity, dtype=np.int64)
+        self._amountClaimed = np.zeros(capacity, dtype=np.float64)
+        self._totalAmount = np.zeros(capacity, dtype=np.float64)
+        self._vestStartTimestamp = np.zeros(capacity, dtype=np.int64)
+        self._rotationStart = np.zeros(capacity, dtype=np.int64)
+
+    def __len__(self):
+        return self.size
+
+    def _grow(self):
+        capacity = max(16, 2 * self._totalAmount.shape[0])
+        for name in (
+            "_timestampOffset",
+            "_lastClaimedTimestamp",
+            "_amountClaimed",
+            "_totalAmount",
+            "_vestStartTimestamp",
+            "_rotationStart",
+        ):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[: self.size] = old[: self.size]
+            setattr(self, name, new)
+
+    # ---------------------------------------------------------------------- #
+    #                                 positions                               #
+    # ---------------------------------------------------------------------- #
+
+    def pushPosition(
+        self,
+        totalAmount,
+        timestamp: int = None,
+        lastClaimedTimestamp: int = 0,
+        amountClaimed=0,
+        vestStartTimestamp: int = 0,
+        rotationStart: int = 0,
+    ) -> int:
+        """
+        Adds a vesting position and returns its index. `timestamp` defaults to the shared clock
+        """
+        if self.size == self._totalAmount.shape[0]:
+            self._grow()
+        i = self.size
+        self._timestampOffset[i] = (self.clock if timestamp is None else timestamp) - self.clock
+        self._lastClaimedTimestamp[i] = lastClaimedTimestamp
+        self._amountClaimed[i] = amountClaimed
+        self._totalAmount[i] = totalAmount
+        self._vestStartTimestamp[i] = vestStartTimestamp
+        self._rotationStart[i] = rotationStart
+        self.size += 1
+        return i
+
+    def pushVestingObject(self, vestingObject) -> int:
+        """
+        Same as `VestingWithManualArrays.pushVestingObject`, copies the fields of a `Vesting`
+        """
+        return self.pushPosition(
+            vestingObject.totalAmount,
+            vestingObject.timestamp,
+            vestingObject.lastClaimedTimestamp,
+            vestingObject.amountClaimed,
+            vestingObject.vestStartTimestamp,
+            vestingObject.rotationStart,
+        )
+
+    def timestamp(self, i: int) -> int:
+        return self.clock + int(self._timestampOffset[i])
+
+    def position(self, i: int) -> dict:
+        """
+        The fields of position `i`, named like the `Vesting` attributes
+        """
+        return {
+            "rotationStart": int(self._rotationStart[i]),
+            "timestamp": self.timestamp(i),
+            "lastClaimedTimestamp": int(self._lastClaimedTimestamp[i]),
+            "amountClaimed": float(self._amountClaimed[i]),
+            "totalAmount": float(self._totalAmount[i]),
+            "vestStartTimestamp": int(self._vestStartTimestamp[i]),
+        }
+
+    # ---------------------------------------------------------------------- #
+    #                              time and claims                            #
+    # ---------------------------------------------------------------------- #
+
+    def warpForward(self, amount: int):
+        self.clock += amount
+
+    def claimPayout(self, i: int):
+        """
+        `Vesting.claimPayout` for position `i`
+        """
+        timestamp = self.timestamp(i)
+        timeDiff = timestamp - int(self._lastClaimedTimestamp[i])
+        totalAmount = self._totalAmount[i]
+        amount = min(totalAmount * min(1, timeDiff / total_vesting_time), totalAmount - self._amountClaimed[i])
+        self._amountClaimed[i] += amount
+        self._lastClaimedTimestamp[i] = timestamp
+
+    def claimAllObjects(self):
+        n = self.size
+        timestamps = self.clock + self._timestampOffset[:n]
+        timeDiff = timestamps - self._lastClaimedTimestamp[:n]
+        totalAmount = self._totalAmount[:n]
+        vested = totalAmount * np.minimum(1, timeDiff / total_vesting_time)
+        self._amountClaimed[:n] += np.minimum(vested, totalAmount - self._amountClaimed[:n])
+        self._lastClaimedTimestamp[:n] = timestamps
+
+    def sumOfAmountClaimed(self) -> float:
+        return float(self._amountClaimed[: self.size].sum())
+
+    def sumOfTotalAmount(self) -> float:
+        return float(self._totalAmount[: self.size].sum())
@@ -0,0 +1,166 @@
+"""
+Exact mirror of src/libraries/VestingMathLib.sol.
+
+`calculate_withdrawable_amount_and_slashable_amount` is the library function for one set of inputs,
+`calculate_batch` runs it over whole (broadcastable) arrays of
+(rewardsPerSecond, secondsActive, secondsStopped, amountAlreadyWithdrawn) in one call.
+
+The batch path works in int64 when every intermediate provably fits, otherwise on numpy object arrays
+of python ints (the usual case: `REWARDS_PER_SECOND_FOR_ALL * secondsActive` is well above 2^63).
+Both paths floor-divide like solidity, so the results are bit-exact.
+
+`project_payouts` evaluates the function for every agent at every timestamp of a grid,
+which is what `GCASalaryHelper.getPayoutData` would return if it were called at each of those times.
+"""
+import numpy as np
+
+# Constants from VestingMathLib.sol / GCASalaryHelper.sol
+VESTING_PERIODS = 100
+MAX_VESTING_SECONDS = 7 * 86400 * 100
+REWARDS_PER_SECOND_FOR_ALL = 10_000 * 10**18 // (7 * 86400)
+SHARES_REQUIRED_PER_COMP_PLAN = 100_000
+
+_INT64_LIMIT = 2**63
+
+
+class SolidityRevert(Exception):
+    pass
+
+
+class Underflow(SolidityRevert):
+    def __init__(self, lanes=None):
+        super().__init__(lanes)
+        self.lanes = lanes
+
+
+def calculate_withdrawable_amount_and_slashable_amount(
+    rewardsPerSecond: int, secondsActive: int, secondsStopped: int, amountAlreadyWithdrawn: int
+):
+    """
+    `VestingMathLib.calculateWithdrawableAmountAndSlashableAmount`, returns (withdrawableAmount, slashableAmount)
+    """
+    fullyVestedSeconds = 0
+    if secondsActive + secondsStopped > MAX_VESTING_SECONDS:
+        fullyVestedSeconds = secondsActive + secondsStopped - MAX_VESTING_SECONDS
+    if fullyVestedSeconds > secondsActive:
+        fullyVestedSeconds = secondsActive
+
+    fullyVestedRewards = rewardsPerSecond * fullyVestedSeconds
+    partiallyVestedSeconds = secondsActive - fullyVestedSeconds
+
+    lowestValueSecond = (1 + secondsStopped) * rewardsPerSecond // MAX_VESTING_SECONDS
+    highestValueSecond = (secondsActive + secondsStopped) * rewardsPerSecond // MAX_VESTING_SECONDS
+    if highestValueSecond > rewardsPerSecond:
+        highestValueSecond = rewardsPerSecond
+
+    partiallyVestedSecondsValue = partiallyVestedSeconds * (lowestValueSecond + highestValueSecond) // 2
+
+    totalRewards = secondsActive * rewardsPerSecond
+    withdrawableAmount = fullyVestedRewards + partiallyVestedSecondsValue
+    slashableAmount = totalRewards - withdrawableAmount
+    if amountAlreadyWithdrawn > withdrawableAmount:
+        raise Underflow()
+    withdrawableAmount -= amountAlreadyWithdrawn
+    return withdrawableAmount, slashableAmount
+
+
+def _as_int_array(values) -> np.ndarray:
+    """
+    numpy integer arrays are kept as they are, everything else (python ints, lists of big ints) becomes an object array
+    """
+    arr = np.asarray(values)
+    if arr.dtype.kind in "iu":
+        return arr
+    return np.asarray(values, dtype=object)
+
+
+def _fits_int64(rewardsPerSecond, secondsActive, secondsStopped, amountAlreadyWithdrawn) -> bool:
+    arrays = (rewardsPerSecond, secondsActive, secondsStopped, amountAlreadyWithdrawn)
+    if any(a.dtype.kind not in "iu" for a in arrays):
+        return False
+    if any(a.size and int(a.min()) < 0 for a in arrays):
+        return False
+    maxRate = int(rewardsPerSecond.max()) if rewardsPerSecond.size else 0
+    maxSeconds = int(secondsActive.max()) if secondsActive.size else 0
+    maxSeconds += int(secondsStopped.max()) if secondsStopped.size else 0
+    maxWithdrawn = int(amountAlreadyWithdrawn.max()) if amountAlreadyWithdrawn.size else 0
+    # the largest intermediate is (secondsActive + secondsStopped + 1) * rewardsPerSecond,
+    # partiallyVestedSeconds * (lowest + highest) is at most secondsActive * 2 * rewardsPerSecond
+    bound = (maxSeconds + 1) * maxRate * 2
+    return bound < _INT64_LIMIT and maxWithdrawn < _INT64_LIMIT
+
+
+def calculate_batch(rewardsPerSecond, secondsActive, secondsStopped, amountAlreadyWithdrawn=0, check: bool = True):
+    """
+    `calculateWithdrawableAmountAndSlashableAmount` over broadcastable arrays of inputs.
+
+    Returns (withdrawableAmount, slashableAmount) arrays, int64 when everything fits and object arrays of python ints otherwise.
+    When `check` is True an `Underflow` with the offending flat indices is raised if any lane would revert,
+    when it is False those lanes are left negative instead.
+    """
+    rewardsPerSecond = _as_int_array(rewardsPerSecond)
+    secondsActive = _as_int_array(secondsActive)
+    secondsStopped = _as_int_array(secondsStopped)
+    amountAlreadyWithdrawn = _as_int_array(amountAlreadyWithdrawn)
+
+    if _fits_int64(rewardsPerSecond, secondsActive, secondsStopped, amountAlreadyWithdrawn):
+        rps, active, stopped, withdrawn = (
+            a.astype(np.int64) for a in (rewardsPerSecond, secondsActive, secondsStopped, amountAlreadyWithdrawn)
+        )
+    else:
+        rps, active, stopped, withdrawn = (
+            a.astype(object) for a in (rewardsPerSecond, secondsActive, secondsStopped, amountAlreadyWithdrawn)
+        )
+
+    activePlusStopped = active + stopped
+    fullyVestedSeconds = np.minimum(np.maximum(activePlusStopped - MAX_VESTING_SECONDS, 0), active)
+    fullyVestedRewards = rps * fullyVestedSeconds
+    partiallyVestedSeconds = active - fullyVestedSeconds
+
+    lowestValueSecond = (1 + stopped) * rps // MAX_VESTING_SECONDS
+    highestValueSecond = np.minimum(activePlusStopped * rps // MAX_VESTING_SECONDS, rps)
+
+    partiallyVestedSecondsValue = partiallyVestedSeconds * (lowestValueSecond + highestValueSecond) // 2
+
+    totalRewards = active * rps
+    withdrawableAmount = fullyVestedRewards + partiallyVestedSecondsValue
+    slashableAmount = totalRewards - withdrawableAmount
+    withdrawableAmount = withdrawableAmount - withdrawn
+
+    if check:
+        underflow = np.flatnonzero(np.asarray(withdrawableAmount < 0, dtype=bool))
+        if underflow.size:
+            raise Underflow(underflow)
+    return withdrawableAmount, slashableAmount
+
+
+def reward_per_second(userShares, totalShares):
+    """
+    `userShares * REWARDS_PER_SECOND_FOR_ALL / totalShares` as computed in `GCASalaryHelper.getPayoutData`
+    """
+    return _as_int_array(userShares).astype(object) * REWARDS_PER_SECOND_FOR_ALL // _as_int_array(totalShares).astype(object)
+
+
+def project_payouts(rewardsPerSecond, shiftStartTimestamps, shiftEndTimestamps, amountAlreadyWithdrawn, timestamps):
+    """
+    Withdrawable and slashable balances for every agent (rows) at every timestamp (columns),
+    following how `GCASalaryHelper.getPayoutData` derives secondsWorked and secondsStopped from a shift.
+
+    All agent arguments are 1d arrays of the same length, `timestamps` is a 1d array.
+    A shift end of 0 means the shift is still running. Timestamps before a shift starts count as 0 seconds worked
+    (the contract would underflow), and lanes where more was already withdrawn than is vested are left negative.
+    """
+    start = np.asarray(shiftStartTimestamps, dtype=np.int64)[:, None]
+    end = np.asarray(shiftEndTimestamps, dtype=np.int64)[:, None]
+    now = np.asarray(timestamps, dtype=np.int64)[None, :]
+    # a shift end of 0 means the next payment nonce hasn't started yet, so the shift is still running
+    effectiveEnd = np.where(end == 0, now, np.minimum(now, end))
+    secondsActive = np.maximum(effectiveEnd - start, 0)
+    secondsStopped = np.maximum(now - effectiveEnd, 0)
+    return calculate_batch(
+        _as_int_array(rewardsPerSecond)[:, None],
+        secondsActive,
+        secondsStopped,
+        _as_int_array(amountAlreadyWithdrawn)[:, None],
+        check=False,
+    )